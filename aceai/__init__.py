@@ -0,0 +1 @@
+"""Support modules for the AceAi Streamlit app (app.py)"""
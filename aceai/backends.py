@@ -0,0 +1,200 @@
+"""CPU inference backends for the explainer model.
+
+    fp32  - the stock PyTorch pipeline (what AceAi has always used)
+    int8  - PyTorch with dynamic int8 quantization of the linear layers
+    onnx  - an exported ONNX Runtime graph (needs `pip install optimum[onnxruntime]`)
+    stub  - no model: placeholder text after a model-like delay, for load tests
+
+The backend is picked with ACEAI_MODEL_BACKEND. To choose with data, compare
+them side by side; each one is measured in a fresh process so resident memory
+is not polluted by the others:
+
+    python -m aceai.backends fp32 int8 onnx
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from aceai import config
+from aceai.models import lazy_import
+
+BACKENDS = {}
+
+
+def backend(name):
+    """Register a loader `fn(model_id) -> text-generation pipeline`"""
+    def register(fn):
+        BACKENDS[name] = fn
+        return fn
+    return register
+
+
+def load(name, model_id):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend {name!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_id)
+
+
+@backend("fp32")
+def load_fp32(model_id):
+    transformers = lazy_import("transformers")
+    torch = lazy_import("torch")
+    return transformers.pipeline("text-generation", model=model_id, torch_dtype=torch.float32)
+
+
+@backend("int8")
+def load_int8(model_id):
+    transformers = lazy_import("transformers")
+    torch = lazy_import("torch")
+    tokenizer = transformers.AutoTokenizer.from_pretrained(model_id)
+    model = transformers.AutoModelForCausalLM.from_pretrained(model_id, torch_dtype=torch.float32)
+    model.eval()
+    # GPT-2 keeps its projections in Conv1D modules, which dynamic quantization skips
+    _conv1d_to_linear(model)
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return transformers.pipeline("text-generation", model=model, tokenizer=tokenizer)
+
+
+@backend("onnx")
+def load_onnx(model_id):
+    transformers = lazy_import("transformers")
+    try:
+        onnxruntime = lazy_import("optimum.onnxruntime")
+    except ImportError as e:
+        raise ImportError("The onnx backend needs optimum: pip install optimum[onnxruntime]") from e
+    # Export once and reuse the graph on later starts
+    export_dir = os.path.join(config.DATA_DIR, "onnx", model_id.replace("/", "--"))
+    if os.path.isdir(export_dir):
+        model = onnxruntime.ORTModelForCausalLM.from_pretrained(export_dir)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(export_dir)
+    else:
+        model = onnxruntime.ORTModelForCausalLM.from_pretrained(model_id, export=True)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(model_id)
+        model.save_pretrained(export_dir)
+        tokenizer.save_pretrained(export_dir)
+    return transformers.pipeline("text-generation", model=model, tokenizer=tokenizer)
+
+
+class StubGenerator:
+    """Stands in for the pipeline: sleeps for the tokens a real model would generate"""
+
+    tokenizer = None
+
+    def __init__(self, ms_per_token):
+        self.seconds_per_token = ms_per_token / 1000
+
+    def __call__(self, prompts, batch_size=None, **params):
+        single = isinstance(prompts, str)
+        prompts = [prompts] if single else list(prompts)
+        tokens = params.get("max_new_tokens") or params.get("max_length", 50)
+        # One forward pass serves the whole batch, as it does for the real model
+        time.sleep(tokens * self.seconds_per_token)
+        echo = params.get("return_full_text", True)
+        outputs = [[{"generated_text": (prompt if echo else "") + " This is placeholder text from the stub model."}]
+                   * params.get("num_return_sequences", 1) for prompt in prompts]
+        return outputs[0] if single else outputs
+
+
+@backend("stub")
+def load_stub(model_id):
+    return StubGenerator(config.STUB_MS_PER_TOKEN)
+
+
+def _conv1d_to_linear(model):
+    """Swap transformers' Conv1D layers for equivalent nn.Linear layers in place"""
+    torch = lazy_import("torch")
+    Conv1D = lazy_import("transformers.pytorch_utils").Conv1D
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                n_in, n_out = child.weight.shape
+                linear = torch.nn.Linear(n_in, n_out)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(parent, name, linear)
+
+
+def resident_memory_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        # Not Linux: fall back to the peak, which is the best portable number
+        resource = lazy_import("resource")
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def measure(name, model_id=None, prompts=None, new_tokens=64):
+    """Load one backend and report load time, tokens/sec and resident memory"""
+    model_id = model_id or config.MODEL_ID
+    prompts = prompts or ["Explain photosynthesis in simple terms:",
+                          "Explain quantum physics in detailed terms:"]
+    rss_before = resident_memory_mb()
+    started = time.perf_counter()
+    generator = load(name, model_id)
+    load_seconds = time.perf_counter() - started
+
+    tokenizer = generator.tokenizer
+    generated = 0
+    started = time.perf_counter()
+    for prompt in prompts:
+        if tokenizer is None:
+            # The stub has no tokens to count; it always takes its full budget
+            generator(prompt, max_new_tokens=new_tokens)
+            generated += new_tokens
+            continue
+        inputs = tokenizer(prompt, return_tensors="pt")
+        output = generator.model.generate(**inputs, do_sample=False, max_new_tokens=new_tokens,
+                                          min_new_tokens=new_tokens,
+                                          pad_token_id=tokenizer.eos_token_id)
+        generated += output.shape[-1] - inputs["input_ids"].shape[-1]
+    generate_seconds = time.perf_counter() - started
+
+    return {
+        "backend": name,
+        "model": model_id,
+        "load_seconds": round(load_seconds, 3),
+        "tokens_per_second": round(generated / generate_seconds, 2),
+        "resident_mb": round(resident_memory_mb(), 1),
+        "model_mb": round(resident_memory_mb() - rss_before, 1),
+    }
+
+
+def compare(names, model_id=None):
+    """Measure each backend in its own process"""
+    results = []
+    for name in names:
+        args = [sys.executable, "-m", "aceai.backends", "--measure", name]
+        if model_id:
+            args += ["--model", model_id]
+        proc = subprocess.run(args, capture_output=True, text=True)
+        if proc.returncode == 0:
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        else:
+            results.append({"backend": name, "error": proc.stderr.strip().splitlines()[-1:]})
+    return results
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare explainer model backends")
+    # The stub only stands in for a model in load tests, so it is not compared by default
+    parser.add_argument("backends", nargs="*", default=[name for name in BACKENDS if name != "stub"])
+    parser.add_argument("--model", default=None, help="Hugging Face model id (default: ACEAI_MODEL_ID)")
+    parser.add_argument("--measure", metavar="BACKEND", help="measure one backend in this process")
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.model)))
+    else:
+        print(json.dumps(compare(args.backends, args.model), indent=2))
+
+
+if __name__ == "__main__":
+    main()
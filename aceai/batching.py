@@ -0,0 +1,137 @@
+"""Micro-batching scheduler for the shared text-generation pipeline.
+
+Every Streamlit session submits its prompt here instead of calling the
+pipeline directly. A single worker thread collects prompts for up to
+`max_wait_ms` (or until `max_batch_size` are waiting), pads them and runs them
+through the model as one forward pass. Callers get a Future back.
+
+Requests are grouped by their settings, which must be JSON-serialisable.
+`prepare(model, params)` turns a group's settings into the keyword arguments
+of the pipeline call, for settings that need live objects such as logits
+processors.
+
+`close()` stops the worker once the prompts already queued have been run.
+"""
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from aceai import metrics
+
+# Queued by close(); the worker stops after the requests ahead of it
+_CLOSE = object()
+
+
+class _Request:
+    __slots__ = ("prompt", "params", "future", "enqueued")
+
+    def __init__(self, prompt, params):
+        self.prompt = prompt
+        self.params = params
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class BatchingGenerator:
+    """Queue prompts from all sessions and run them through the model in batches"""
+
+    def __init__(self, get_model, max_batch_size=8, max_wait_ms=50, prepare=None):
+        self.get_model = get_model
+        self.prepare = prepare or (lambda model, params: params)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = {"requests": 0, "batches": 0, "largest_batch": 0}
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="explainer-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt, **params):
+        """Queue one prompt; the Future resolves to the pipeline's output for it"""
+        request = _Request(prompt, params)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("batching generator is closed")
+            self._queue.put(request)
+        return request.future
+
+    def close(self, timeout=None):
+        """Stop taking prompts and wait for the ones already queued to be generated"""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_CLOSE)
+        self._worker.join(timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch, closing = self._collect()
+            if metrics.ENABLED:
+                queued = metrics.MODEL_SECONDS.labels("batch", "queue")
+                started = time.perf_counter()
+                for request in batch:
+                    queued.observe(started - request.enqueued)
+            # Requests can only be batched together when they use the same settings
+            groups = {}
+            for request in batch:
+                if request.future.set_running_or_notify_cancel():
+                    key = json.dumps(request.params, sort_keys=True)
+                    groups.setdefault(key, []).append(request)
+            for requests in groups.values():
+                self._generate(requests)
+
+    def _collect(self):
+        """(requests for the next batch, whether close() was called)"""
+        request = self._queue.get()
+        if request is _CLOSE:
+            return [], True
+        batch = [request]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _CLOSE:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _generate(self, requests):
+        try:
+            model = self.get_model()
+            if model is None:
+                raise RuntimeError("text generation model is not loaded")
+            # Identical prompts in the same batch are generated once
+            prompts = list(dict.fromkeys(request.prompt for request in requests))
+            _enable_padding(model)
+            outputs = model(prompts, batch_size=len(prompts), **self.prepare(model, requests[0].params))
+            by_prompt = dict(zip(prompts, outputs))
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        self.stats["requests"] += len(requests)
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(prompts))
+        for request in requests:
+            request.future.set_result(by_prompt[request.prompt])
+
+
+def _enable_padding(model):
+    """GPT-2 has no pad token; pad on the left with EOS so prompts line up for generation"""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None and tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+        tokenizer.padding_side = "left"
+        model.model.config.pad_token_id = tokenizer.eos_token_id
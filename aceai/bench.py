@@ -0,0 +1,353 @@
+"""Headless benchmarks for AceAi's hot paths.
+
+Every benchmark runs in a fresh Python process, so import times are cold and
+memory numbers belong to that benchmark alone. Nothing needs a browser or a
+webcam: the app is driven through Streamlit's AppTest, and the Focus Monitor
+gets synthetic frames (or frames from a recorded video with --video).
+
+    python -m aceai.bench                          # everything, JSON to stdout
+    python -m aceai.bench planner flashcards -o now.json
+    python -m aceai.bench --baseline base.json     # exit 1 on a regression
+
+Metric names say which way is better: `*_per_second` should go up;
+`*_seconds`, `*_ms` and `*_mb` should go down. Anything else, such as a
+count, is reported but never compared.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from aceai import config
+from aceai.backends import resident_memory_mb
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register `fn(options) -> {metric: value}`"""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def timed(fn, repeat):
+    """Median wall time of `repeat` calls, and the last result"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+@benchmark("app")
+def bench_app(options):
+    """Cold start of app.py (imports plus the first Home page run) and a warm rerun"""
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    streamlit_seconds = time.perf_counter() - started
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    started = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    rerun, _ = timed(at.run, options["repeat"])
+    return {
+        "streamlit_import_seconds": round(streamlit_seconds, 4),
+        "app_cold_run_seconds": round(first_run, 4),
+        "app_rerun_seconds": round(rerun, 4),
+        "resident_mb": round(resident_memory_mb(), 1),
+    }
+
+
+@benchmark("model_load")
+def bench_model_load(options):
+    """What load_ai_models() waits for: building the explainer pipeline"""
+    from aceai.models import load_text_generator
+
+    before = resident_memory_mb()
+    started = time.perf_counter()
+    load_text_generator()
+    return {
+        "load_seconds": round(time.perf_counter() - started, 3),
+        "model_mb": round(resident_memory_mb() - before, 1),
+        "resident_mb": round(resident_memory_mb(), 1),
+    }
+
+
+@benchmark("explainer")
+def bench_explainer(options):
+    """Latency and tokens/sec of an explanation at each level, called the way the app calls the model"""
+    from aceai.generation import LEVEL_TOKENS, explainer_params, explainer_prompt, finish, pipeline_kwargs
+    from aceai.models import load_text_generator
+
+    generator = load_text_generator()
+    tokenizer = generator.tokenizer
+    results = {}
+    for level in LEVEL_TOKENS:
+        prompt = explainer_prompt("photosynthesis", level)
+        params = explainer_params(level)
+
+        def generate():
+            # The decoding policy keeps per-call state, so every call gets fresh arguments
+            result = generator(prompt, **pipeline_kwargs(generator, params))
+            return result[0]["generated_text"]
+
+        generate()  # first call pays for lazy kernel setup
+        seconds, text = timed(generate, options["repeat"])
+        # Early stops make the length vary; the stub backend always produces the whole budget
+        generated = params["max_new_tokens"] if tokenizer is None else len(tokenizer(text)["input_ids"])
+        label = level.lower()
+        if tokenizer is not None:
+            results[f"{label}_prompt_tokens"] = len(tokenizer(prompt)["input_ids"])
+        results[f"{label}_new_tokens"] = generated
+        results[f"{label}_latency_seconds"] = round(seconds, 4)
+        results[f"{label}_tokens_per_second"] = round(generated / seconds, 2)
+        results[f"{label}_finished_chars"] = len(finish(text))
+    return results
+
+
+def synthetic_frames(width, height, count):
+    """A face-like blob drifting over a textured background, as BGR frames"""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    size = height // 3
+    for i in range(count):
+        img = background.copy()
+        cx = int(width / 2 + width / 6 * np.sin(i / 15))
+        cy = int(height / 2 + height / 10 * np.cos(i / 20))
+        cv2.ellipse(img, (cx, cy), (size // 2, int(size * 0.65)), 0, 0, 360, (150, 180, 220), -1)
+        for dx in (-size // 5, size // 5):
+            cv2.circle(img, (cx + dx, cy - size // 8), max(2, size // 14), (40, 40, 40), -1)
+        cv2.ellipse(img, (cx, cy + size // 4), (size // 6, size // 16), 0, 0, 180, (60, 60, 120), -1)
+        yield img
+
+
+def video_frames(path, width, height, count):
+    """Frames of a recorded video, resized, looping if the video is short"""
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    produced = 0
+    while produced < count:
+        ok, img = capture.read()
+        if not ok:
+            if produced == 0:
+                raise IOError(f"Could not read frames from {path}")
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        produced += 1
+        yield cv2.resize(img, (width, height))
+    capture.release()
+
+
+@benchmark("focus")
+def bench_focus(options):
+    """SimpleFocusProcessor.recv throughput at several resolutions, analysing every frame"""
+    import av
+
+    from aceai.focus import SimpleFocusProcessor, get_face_cascade
+
+    get_face_cascade()
+    results = {}
+    for width, height in ((320, 240), (640, 480), (1280, 720)):
+        count = options["frames"]
+        if options["video"]:
+            images = list(video_frames(options["video"], width, height, count))
+        else:
+            images = list(synthetic_frames(width, height, count))
+        frames = [av.VideoFrame.from_ndarray(img, format="bgr24") for img in images]
+        # max_skip=0 analyses every frame, so this measures the full per-frame cost
+        processor = SimpleFocusProcessor(max_skip=0)
+        latencies = []
+        started = time.perf_counter()
+        for frame in frames:
+            t = time.perf_counter()
+            processor.recv(frame)
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        label = f"{width}x{height}"
+        results[f"{label}_frames_per_second"] = round(len(frames) / elapsed, 1)
+        results[f"{label}_p95_ms"] = round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 3)
+        results[f"{label}_full_detections"] = processor.full_detections
+    return results
+
+
+def synthetic_notes(kilobytes):
+    """Deterministic study notes with headings, abbreviations and repeated facts"""
+    import random
+
+    rng = random.Random(0)
+    subjects = ["The mitochondrion", "Newton's second law", "A covalent bond", "The French Revolution",
+                "Photosynthesis", "An enzyme", "The quadratic formula", "Plate tectonics"]
+    verbs = ["describes", "explains", "is defined as", "depends on", "produces", "involves"]
+    objects = ["the transfer of energy between systems", "the rate of a chemical reaction",
+               "the relationship between force and acceleration", "e.g. the movement of ions",
+               "the sharing of electron pairs between atoms", "a change in social structure",
+               "the conversion of light into chemical energy", "roots of a second-degree polynomial"]
+    parts = []
+    size = 0
+    while size < kilobytes * 1024:
+        if rng.random() < 0.05:
+            line = f"\n## {rng.choice(subjects)}\n"
+        else:
+            line = (f"{rng.choice(subjects)} {rng.choice(verbs)} {rng.choice(objects)}, "
+                    f"as shown by Dr. Smith in lecture {rng.randint(1, 40)}. ")
+        parts.append(line)
+        size += len(line)
+    return "".join(parts)
+
+
+@benchmark("flashcards")
+def bench_flashcards(options):
+    """Extracting every card from a large set of notes"""
+    from aceai.flashcards import flashcards
+
+    notes = synthetic_notes(options["notes_kb"])
+    seconds, cards = timed(lambda: list(flashcards(notes)), options["repeat"])
+    return {
+        "notes_kb": options["notes_kb"],
+        "extract_seconds": round(seconds, 4),
+        "kb_per_second": round(options["notes_kb"] / seconds, 1),
+        "cards": len(cards),
+    }
+
+
+@benchmark("planner")
+def bench_planner(options):
+    """Planning a term, and replanning after one day changes"""
+    from aceai.planner import StudyPlan
+
+    start = date(2025, 1, 6)
+    results = {}
+    for label, subjects, days in (("typical", 6, 30), ("large", 40, 180)):
+        names = [f"Subject {i}" for i in range(subjects)]
+        weights = [1 + i % 3 for i in range(subjects)]
+
+        def plan():
+            return StudyPlan(names, start, start + timedelta(days=days), 4, weights=weights)
+
+        seconds, study_plan = timed(plan, options["repeat"])
+        results[f"{label}_plan_seconds"] = round(seconds, 5)
+        replan, _ = timed(lambda: study_plan.set_day(days // 2, 0), options["repeat"])
+        results[f"{label}_replan_seconds"] = round(replan, 5)
+        calendar, _ = timed(study_plan.calendar, options["repeat"])
+        results[f"{label}_calendar_seconds"] = round(calendar, 5)
+    return results
+
+
+def run_isolated(name, options):
+    """Run one benchmark in a fresh process"""
+    args = [sys.executable, "-m", "aceai.bench", "--run", name, "--options", json.dumps(options)]
+    proc = subprocess.run(args, capture_output=True, text=True)
+    if proc.returncode == 0:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    return {"error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+
+
+def direction(metric):
+    """+1 if bigger is better, -1 if smaller is better, 0 if the metric is not compared"""
+    if metric.endswith("_per_second"):
+        return 1
+    if metric.endswith(("_seconds", "_ms", "_mb")):
+        return -1
+    return 0
+
+
+def compare(results, baseline, threshold, thresholds=None):
+    """Every metric that got worse than the baseline by more than its threshold"""
+    thresholds = thresholds or {}
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            sign = direction(metric)
+            if not sign or not isinstance(old, (int, float)) or not isinstance(value, (int, float)) or old <= 0:
+                continue
+            change = (value - old) / old
+            limit = thresholds.get(f"{name}.{metric}", thresholds.get(name, threshold))
+            if -sign * change > limit:
+                regressions.append({"benchmark": name, "metric": metric, "baseline": old,
+                                    "value": value, "change": round(change, 3)})
+    return regressions
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark AceAi's hot paths")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help=f"any of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("-o", "--output", help="write the results JSON here as well as to stdout")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument("--limit", action="append", default=[], metavar="NAME[.METRIC]=FRACTION",
+                        help="per-benchmark or per-metric threshold, e.g. focus=0.3")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--frames", type=int, default=150, help="frames per resolution for focus")
+    parser.add_argument("--video", help="recorded video to use instead of synthetic frames")
+    parser.add_argument("--notes-kb", type=int, default=512, help="size of the notes for flashcards")
+    parser.add_argument("--run", metavar="NAME", help=argparse.SUPPRESS)
+    parser.add_argument("--options", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        print(json.dumps(BENCHMARKS[args.run](json.loads(args.options))))
+        return 0
+
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(sorted(unknown))}")
+
+    options = {"repeat": args.repeat, "frames": args.frames, "video": args.video,
+               "notes_kb": args.notes_kb}
+    results = {name: run_isolated(name, options) for name in args.benchmarks or BENCHMARKS}
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": config.MODEL_ID,
+            "backend": config.MODEL_BACKEND,
+            "options": options,
+        },
+        "results": results,
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        limits = dict(item.split("=", 1) for item in args.limit)
+        report["regressions"] = compare(results, baseline, args.threshold,
+                                        {key: float(value) for key, value in limits.items()})
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if any("error" in metrics for metrics in results.values()):
+        status = status or 2
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Runtime settings, read from ACEAI_* environment variables"""
+import os
+
+DATA_DIR = os.environ.get("ACEAI_DATA_DIR", ".aceai")
+
+# Explanation cache
+CACHE_PATH = os.environ.get("ACEAI_CACHE_PATH", os.path.join(DATA_DIR, "explanations.sqlite3"))
+CACHE_MEMORY_ITEMS = int(os.environ.get("ACEAI_CACHE_MEMORY_ITEMS", "512"))
+CACHE_DISK_ITEMS = int(os.environ.get("ACEAI_CACHE_DISK_ITEMS", "50000"))
+CACHE_TTL_SECONDS = float(os.environ.get("ACEAI_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Cross-session batching of explainer prompts; only used when explainer streaming is off
+BATCH_MAX_SIZE = int(os.environ.get("ACEAI_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("ACEAI_BATCH_MAX_WAIT_MS", "50"))
+
+# Stream explainer tokens to the page as they are generated. Each streamed explanation runs on
+# its own, bypassing the batcher; set to 0 to batch prompts from concurrent sessions instead
+EXPLAINER_STREAMING = os.environ.get("ACEAI_EXPLAINER_STREAMING", "1") == "1"
+
+# Explainer model and CPU inference backend: fp32, int8 or onnx (see aceai/backends.py)
+MODEL_ID = os.environ.get("ACEAI_MODEL_ID", "gpt2")
+MODEL_BACKEND = os.environ.get("ACEAI_MODEL_BACKEND", "fp32")
+# Seed of the explainer's sampling; the same request always gets the same text (see aceai/generation.py)
+GENERATION_SEED = int(os.environ.get("ACEAI_GENERATION_SEED", "0"))
+# Simulated generation speed of the `stub` backend used by load tests
+STUB_MS_PER_TOKEN = float(os.environ.get("ACEAI_STUB_MS_PER_TOKEN", "25"))
+
+# Focus Monitor face detection runs on a downscaled copy of each frame
+FOCUS_DETECT_WIDTH = int(os.environ.get("ACEAI_FOCUS_DETECT_WIDTH", "320"))
+FOCUS_MIN_FACE_PX = int(os.environ.get("ACEAI_FOCUS_MIN_FACE_PX", "60"))
+
+# Full detection every N analysed frames, ROI-restricted search in between
+FOCUS_DETECT_EVERY = int(os.environ.get("ACEAI_FOCUS_DETECT_EVERY", "5"))
+# Frame rate the analysis has to keep up with before it starts skipping frames
+FOCUS_TARGET_FPS = float(os.environ.get("ACEAI_FOCUS_TARGET_FPS", "30"))
+FOCUS_MAX_SKIP = int(os.environ.get("ACEAI_FOCUS_MAX_SKIP", "5"))
+
+# How often the live Focus Monitor figures and the progress dashboard refresh themselves
+FOCUS_POLL_SECONDS = float(os.environ.get("ACEAI_FOCUS_POLL_SECONDS", "1"))
+DASHBOARD_POLL_SECONDS = float(os.environ.get("ACEAI_DASHBOARD_POLL_SECONDS", "10"))
+
+# Worker processes shared by every Focus Monitor stream (0 analyses in each stream's own thread)
+FOCUS_POOL_WORKERS = int(os.environ.get("ACEAI_FOCUS_POOL_WORKERS", str(os.cpu_count() or 1)))
+
+# Focus telemetry: raw samples kept per stream, how often they are downsampled to disk, and how
+# many seconds of downsampled rows each session keeps in memory (the dashboard reads the rest from disk)
+TELEMETRY_PATH = os.environ.get("ACEAI_TELEMETRY_PATH", os.path.join(DATA_DIR, "focus.sqlite3"))
+TELEMETRY_RAW_SECONDS = int(os.environ.get("ACEAI_TELEMETRY_RAW_SECONDS", "60"))
+TELEMETRY_FLUSH_SECONDS = float(os.environ.get("ACEAI_TELEMETRY_FLUSH_SECONDS", "10"))
+TELEMETRY_HISTORY_SECONDS = int(os.environ.get("ACEAI_TELEMETRY_HISTORY_SECONDS", "900"))
+
+# Per-session resources (see aceai/sessions.py): session state cap, model requests a session can
+# wait on at once, live Focus Monitor streams per replica, and when idle streams and sessions are reclaimed
+SESSION_MAX_STATE_MB = float(os.environ.get("ACEAI_SESSION_MAX_STATE_MB", "64"))
+SESSION_MAX_PENDING = int(os.environ.get("ACEAI_SESSION_MAX_PENDING", "1"))
+SESSION_MAX_STREAMS = int(os.environ.get("ACEAI_SESSION_MAX_STREAMS", "32"))
+SESSION_STREAM_IDLE_SECONDS = float(os.environ.get("ACEAI_SESSION_STREAM_IDLE_SECONDS", "120"))
+SESSION_IDLE_SECONDS = float(os.environ.get("ACEAI_SESSION_IDLE_SECONDS", "1800"))
+SESSION_REAP_SECONDS = float(os.environ.get("ACEAI_SESSION_REAP_SECONDS", "15"))
+
+# Per-user progress counters
+PROGRESS_PATH = os.environ.get("ACEAI_PROGRESS_PATH", os.path.join(DATA_DIR, "progress.sqlite3"))
+PROGRESS_FLUSH_SECONDS = float(os.environ.get("ACEAI_PROGRESS_FLUSH_SECONDS", "5"))
+PROGRESS_CACHE_SECONDS = float(os.environ.get("ACEAI_PROGRESS_CACHE_SECONDS", "30"))
+PROGRESS_CACHE_USERS = int(os.environ.get("ACEAI_PROGRESS_CACHE_USERS", "10000"))
+
+# Canned explanations and practice questions (explanations.json, questions.json)
+CONTENT_DIR = os.environ.get("ACEAI_CONTENT_DIR", os.path.join(os.path.dirname(__file__), "data"))
+
+# Local retrieval over study material (.txt/.md files in the corpus directory)
+CORPUS_DIR = os.environ.get("ACEAI_CORPUS_DIR", os.path.join(DATA_DIR, "corpus"))
+RETRIEVAL_INDEX_DIR = os.environ.get("ACEAI_RETRIEVAL_INDEX_DIR", os.path.join(DATA_DIR, "retrieval"))
+RETRIEVAL_MIN_SCORE = float(os.environ.get("ACEAI_RETRIEVAL_MIN_SCORE", "1.0"))
+
+# Spaced-repetition decks
+SRS_PATH = os.environ.get("ACEAI_SRS_PATH", os.path.join(DATA_DIR, "srs.sqlite3"))
+
+# Practice question bank, seeded from question_bank.csv in the content directory
+QUESTION_BANK_PATH = os.environ.get("ACEAI_QUESTION_BANK_PATH", os.path.join(DATA_DIR, "questions.sqlite3"))
+# How often practice sets check for questions imported by another process
+QUESTION_BANK_REFRESH_SECONDS = float(os.environ.get("ACEAI_QUESTION_BANK_REFRESH_SECONDS", "10"))
+
+# Explanations and practice sets generated ahead of time by `python -m aceai.pregenerate`
+PREGENERATED_PATH = os.environ.get("ACEAI_PREGENERATED_PATH", os.path.join(DATA_DIR, "pregenerated.bin"))
+
+# Metrics: histograms and counters served at http://METRICS_HOST:METRICS_PORT/metrics
+METRICS = os.environ.get("ACEAI_METRICS", "0") == "1"
+METRICS_HOST = os.environ.get("ACEAI_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("ACEAI_METRICS_PORT", "9464"))
+# Show a metrics summary in the sidebar
+METRICS_ADMIN = os.environ.get("ACEAI_METRICS_ADMIN", "0") == "1"
@@ -0,0 +1,180 @@
+"""Canned explanations and practice questions with fuzzy topic lookup.
+
+The content lives in JSON files (aceai/data by default) and is loaded once
+per process. Topic names are indexed up front: normalized exact keys, the
+same keys without filler words, a sorted list for prefix matches and a
+trigram posting list for approximate matches. "Quantum Physics ", "what is
+photosynthesis", "photosynth" and "photosynthesys" all find their canned
+entry without going anywhere near the model. A query only matches a topic as
+a whole: "deep learning", "linear algebra" or "history of physics" are other
+topics, not misspellings of "machine learning", "algebra" or "physics".
+"""
+import bisect
+import json
+import math
+import os
+import re
+from collections import defaultdict
+
+from aceai.gen_cache import normalize_topic
+
+_punctuation = re.compile(r"[^\w\s]")
+
+# Words that do not change which topic is meant ("the basics of photosynthesis")
+FILLER_WORDS = frozenset((
+    "a", "an", "the", "of", "to", "in", "on", "about", "what", "is", "are", "how", "does",
+    "explain", "explained", "introduction", "intro", "basics", "basic", "overview", "process",
+))
+
+
+def normalize(topic):
+    return normalize_topic(_punctuation.sub(" ", topic))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def core_words(name):
+    """The words of a normalized name without filler, or all of them if that leaves none"""
+    words = name.split()
+    return tuple(word for word in words if word not in FILLER_WORDS) or tuple(words)
+
+
+def allowed_edits(word):
+    """Typos tolerated in a word of this length: none below 4 letters, two from 9"""
+    return 0 if len(word) < 4 else 1 if len(word) < 9 else 2
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (a swap counts as one edit), or limit + 1 if larger"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, row = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, row = previous, row, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            row[j] = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], before[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+    return row[-1]
+
+
+class TopicIndex:
+    """Approximate lookup of a query against a fixed set of topic names"""
+
+    # Memoized lookups across all indexes, for the metrics
+    stats = {"hit": 0, "miss": 0}
+
+    def __init__(self, topics, min_similarity=0.5, min_prefix=4, max_memo=8192):
+        self.topics = list(topics)
+        self.min_similarity = min_similarity
+        self.min_prefix = min_prefix
+        self.max_memo = max_memo
+        # Popular topics repeat across students; the index never changes, so results can be kept
+        self._memo = {}
+
+        names = [normalize(topic) for topic in self.topics]
+        self._exact = {name: i for i, name in enumerate(names)}
+        self._sorted = sorted(self._exact)
+        self._cores = [core_words(name) for name in names]
+        self._exact_core = {}
+        for i, core in enumerate(self._cores):
+            self._exact_core.setdefault(" ".join(core), i)
+        self._grams = []
+        self._postings = defaultdict(list)
+        for i, core in enumerate(self._cores):
+            grams = frozenset(trigrams(" ".join(core)))
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings[gram].append(i)
+
+    def match(self, query):
+        """Return the best matching topic, or None"""
+        name = normalize(query)
+        if name in self._memo:
+            TopicIndex.stats["hit"] += 1
+            return self._memo[name]
+        TopicIndex.stats["miss"] += 1
+        topic = self._match(name)
+        if len(self._memo) < self.max_memo:
+            self._memo[name] = topic
+        return topic
+
+    def _match(self, name):
+        if not name:
+            return None
+        if name in self._exact:
+            return self.topics[self._exact[name]]
+
+        # The topic with filler around it ("the basics of photosynthesis")
+        core = core_words(name)
+        key = " ".join(core)
+        if key in self._exact_core:
+            return self.topics[self._exact_core[key]]
+
+        # A known topic typed as a prefix ("photosynth")
+        if len(name) >= self.min_prefix:
+            k = bisect.bisect_left(self._sorted, name)
+            if k < len(self._sorted) and self._sorted[k].startswith(name):
+                return self.topics[self._exact[self._sorted[k]]]
+
+        # Spelling variants. Trigram Dice similarity picks the candidates: any topic
+        # reaching the threshold shares at least `needed` trigrams with the query, so it
+        # must appear among the postings of the rarest len - needed + 1. A candidate
+        # only matches if it has the same words, each within a few typos.
+        grams = trigrams(key)
+        s = self.min_similarity
+        needed = math.ceil(s * len(grams) / (2 - s))
+        rare = sorted(grams, key=lambda gram: len(self._postings.get(gram, ())))
+        candidates = set()
+        for gram in rare[:len(grams) - needed + 1]:
+            candidates.update(self._postings.get(gram, ()))
+
+        best, best_edits = None, None
+        for i in candidates:
+            if len(self._cores[i]) != len(core):
+                continue
+            edits = 0
+            for typed, known in zip(core, self._cores[i]):
+                limit = allowed_edits(known)
+                distance = edit_distance(typed, known, limit)
+                if distance > limit:
+                    break
+                edits += distance
+            else:
+                if best is None or (edits, i) < (best_edits, best):
+                    best, best_edits = i, edits
+        return None if best is None else self.topics[best]
+
+
+class ContentStore:
+    """Explanations by level and practice questions, keyed by topic"""
+
+    def __init__(self, explanations, questions):
+        self.explanations = explanations
+        self.questions_by_topic = questions
+        self._explanation_index = TopicIndex(explanations)
+        self._question_index = TopicIndex(questions)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "explanations.json"), encoding="utf-8") as f:
+            explanations = json.load(f)
+        with open(os.path.join(directory, "questions.json"), encoding="utf-8") as f:
+            questions = json.load(f)
+        return cls(explanations, questions)
+
+    def explanation(self, topic):
+        """{level: text} for the closest known topic, or None"""
+        match = self._explanation_index.match(topic)
+        return None if match is None else self.explanations[match]
+
+    def questions(self, topic):
+        """Practice questions for the closest known topic, or None"""
+        match = self._question_index.match(topic)
+        return None if match is None else self.questions_by_topic[match]
@@ -0,0 +1,202 @@
+"""Streaming notes-to-flashcards pipeline.
+
+Every stage is a generator, so notes of any size are read, split, filtered
+and turned into cards a piece at a time:
+
+    chunks (text / .txt / .md / .pdf)  ->  sentences  ->  substantial,
+    not near-duplicates  ->  cards
+
+Near-duplicates are found with small MinHash sketches and a banded lookup
+table. The table is bounded too, so memory stays flat however long the
+notes are.
+"""
+import codecs
+import re
+from collections import deque
+
+import numpy as np
+
+CHUNK_SIZE = 64 * 1024
+
+# Words that end with a period without ending the sentence
+ABBREVIATIONS = frozenset(
+    "e.g i.e etc vs dr mr mrs ms prof fig figs eq eqs no approx st jr sr cf al ca resp dept est".split()
+)
+
+_boundary = re.compile(
+    r"[.!?]+[\"')\]]*(?=\s)"                  # end of sentence
+    r"|\n[ \t]*\n"                             # blank line
+    r"|\n(?=[ \t]*(?:[-*+•>#]|\d+[.)])\s)"     # before a list item, quote or heading
+    r"|(?m:^[ \t]*#+[^\n]*\n)"                  # after a heading
+)
+_markup = re.compile(r"^\s*(?:#+|[-*+•>]|\d+[.)])\s+|\*\*|__|`")
+_space = re.compile(r"\s+")
+_word = re.compile(r"\w+")
+
+
+def read_chunks(source, name="", chunk_size=CHUNK_SIZE):
+    """Yield text from a string or a binary/text file object, a chunk at a time"""
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+    if name.lower().endswith(".pdf"):
+        yield from _pdf_pages(source)
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        block = source.read(chunk_size)
+        if not block:
+            break
+        yield decoder.decode(block) if isinstance(block, bytes) else block
+    yield decoder.decode(b"", final=True)
+
+
+def _pdf_pages(source):
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("Reading PDF notes needs pypdf: pip install pypdf") from e
+    for page in PdfReader(source).pages:
+        yield (page.extract_text() or "") + "\n\n"
+
+
+def sentences(chunks, max_chars=4000):
+    """Split streamed text into sentences, keeping decimals and abbreviations intact"""
+    carry = ""
+    for chunk in chunks:
+        text = carry + chunk
+        start = 0
+        for match in _boundary.finditer(text):
+            end = match.end()
+            if match.group().startswith(".") and not _ends_sentence(text, match.start()):
+                continue
+            yield from _clean(text[start:end])
+            start = end
+        carry = text[start:]
+        # A run of text with no boundary at all must not grow without limit
+        while len(carry) > max_chars:
+            yield from _clean(carry[:max_chars])
+            carry = carry[max_chars:]
+    yield from _clean(carry)
+
+
+def _ends_sentence(text, dot):
+    """False for the period of an abbreviation ("e.g.", "Dr.") or an initial ("J.")"""
+    word = text[max(0, dot - 12):dot].rsplit(None, 1)[-1:] or [""]
+    word = word[0].lower().lstrip("([\"'")
+    return not (word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()))
+
+
+def _clean(sentence):
+    sentence = _space.sub(" ", _markup.sub("", sentence)).strip()
+    if sentence:
+        yield sentence
+
+
+def substantial(sentences, min_words=4, max_words=60):
+    """Only sentences long enough to make a card, and short enough to read on one"""
+    for sentence in sentences:
+        if min_words <= len(sentence.split()) <= max_words:
+            yield sentence
+
+
+def _mix(x):
+    """splitmix64 finalizer, applied to a whole uint64 array at once"""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+_SEEDS = _mix(np.arange(1, 17, dtype=np.uint64))
+
+
+def minhash(text):
+    """16-value MinHash of a sentence's character 4-grams.
+
+    The share of equal values between two sketches estimates the Jaccard
+    similarity of the sentences' 4-gram sets.
+    """
+    data = " ".join(_word.findall(text.lower())).encode("utf-8").ljust(4)
+    b = np.frombuffer(data, dtype=np.uint8).astype(np.uint64)
+    grams = b[:-3] << np.uint64(24) | b[1:-2] << np.uint64(16) | b[2:-1] << np.uint64(8) | b[3:]
+    # One hash function per seed, all 4-grams at once
+    return _mix(grams[:, None] ^ _SEEDS[None, :]).min(axis=0)
+
+
+class NearDuplicateFilter:
+    """Remembers up to `capacity` sketches and flags sentences that match one closely.
+
+    Sketches are split into bands of `rows` values. Sentences with a high
+    Jaccard similarity almost always agree on a whole band, so only sketches
+    sharing a band are compared. Each band bucket keeps its newest
+    `bucket_size` sketches, which bounds the work per sentence even for very
+    repetitive notes.
+    """
+
+    def __init__(self, min_similarity=0.7, rows=2, capacity=20000, bucket_size=8):
+        self.min_matches = int(np.ceil(min_similarity * len(_SEEDS)))
+        self.rows = rows
+        self.bands = [dict() for _ in range(len(_SEEDS) // rows)]
+        self.capacity = capacity
+        self.bucket_size = bucket_size
+        self._order = deque()
+
+    def _keys(self, sketch):
+        return [sketch[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(len(self.bands))]
+
+    def seen(self, sketch):
+        """True if a near-identical sketch was added before; otherwise remember this one"""
+        keys = self._keys(sketch)
+        for band, key in zip(self.bands, keys):
+            for other in band.get(key, ()):
+                if np.count_nonzero(sketch == other) >= self.min_matches:
+                    return True
+        for band, key in zip(self.bands, keys):
+            if key not in band:
+                band[key] = deque(maxlen=self.bucket_size)
+            band[key].append(sketch)
+        self._order.append(sketch)
+        if len(self._order) > self.capacity:
+            self._forget(self._order.popleft())
+        return False
+
+    def _forget(self, sketch):
+        for band, key in zip(self.bands, self._keys(sketch)):
+            bucket = band.get(key)
+            if bucket is None:
+                continue
+            for i, other in enumerate(bucket):
+                if other is sketch:
+                    del bucket[i]
+                    break
+            if not bucket:
+                del band[key]
+
+
+def unique(sentences, dedupe=None):
+    dedupe = dedupe or NearDuplicateFilter()
+    for sentence in sentences:
+        if not dedupe.seen(minhash(sentence)):
+            yield sentence
+
+
+def make_card(sentence):
+    """Question/answer pair for one sentence"""
+    # Create question-answer pairs
+    words = sentence.split()
+    question_word = words[0] if words[0].lower() not in ['the', 'a', 'an'] else words[1]
+    return {
+        "question": f"What is {question_word.lower()} or explain: {sentence[:50]}...?",
+        "answer": sentence,
+    }
+
+
+def flashcards(source, name="", max_cards=None):
+    """Yield cards from notes (a string or an uploaded file) as they are found"""
+    stream = unique(substantial(sentences(read_chunks(source, name))))
+    for i, sentence in enumerate(stream):
+        if max_cards is not None and i >= max_cards:
+            return
+        yield make_card(sentence)
@@ -0,0 +1,300 @@
+"""Webcam focus tracking for the Focus Monitor page.
+
+Full-frame face detection only runs every `detect_every` frames, or as soon
+as the face is lost. In between, the cascade only searches a window around
+the last known face. If analysis costs more than the frame budget, the
+processor skips analysing the next few frames. Those frames are still
+returned with the last overlay.
+
+With a shared `FocusAnalysisPool` (aceai/focus_pool.py) the detection itself
+runs in a worker process. The stream keeps drawing the latest result while a
+frame is being analysed and picks up the new result on a later frame. While
+the pool restarts workers that died, frames are analysed in the stream.
+
+A processor is closed when its stream ends, or early by the session manager
+(aceai/sessions.py) when the stream sits idle. It then leaves the pool and
+passes frames through untouched.
+"""
+import threading
+import time
+import weakref
+from concurrent.futures.process import BrokenProcessPool
+
+import av
+import cv2
+
+from aceai import config, metrics
+
+CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+_cascades = threading.local()
+
+
+def get_face_cascade(path=CASCADE_PATH):
+    """Parse the Haar cascade XML once per thread.
+
+    A CascadeClassifier is not safe to use from several threads at once, and
+    every stream's frames arrive on their own thread.
+    """
+    loaded = getattr(_cascades, "loaded", None)
+    if loaded is None:
+        loaded = _cascades.loaded = {}
+    cascade = loaded.get(path)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(path)
+        if cascade.empty():
+            raise IOError(f"Could not load face cascade from {path}")
+        loaded[path] = cascade
+    return cascade
+
+
+def detect_faces(img, detect_width=None, min_face_px=None, roi=None):
+    """Find faces on a downscaled grayscale copy of a BGR frame.
+
+    `roi` is an optional (x, y, w, h) window to search instead of the whole
+    frame. Boxes are returned as (x, y, w, h) in full-resolution coordinates.
+    """
+    detect_width = detect_width or config.FOCUS_DETECT_WIDTH
+    min_face_px = min_face_px or config.FOCUS_MIN_FACE_PX
+    h, w = img.shape[:2]
+    # The scale is fixed by the full frame so ROI and full searches agree on face sizes
+    scale = min(1.0, detect_width / w)
+
+    ox, oy = 0, 0
+    if roi is not None:
+        ox, oy, rw, rh = roi
+        img = img[oy:oy + rh, ox:ox + rw]
+        h, w = img.shape[:2]
+    if scale < 1.0:
+        small = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+    else:
+        small = img
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    min_side = max(1, round(min_face_px * scale))
+    faces = get_face_cascade().detectMultiScale(gray, 1.1, 4, minSize=(min_side, min_side))
+    return [(int(round(x / scale)) + ox, int(round(y / scale)) + oy,
+             int(round(fw / scale)), int(round(fh / scale))) for x, y, fw, fh in faces]
+
+
+def search_window(face, frame_shape, margin=0.5):
+    """The last face box grown by `margin` on each side, clipped to the frame"""
+    x, y, w, h = face
+    fh, fw = frame_shape[:2]
+    dx, dy = int(w * margin), int(h * margin)
+    x0, y0 = max(0, x - dx), max(0, y - dy)
+    x1, y1 = min(fw, x + w + dx), min(fh, y + h + dy)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+class SimpleFocusProcessor:
+    def __init__(self, detect_every=None, target_fps=None, max_skip=None, pool=None, telemetry=None):
+        self.focus_state = "CALIBRATING"
+        self.focus_score = 75
+        self.face = None
+        self.detect_every = detect_every or config.FOCUS_DETECT_EVERY
+        self.frame_budget = 1.0 / (target_fps or config.FOCUS_TARGET_FPS)
+        self.max_skip = config.FOCUS_MAX_SKIP if max_skip is None else max_skip
+
+        # Counters are read by the page and by the metrics
+        self.frames = 0
+        self.frames_analyzed = 0
+        self.frames_skipped = 0
+        self.full_detections = 0
+        # CPU time spent on frames in this stream's thread, read by the session manager
+        self.cpu_seconds = 0.0
+
+        self._since_detect = 0
+        self._skip = 0
+        self._unscored = 0
+        self._cost = 0.0
+
+        self.telemetry = telemetry
+        self.pool = pool
+        self._pending = None
+        if pool is not None:
+            self._stream = pool.register()
+            self._unregister = weakref.finalize(self, pool.unregister, self._stream)
+
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def recv(self, frame):
+        with self._lock:
+            if self.closed:
+                # Reclaimed: frames pass through untouched until the stream is torn down
+                return frame
+            if metrics.ENABLED:
+                started = time.perf_counter()
+                skipped = self.frames_skipped
+            cpu_started = time.thread_time()
+            img = frame.to_ndarray(format="bgr24")
+            self.analyze(img)
+            out = av.VideoFrame.from_ndarray(img, format="bgr24")
+            self.cpu_seconds += time.thread_time() - cpu_started
+            if metrics.ENABLED:
+                metrics.FOCUS_RECV_SECONDS.observe(time.perf_counter() - started)
+                metrics.FOCUS_FRAMES.labels("dropped" if self.frames_skipped > skipped else "processed").inc()
+            return out
+
+    def close(self):
+        """Stop analysing, leave the pool and flush telemetry; later frames pass through"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self.pool is not None:
+                self._unregister()
+            if self.telemetry is not None:
+                self.telemetry.flush()
+
+    def on_ended(self):
+        """Called by streamlit-webrtc when the stream stops"""
+        self.close()
+
+    def analyze(self, img):
+        """Update focus state from one BGR frame and draw the overlay on it"""
+        self.frames += 1
+        if self.pool is not None:
+            self._analyze_pooled(img)
+            self.draw(img)
+            return img
+
+        if self._skip > 0:
+            # Behind real time: reuse the last result for this frame
+            self._skip -= 1
+            self._unscored += 1
+            self.frames_skipped += 1
+            self.draw(img)
+            return img
+
+        started = time.perf_counter()
+        self.face = self._locate(img)
+        self._update_focus(img.shape, frames=1 + self._unscored)
+        self._unscored = 0
+        self.frames_analyzed += 1
+
+        # Skip as many frames as the (smoothed) analysis cost overruns the budget
+        self._cost = 0.8 * self._cost + 0.2 * (time.perf_counter() - started)
+        self._skip = min(self.max_skip, int(self._cost / self.frame_budget))
+
+        self.draw(img)
+        return img
+
+    def _locate(self, img):
+        """Last face box, from a full detection or a search around the previous box"""
+        if self.face is not None and self._since_detect < self.detect_every:
+            self._since_detect += 1
+            faces = detect_faces(img, roi=search_window(self.face, img.shape))
+            if faces:
+                return faces[0]
+        # Periodic refresh, or the tracked face was lost
+        self._since_detect = 0
+        self.full_detections += 1
+        faces = detect_faces(img)
+        return faces[0] if faces else None
+
+    def _analyze_pooled(self, img):
+        """Collect a finished pool result, then send the current frame if a slot is free"""
+        self._unscored += 1
+        if self._pending is not None:
+            future, scale, searched = self._pending
+            if not future.done():
+                self.frames_skipped += 1
+                return
+            self._pending = None
+            try:
+                faces = future.result()
+            except Exception:
+                faces = None
+            if faces is not None:
+                if searched and not faces:
+                    # Lost the face: the next frame gets a full detection
+                    self._since_detect = self.detect_every
+                self.face = tuple(int(round(v / scale)) for v in faces[0]) if faces else None
+                self._update_focus(img.shape, frames=self._unscored)
+                self._unscored = 0
+                self.frames_analyzed += 1
+        self._submit(img)
+
+    def _submit(self, img):
+        h, w = img.shape[:2]
+        scale = min(1.0, config.FOCUS_DETECT_WIDTH / w)
+        shape = (max(1, round(h * scale)), max(1, round(w * scale)))
+        reserved = self.pool.acquire(self._stream, shape)
+        if reserved is None:
+            # Over budget: this frame is not analysed
+            self.frames_skipped += 1
+            return
+        slot, view = reserved
+        small = img
+        if scale < 1.0:
+            small = cv2.resize(img, (shape[1], shape[0]), interpolation=cv2.INTER_AREA)
+        # Convert straight into shared memory, no intermediate copy
+        cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=view)
+
+        roi = None
+        if self.face is not None and self._since_detect < self.detect_every:
+            self._since_detect += 1
+            roi = tuple(int(v * scale) for v in search_window(self.face, img.shape))
+        else:
+            self._since_detect = 0
+            self.full_detections += 1
+        min_side = max(1, round(config.FOCUS_MIN_FACE_PX * scale))
+        try:
+            future = self.pool.submit(self._stream, slot, shape, min_side, roi)
+        except BrokenProcessPool:
+            # The pool is restarting its workers; analyse this frame here instead
+            faces = detect_faces(img, roi=None if roi is None else search_window(self.face, img.shape))
+            if roi is not None and not faces:
+                self._since_detect = self.detect_every
+            self.face = faces[0] if faces else None
+            self._update_focus(img.shape, frames=self._unscored)
+            self._unscored = 0
+            self.frames_analyzed += 1
+            return
+        self._pending = (future, scale, roi is not None)
+
+    def _update_focus(self, frame_shape, frames=1):
+        """Apply the focus rules; `frames` counts skipped frames this result stands in for"""
+        h, w = frame_shape[:2]
+
+        if self.face is not None:
+            x, y, width, height = self.face
+
+            # Calculate face position
+            x_center = x + width / 2
+            y_center = y + height / 2
+
+            # Simple focus logic
+            if y_center > h * 0.6:  # Face in lower part = looking down
+                self.focus_state = "FOCUSED"
+                self.focus_score = min(100, self.focus_score + 1 * frames)
+            elif 0.3 < x_center/w < 0.7 and 0.3 < y_center/h < 0.7:  # Face centered
+                self.focus_state = "DISTRACTED"
+                self.focus_score = max(0, self.focus_score - 1 * frames)
+            else:  # Face at edges
+                self.focus_state = "AWAY"
+                self.focus_score = max(0, self.focus_score - 2 * frames)
+        else:
+            self.focus_state = "AWAY"
+            self.focus_score = max(0, self.focus_score - 3 * frames)
+
+        if self.telemetry is not None:
+            self.telemetry.record(self.focus_state, self.focus_score, self.face)
+
+    def draw(self, img):
+        """Draw the face box and status text for the current state"""
+        if self.face is not None:
+            x, y, width, height = self.face
+            # Draw rectangle around face
+            cv2.rectangle(img, (x, y), (x+width, y+height), (0, 255, 0), 2)
+
+        # Add status text
+        color_map = {"FOCUSED": (0, 255, 0), "DISTRACTED": (0, 165, 255), "AWAY": (0, 0, 255)}
+        color = color_map.get(self.focus_state, (255, 255, 255))
+        cv2.putText(img, f"Status: {self.focus_state}", (10, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        cv2.putText(img, f"Score: {self.focus_score}%", (10, 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
@@ -0,0 +1,172 @@
+"""Process pool that runs face detection for every Focus Monitor stream.
+
+Streams hand over downscaled grayscale frames through a fixed set of
+shared-memory slots, so only the slot index and shape cross the process
+boundary. The number of slots is the global concurrency budget. Each stream
+may have one frame in flight, so a heavy client cannot starve the others. A
+stream that gets no slot just skips analysis for that frame.
+
+If a worker dies, the executor is broken for good. The pool then starts a
+fresh one and the stream analyses that frame itself.
+"""
+import contextlib
+import os
+import sys
+import threading
+import types
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+_worker_slots = {}
+
+
+def _attach(name):
+    """Worker side: map a slot once and keep it mapped"""
+    if name not in _worker_slots:
+        _worker_slots[name] = shared_memory.SharedMemory(name=name)
+    return _worker_slots[name]
+
+
+def _detect(slot_name, shape, min_side, roi):
+    from aceai.focus import get_face_cascade
+
+    shm = _attach(slot_name)
+    gray = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    ox, oy = 0, 0
+    if roi is not None:
+        ox, oy, rw, rh = roi
+        gray = gray[oy:oy + rh, ox:ox + rw]
+    faces = get_face_cascade().detectMultiScale(gray, 1.1, 4, minSize=(min_side, min_side))
+    return [(int(x) + ox, int(y) + oy, int(w), int(h)) for x, y, w, h in faces]
+
+
+@contextlib.contextmanager
+def _without_main_script():
+    """Hide the running script from workers started in this block.
+
+    Streamlit runs app.py as the `__main__` module, and spawned processes
+    import `__main__` from its file before doing anything else. Without this,
+    every worker would run the whole app once at startup.
+    """
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _start_executor(workers):
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    # Start every worker now; later submits reuse them instead of spawning from a script thread
+    with _without_main_script():
+        for future in [executor.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+    return executor
+
+
+class FocusAnalysisPool:
+    """Shared detection workers with a global slot budget and one frame in flight per stream"""
+
+    def __init__(self, workers, max_width, max_height):
+        self.workers = workers
+        self._executor = _start_executor(workers)
+        # Twice as many slots as workers keeps every worker busy while frames are being copied in
+        self._slots = [shared_memory.SharedMemory(create=True, size=max_width * max_height)
+                       for _ in range(workers * 2)]
+        self.max_shape = (max_height, max_width)
+        self._free = list(range(len(self._slots)))
+        self._in_flight = {}
+        self._next_stream = 0
+        self._lock = threading.Lock()
+        self._restarting = False
+        self.stats = {"submitted": 0, "refused": 0, "restarts": 0}
+        # The finalizer reads the executor from here, so it also shuts down a restarted one
+        self._resources = {"executor": self._executor, "slots": self._slots}
+        weakref.finalize(self, FocusAnalysisPool._release, self._resources)
+
+    def register(self):
+        """Join the pool; returns the stream id to pass to `acquire`"""
+        with self._lock:
+            self._next_stream += 1
+            self._in_flight[self._next_stream] = 0
+            return self._next_stream
+
+    def unregister(self, stream):
+        with self._lock:
+            self._in_flight.pop(stream, None)
+
+    def acquire(self, stream, shape):
+        """Reserve a slot for one frame and return (slot, writable view), or None"""
+        if shape[0] > self.max_shape[0] or shape[1] > self.max_shape[1]:
+            return None
+        with self._lock:
+            if not self._free or stream not in self._in_flight or self._in_flight[stream] >= 1:
+                self.stats["refused"] += 1
+                return None
+            slot = self._free.pop()
+            self._in_flight[stream] = self._in_flight.get(stream, 0) + 1
+        view = np.ndarray(shape, dtype=np.uint8, buffer=self._slots[slot].buf)
+        return slot, view
+
+    def submit(self, stream, slot, shape, min_side, roi=None):
+        """Detect faces in a filled slot; the Future resolves to boxes in slot coordinates.
+
+        Raises BrokenProcessPool if the workers are gone. The pool restarts
+        them, and the caller should analyse the frame itself.
+        """
+        executor = self._executor
+        try:
+            future = executor.submit(_detect, self._slots[slot].name, shape, min_side, roi)
+        except RuntimeError as e:
+            # Broken, or shut down by a restart from another stream
+            self._done(stream, slot)
+            self._restart(executor)
+            raise BrokenProcessPool(str(e)) from e
+        except Exception:
+            self._done(stream, slot)
+            raise
+        future.add_done_callback(lambda f: self._finished(stream, slot, executor, f))
+        self.stats["submitted"] += 1
+        return future
+
+    def _finished(self, stream, slot, executor, future):
+        self._done(stream, slot)
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._restart(executor)
+
+    def _done(self, stream, slot):
+        with self._lock:
+            self._free.append(slot)
+            if stream in self._in_flight:
+                self._in_flight[stream] -= 1
+
+    def _restart(self, broken):
+        """Replace a broken executor, once, however many streams notice it"""
+        with self._lock:
+            if self._executor is not broken or self._restarting:
+                return
+            self._restarting = True
+        # Starting workers takes a while; until then streams analyse frames themselves
+        try:
+            executor = _start_executor(self.workers)
+        except Exception:
+            with self._lock:
+                self._restarting = False
+            raise
+        with self._lock:
+            self._executor = self._resources["executor"] = executor
+            self._restarting = False
+            self.stats["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _release(resources):
+        resources["executor"].shutdown(wait=False, cancel_futures=True)
+        for shm in resources["slots"]:
+            shm.close()
+            shm.unlink()
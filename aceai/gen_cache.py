@@ -0,0 +1,158 @@
+"""Two-tier cache for generated explanations.
+
+Keys are built from the normalized topic, the explanation level, the model id
+and the generation parameters, so "Quantum  Physics" and "quantum physics"
+share an entry while a change of model or settings never serves stale text.
+The first tier is an in-process LRU, the second a SQLite file shared by every
+process on the host, with TTL and size based eviction.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_topic(topic):
+    """Casefold and collapse whitespace so equivalent topics share a key"""
+    return _whitespace.sub(" ", topic).strip().casefold()
+
+
+def cache_key(topic, level, model_id, params=None):
+    """Stable key for one (topic, level, model, generation params) request"""
+    payload = json.dumps(
+        [normalize_topic(topic), level.casefold(), model_id, params or {}],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """In-process LRU in front of an on-disk SQLite table"""
+
+    def __init__(self, path=None, memory_items=512, disk_items=50000, ttl=30 * 24 * 3600):
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.ttl = ttl
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS generations_used ON generations (used)")
+
+    def get(self, key):
+        """Return the cached text for `key`, or None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+            value = self._disk_get(key)
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            self._disk_put(key, value)
+
+    def get_or_generate(self, key, generate):
+        """Return the cached value or call `generate()` and store its result"""
+        value = self.get(key)
+        if value is None:
+            value = generate()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def prewarm(self, topics, levels, model_id, params, generate):
+        """Fill the cache for every topic x level; `generate(topic, level)` returns text.
+
+        Returns the number of entries that had to be generated.
+        """
+        generated = 0
+        for topic in topics:
+            for level in levels:
+                key = cache_key(topic, level, model_id, params)
+                if self.get(key) is None:
+                    self.put(key, generate(topic, level))
+                    generated += 1
+        return generated
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM generations")
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key):
+        if self._db is None:
+            return None
+        now = time.time()
+        row = self._db.execute("SELECT value, created FROM generations WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self.ttl and now - row[1] > self.ttl:
+            self._db.execute("DELETE FROM generations WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            return None
+        self._db.execute("UPDATE generations SET used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _disk_put(self, key, value):
+        if self._db is None:
+            return
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO generations (key, value, created, used) VALUES (?, ?, ?, ?)",
+            (key, value, now, now),
+        )
+        # Evicting on every write would cost a COUNT(*) per miss; do it periodically
+        self._writes += 1
+        if self._writes % 64 == 0:
+            self._evict(now)
+
+    def _evict(self, now):
+        if self.ttl:
+            cursor = self._db.execute("DELETE FROM generations WHERE created < ?", (now - self.ttl,))
+            self.stats["evictions"] += cursor.rowcount
+        (count,) = self._db.execute("SELECT COUNT(*) FROM generations").fetchone()
+        if count > self.disk_items:
+            cursor = self._db.execute(
+                "DELETE FROM generations WHERE key IN "
+                "(SELECT key FROM generations ORDER BY used LIMIT ?)",
+                (count - self.disk_items,),
+            )
+            self.stats["evictions"] += cursor.rowcount
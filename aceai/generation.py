@@ -0,0 +1,162 @@
+"""Generation policy for the Topic Explainer.
+
+Every explainer request is bounded, stops early and is reproducible:
+
+- Each explanation level has a budget of new tokens; the prompt no longer
+  counts against it and is not echoed back.
+- Generation ends at the first paragraph break once a minimum length is
+  reached, at the first sentence end once most of the budget is spent, and
+  as soon as the text starts repeating itself.
+- Sampling is seeded. Noise comes from a generator seeded by the policy seed
+  and the prompt, and the token is picked with the Gumbel-max trick, which
+  samples from the same distribution as top-k sampling. A prompt therefore
+  draws the same tokens whether it runs alone, in a batch or next to other
+  streams, so identical requests give identical, cacheable text.
+
+The policy is a plain dict, so it can be part of cache keys and batch
+grouping. `generate_kwargs` turns it into arguments for `model.generate`,
+and the streamed and batched paths both use it.
+"""
+import hashlib
+import math
+import re
+
+from aceai import config
+from aceai.models import lazy_import
+
+# New tokens per explanation level
+LEVEL_TOKENS = {"Simple": 60, "Intermediate": 100, "Detailed": 160}
+
+_sentence = re.compile(r"[^.!?]+(?:[.!?]+[\"')\]]*|$)")
+_sentence_end = (".", "!", "?", '."', '!"', '?"', ".)", ".'")
+
+
+def explainer_prompt(topic, level):
+    return f"Explain {topic} in {level.lower()} terms:"
+
+
+def explainer_params(level):
+    """Generation settings for one explanation level"""
+    budget = LEVEL_TOKENS.get(level, LEVEL_TOKENS["Intermediate"])
+    return {
+        "max_new_tokens": budget,
+        "min_new_tokens": budget // 4,
+        "temperature": 0.7,
+        "top_k": 40,
+        "repetition_penalty": 1.2,
+        "repeat_ngram": 4,
+        "seed": config.GENERATION_SEED,
+    }
+
+
+class DecodingPolicy:
+    """Logits processor for seeded sampling and the early stops"""
+
+    def __init__(self, tokenizer, max_new_tokens, min_new_tokens=0, temperature=1.0, top_k=0,
+                 repetition_penalty=1.0, repeat_ngram=4, seed=0):
+        self.torch = lazy_import("torch")
+        self.tokenizer = tokenizer
+        self.min_new_tokens = min_new_tokens
+        # Past this point the next sentence end finishes the text
+        self.soft_limit = int(max_new_tokens * 0.75)
+        self.temperature = temperature
+        self.top_k = top_k
+        self.repetition_penalty = repetition_penalty
+        self.repeat_ngram = repeat_ngram
+        self.seed = seed
+        self.eos = tokenizer.eos_token_id
+        self.pad = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else self.eos
+        self._start = None
+        self._generators = None
+        self._pieces = {}
+
+    def _generator(self, prompt_ids):
+        # Left padding differs between batches; the prompt's own tokens do not
+        tokens = ",".join(str(t) for t in prompt_ids if t != self.pad)
+        digest = hashlib.blake2b(f"{self.seed}:{tokens}".encode(), digest_size=8).digest()
+        return self.torch.Generator().manual_seed(int.from_bytes(digest, "little") >> 1)
+
+    def _piece(self, token):
+        piece = self._pieces.get(token)
+        if piece is None:
+            piece = self._pieces[token] = self.tokenizer.decode([token])
+        return piece
+
+    def should_stop(self, tokens):
+        """Whether the new tokens so far make a complete enough text"""
+        n = len(tokens)
+        if n < self.min_new_tokens:
+            return False
+        if "\n\n" in "".join(self._piece(t) for t in tokens[-2:]):
+            return True
+        if n >= self.soft_limit and self._piece(tokens[-1]).rstrip().endswith(_sentence_end):
+            return True
+        k = self.repeat_ngram
+        if k and n >= 2 * k:
+            tail = tokens[-k:]
+            return any(tokens[i:i + k] == tail for i in range(n - k))
+        return False
+
+    def __call__(self, input_ids, scores):
+        torch = self.torch
+        if self._start is None:
+            self._start = input_ids.shape[-1]
+            self._generators = [self._generator(row) for row in input_ids.tolist()]
+        if self.repetition_penalty != 1.0:
+            # As transformers does it, except that left padding (EOS for GPT-2) is not a repeat
+            p = self.repetition_penalty
+            pad = scores[:, self.pad].clone()
+            seen = torch.gather(scores, 1, input_ids)
+            scores = scores.scatter(1, input_ids, torch.where(seen < 0, seen * p, seen / p))
+            scores[:, self.pad] = pad
+        scores = scores / self.temperature
+        if self.top_k and self.top_k < scores.shape[-1]:
+            kth = torch.topk(scores, self.top_k, dim=-1).values[:, -1:]
+            scores = scores.masked_fill(scores < kth, -math.inf)
+        for row, tokens in enumerate(input_ids[:, self._start:].tolist()):
+            if tokens and self.should_stop(tokens):
+                scores[row] = -math.inf
+                scores[row, self.eos] = 0.0
+                continue
+            uniform = torch.rand(scores.shape[-1], generator=self._generators[row]).clamp_(1e-10, 1 - 1e-10)
+            scores[row] -= torch.log(-torch.log(uniform)).to(scores.dtype)
+        return scores
+
+
+def generate_kwargs(tokenizer, params):
+    """Arguments for `model.generate` that carry out the policy in `params`"""
+    transformers = lazy_import("transformers")
+    policy = DecodingPolicy(tokenizer, **params)
+    return {
+        "max_new_tokens": params["max_new_tokens"],
+        "min_new_tokens": params.get("min_new_tokens", 0),
+        # The noise added by the policy does the sampling; picking the best token keeps it seeded
+        "do_sample": False,
+        "logits_processor": transformers.LogitsProcessorList([policy]),
+        "pad_token_id": tokenizer.eos_token_id,
+    }
+
+
+def pipeline_kwargs(model, params):
+    """Arguments for calling a text-generation pipeline with the policy in `params`"""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        # Not a transformers pipeline (the stub backend); only the budget applies
+        kwargs = {"max_new_tokens": params["max_new_tokens"]}
+    else:
+        kwargs = generate_kwargs(tokenizer, params)
+    kwargs["return_full_text"] = False
+    return kwargs
+
+
+def finish(text):
+    """Whole sentences only, each said once"""
+    sentences, seen = [], set()
+    for sentence in _sentence.findall(text.strip()):
+        key = " ".join(sentence.split()).casefold()
+        if key and key not in seen:
+            seen.add(key)
+            sentences.append(sentence)
+    if len(sentences) > 1 and not sentences[-1].rstrip().endswith(_sentence_end):
+        sentences.pop()
+    return "".join(sentences).strip()
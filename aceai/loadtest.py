@@ -0,0 +1,388 @@
+"""Headless load test: simulated students running app.py side by side.
+
+Each virtual student is a Streamlit AppTest session driven from its own
+thread, the way the Streamlit server runs one script thread per browser tab.
+All sessions share the process-wide resources (st.cache_resource, the
+compiled script), so latency and memory reflect a single replica. Students
+move between pages by a weighted navigation mix and use each page: they ask
+the explainer about canned and uncanned topics, generate practice sets, turn
+notes into flashcards, and so on. A visit to the Focus Monitor also starts a
+synthetic webcam stream that feeds frames to a SimpleFocusProcessor at the
+camera frame rate.
+
+Everything runs offline. The explainer uses the `stub` backend, which sleeps
+as long as the real model would take (ACEAI_STUB_MS_PER_TOKEN), and all data
+goes to a throwaway directory unless --data-dir is given.
+
+    python -m aceai.loadtest --sessions 1 4 16 --duration 30 -o load.json
+
+For each concurrency level the report has throughput, latency percentiles
+(overall and per action), errors, resident memory per session and, for the
+webcam streams, processed and dropped frames.
+"""
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+PAGES = {
+    "home": "🏠 Home",
+    "scheduler": "🎯 Smart Scheduler",
+    "explainer": "💡 Topic Explainer",
+    "practice": "📊 Practice Generator",
+    "flashcards": "📝 Notes to Flashcards",
+    "focus": "🔍 Focus Monitor",
+    "progress": "📈 Progress Dashboard",
+}
+
+# Share of page visits, roughly what a study session looks like
+DEFAULT_MIX = {"home": 0.1, "scheduler": 0.05, "explainer": 0.3, "practice": 0.25,
+               "flashcards": 0.15, "focus": 0.05, "progress": 0.1}
+
+CANNED_TOPICS = ["quantum physics", "photosynthesis", "machine learning"]
+PRACTICE_TOPICS = ["algebra", "physics", "biology", "chemistry"]
+PRACTICE_FORMATS = ["Multiple Choice", "Short Answer", "Problem Solving", "Mixed"]
+
+
+def concurrent_apptests():
+    """Let AppTest sessions run in parallel threads.
+
+    AppTest assumes one run at a time. It installs a mock Runtime before each
+    run and removes it afterwards, and every run compiles the script again.
+    Concurrent runs would tear down each other's Runtime and race in the
+    compiler. The harness installs one shared mock Runtime and one shared
+    script cache instead, as the real server does.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config, logger
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import patch_config_options
+
+    # Sessions started outside a script thread warn on every run. Parse the config
+    # first, or parsing it later resets the log level
+    config.get_config_options()
+    logger.set_log_level("error")
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    class PerRunRuntime:
+        _instance = None
+
+    app_test.Runtime = PerRunRuntime
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+    return patch_config_options({"global.appTest": True})
+
+
+def percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return {}
+    values = sorted(values)
+    return {f"p{p}_ms": round(1000 * values[min(len(values) - 1, int(p / 100 * len(values)))], 2)
+            for p in points}
+
+
+class WebcamStream:
+    """Synthetic camera frames pushed through a SimpleFocusProcessor in real time"""
+
+    def __init__(self, frames, fps, seconds, pool):
+        self.frames = frames
+        self.interval = 1.0 / fps
+        self.seconds = seconds
+        self.pool = pool
+        self.stats = {"offered": 0, "processed": 0, "late": 0, "skipped": 0, "latencies": []}
+        self.thread = threading.Thread(target=self._run, name="synthetic-webcam", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        from aceai.focus import SimpleFocusProcessor
+
+        processor = SimpleFocusProcessor(pool=self.pool)
+        started = time.perf_counter()
+        n = 0
+        while True:
+            due = started + n * self.interval
+            now = time.perf_counter()
+            if now - started >= self.seconds:
+                break
+            if now < due:
+                time.sleep(due - now)
+            elif now - due > self.interval:
+                # Behind by more than a frame: the newest frame replaces the ones we missed,
+                # as streamlit-webrtc does with async processing
+                missed = int((now - due) / self.interval)
+                self.stats["offered"] += missed
+                self.stats["late"] += missed
+                n += missed
+                continue
+            frame = self.frames[n % len(self.frames)]
+            t = time.perf_counter()
+            processor.recv(frame)
+            self.stats["latencies"].append(time.perf_counter() - t)
+            self.stats["offered"] += 1
+            self.stats["processed"] += 1
+            n += 1
+        processor.on_ended()
+        self.stats["skipped"] = processor.frames_skipped
+
+
+class Student:
+    """One simulated browser tab"""
+
+    def __init__(self, rng, mix, think_seconds, notes, webcam):
+        from streamlit.testing.v1 import AppTest
+
+        self.rng = rng
+        self.pages = list(mix)
+        self.weights = [mix[page] for page in self.pages]
+        self.think_seconds = think_seconds
+        self.notes = notes
+        self.webcam = webcam
+        self.samples = []
+        self.errors = []
+        self.streams = []
+        self.at = AppTest.from_file(APP_PATH, default_timeout=120)
+        self._timed("start", self.at.run)
+
+    def _timed(self, action, run):
+        started = time.perf_counter()
+        try:
+            run()
+        except Exception as e:
+            self.errors.append(f"{action}: {e}")
+            return
+        self.samples.append((action, time.perf_counter() - started))
+        if self.at.exception:
+            self.errors.append(f"{action}: {self.at.exception[0].message}")
+
+    def _button(self, label):
+        for button in self.at.button:
+            if button.label == label:
+                return button
+        raise LookupError(f"no {label!r} button")
+
+    def _set(self, elements, label, value):
+        for element in elements:
+            if element.label == label:
+                element.set_value(value)
+                return
+        raise LookupError(f"no {label!r} widget")
+
+    def step(self, page=None):
+        page = page or self.rng.choices(self.pages, self.weights)[0]
+        self._timed(f"{page}:open", lambda: self.at.sidebar.radio[0].set_value(PAGES[page]).run())
+        action = getattr(self, f"use_{page}", None)
+        if action is not None:
+            self._timed(f"{page}:use", action)
+
+    def use_scheduler(self):
+        self._button("Generate Smart Schedule").click().run()
+
+    def use_explainer(self):
+        # Half the requests are for canned topics; the rest go to the cache or the model
+        if self.rng.random() < 0.5:
+            topic = self.rng.choice(CANNED_TOPICS)
+        else:
+            topic = f"topic {self.rng.randint(1, 200)}"
+        self._set(self.at.text_input, "Enter any topic you want to understand:", topic)
+        self._button("Explain This Topic").click().run()
+
+    def use_practice(self):
+        self._set(self.at.text_input, "Enter topic for practice questions:", self.rng.choice(PRACTICE_TOPICS))
+        self._set(self.at.selectbox, "Question format:", self.rng.choice(PRACTICE_FORMATS))
+        self._button("Generate Practice Set").click().run()
+
+    def use_flashcards(self):
+        self._set(self.at.text_area, "Paste your notes here (or type directly):", self.rng.choice(self.notes))
+        self._button("Create Flashcards").click().run()
+
+    def use_focus(self):
+        if self.webcam is not None:
+            self.streams.append(self.webcam())
+        self._button("Start Study Session").click().run()
+
+    def run(self, deadline):
+        while time.perf_counter() < deadline:
+            self.step()
+            time.sleep(self.rng.expovariate(1 / self.think_seconds) if self.think_seconds else 0)
+
+
+def warm_up(mix, notes):
+    """Visit every page once so shared resources load before anything is measured"""
+    student = Student(random.Random(0), mix, 0, notes, None)
+    for page in mix:
+        student.step(page)
+    return student.errors
+
+
+def run_level(sessions, duration, mix, think_seconds, notes, webcam, seed):
+    from aceai.backends import resident_memory_mb
+
+    gc.collect()
+    rss_before = resident_memory_mb()
+    students = []
+    errors = []
+
+    def student(i):
+        try:
+            s = Student(random.Random(seed * 1000 + i), mix, think_seconds, notes, webcam)
+        except Exception as e:
+            errors.append(f"start: {e}")
+            return
+        students.append(s)
+        s.run(deadline)
+
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    threads = [threading.Thread(target=student, args=(i,), name=f"student-{i}") for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for s in students:
+        for stream in s.streams:
+            stream.thread.join()
+    elapsed = time.perf_counter() - started
+    rss_after = resident_memory_mb()
+
+    by_action = {}
+    for s in students:
+        errors.extend(s.errors)
+        for action, seconds in s.samples:
+            by_action.setdefault(action, []).append(seconds)
+    reruns = [seconds for action, seconds in
+              ((a, x) for s in students for a, x in s.samples) if action != "start"]
+    report = {
+        "sessions": sessions,
+        "seconds": round(elapsed, 2),
+        "reruns": len(reruns),
+        "reruns_per_second": round(len(reruns) / elapsed, 2),
+        "latency": {**percentiles(reruns), "mean_ms": round(1000 * statistics.mean(reruns), 2) if reruns else None},
+        "actions": {action: {"count": len(values), **percentiles(values, (50, 95))}
+                    for action, values in sorted(by_action.items())},
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "resident_mb": round(rss_after, 1),
+        "mb_per_session": round((rss_after - rss_before) / sessions, 2),
+    }
+    streams = [stream.stats for s in students for stream in s.streams]
+    if streams:
+        offered = sum(stats["offered"] for stats in streams)
+        report["webcam"] = {
+            "streams": len(streams),
+            "frames_offered": offered,
+            "frames_processed": sum(stats["processed"] for stats in streams),
+            "dropped_share": round(sum(stats["late"] + stats["skipped"] for stats in streams) / max(1, offered), 3),
+            "recv": percentiles([x for stats in streams for x in stats["latencies"]], (50, 95, 99)),
+        }
+    return report
+
+
+def _parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        mix = {page: 0.0 for page in PAGES}
+        for item in text.split(","):
+            page, _, weight = item.partition("=")
+            if page.strip() not in PAGES:
+                raise ValueError(f"unknown page {page!r}; choose from {', '.join(PAGES)}")
+            mix[page.strip()] = float(weight or 1)
+    return {page: weight for page, weight in mix.items() if weight > 0}
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulate concurrent AceAi sessions against app.py")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="concurrency levels to run, one after another")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per level")
+    parser.add_argument("--think-ms", type=float, default=500, help="mean pause between actions")
+    parser.add_argument("--mix", help="page weights, e.g. explainer=3,practice=2,focus=1 "
+                                      f"(pages: {', '.join(PAGES)})")
+    parser.add_argument("--model-ms-per-token", type=float, default=25,
+                        help="how long the stub model takes per generated token")
+    parser.add_argument("--fps", type=float, default=15, help="synthetic webcam frame rate")
+    parser.add_argument("--stream-seconds", type=float, default=5, help="webcam stream length per focus visit")
+    parser.add_argument("--resolution", default="640x480", help="synthetic webcam frame size")
+    parser.add_argument("--data-dir", help="keep app data here instead of a temporary directory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write the report JSON here as well as to stdout")
+    args = parser.parse_args(argv)
+    mix = _parse_mix(args.mix)
+
+    # Settings are read when aceai.config is first imported, so set them before anything imports it
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="aceai-load-")
+    os.environ["ACEAI_DATA_DIR"] = data_dir
+    os.environ["ACEAI_MODEL_BACKEND"] = "stub"
+    os.environ["ACEAI_STUB_MS_PER_TOKEN"] = str(args.model_ms_per_token)
+    os.environ["ACEAI_EXPLAINER_STREAMING"] = "0"
+    # AppTest, unlike `streamlit run`, does not put the script's directory on the path
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+    from aceai import config
+    from aceai.bench import synthetic_notes
+
+    notes = [synthetic_notes(kb) for kb in (1, 2, 4)]
+    webcam = None
+    pool = None
+    if "focus" in mix:
+        try:
+            import av
+
+            from aceai.bench import synthetic_frames
+            width, height = map(int, args.resolution.lower().split("x"))
+            frames = [av.VideoFrame.from_ndarray(img, format="bgr24")
+                      for img in synthetic_frames(width, height, 60)]
+            if config.FOCUS_POOL_WORKERS > 0:
+                from aceai.focus_pool import FocusAnalysisPool
+                pool = FocusAnalysisPool(config.FOCUS_POOL_WORKERS, max_width=config.FOCUS_DETECT_WIDTH,
+                                         max_height=config.FOCUS_DETECT_WIDTH * 2)
+            webcam = lambda: WebcamStream(frames, args.fps, args.stream_seconds, pool)
+        except ImportError as e:
+            print(f"Synthetic webcam streams disabled: {e}", file=sys.stderr)
+
+    levels = []
+    with concurrent_apptests():
+        print("Warming up...", file=sys.stderr)
+        for error in warm_up(mix, notes):
+            print(f"Warm-up error: {error}", file=sys.stderr)
+        for sessions in args.sessions:
+            print(f"{sessions} sessions for {args.duration:g}s...", file=sys.stderr)
+            levels.append(run_level(sessions, args.duration, mix, args.think_ms / 1000, notes, webcam,
+                                    args.seed))
+
+    report = {
+        "settings": {"duration": args.duration, "think_ms": args.think_ms, "mix": mix,
+                     "model_ms_per_token": args.model_ms_per_token, "fps": args.fps,
+                     "stream_seconds": args.stream_seconds, "resolution": args.resolution,
+                     "cpus": os.cpu_count(), "data_dir": data_dir},
+        "levels": levels,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""In-process metrics with a Prometheus text endpoint.
+
+Durations go into fixed-bucket histograms. Recording a value is one bisect
+and a few integer additions under a lock. Counts that other objects already
+keep, such as cache statistics, are read only when the metrics are scraped,
+through registered collectors.
+
+Everything is off unless ACEAI_METRICS=1. While it is off, `timer()` hands
+back a shared no-op and hot paths check `ENABLED` before timing anything, so
+the cost is one attribute lookup. When it is on, `serve()` exposes
+http://127.0.0.1:9464/metrics (ACEAI_METRICS_HOST / ACEAI_METRICS_PORT).
+"""
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from aceai import config
+
+ENABLED = config.METRICS
+
+# Seconds, from half a millisecond (a video frame) to a minute (a cold model call)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_families = []
+_collectors = {}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating inside the bucket that holds it"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                low = self.bounds[i - 1] if i else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Family:
+    """One named metric with a child per combination of label values"""
+
+    def __init__(self, kind, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self.children = {}
+        self._lock = threading.Lock()
+        _families.append(self)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self._lock:
+                child = self.children.get(values)
+                if child is None:
+                    child = Histogram(self.buckets) if self.kind == "histogram" else Counter()
+                    self.children[values] = child
+        return child
+
+    # Unlabelled families are used directly
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+def histogram(name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+    return Family("histogram", name, help, labelnames, buckets)
+
+
+def counter(name, help, labelnames=()):
+    return Family("counter", name, help, labelnames)
+
+
+def collector(name, help, kind, labelnames, read):
+    """Report values owned elsewhere; `read()` returns {label values: value} at scrape time.
+
+    Registering the same name again replaces the earlier collector.
+    """
+    _collectors[name] = (help, kind, tuple(labelnames), read)
+
+
+class _Timer:
+    __slots__ = ("metric", "started")
+
+    def __init__(self, metric):
+        self.metric = metric
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metric.observe(time.perf_counter() - self.started)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(family, *labels):
+    """Context manager that observes the block's wall time, or does nothing when disabled"""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(family.labels(*labels))
+
+
+# What AceAi measures
+PAGE_SECONDS = histogram("aceai_page_seconds", "Script rerun time per page", ("page",))
+FRAGMENT_SECONDS = histogram("aceai_fragment_seconds", "Run time per page fragment, including fragment-only reruns",
+                             ("fragment",))
+MODEL_SECONDS = histogram("aceai_model_seconds", "Explainer model call phases",
+                          ("path", "phase"))
+FOCUS_RECV_SECONDS = histogram("aceai_focus_recv_seconds", "Focus Monitor time per video frame")
+FOCUS_FRAMES = counter("aceai_focus_frames_total", "Focus Monitor frames by outcome", ("result",))
+
+
+def instrument_pipeline(pipeline, path="batch"):
+    """Time a transformers pipeline's tokenize, generate and decode steps"""
+    for method, phase in (("preprocess", "tokenize"), ("_forward", "generate"), ("postprocess", "decode")):
+        original = getattr(pipeline, method, None)
+        if original is None:
+            continue
+        child = MODEL_SECONDS.labels(path, phase)
+
+        def timed(*args, _original=original, _child=child, **kwargs):
+            started = time.perf_counter()
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                _child.observe(time.perf_counter() - started)
+
+        setattr(pipeline, method, timed)
+    return pipeline
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for family in _families:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for values, child in list(family.children.items()):
+            if family.kind == "counter":
+                lines.append(f"{family.name}{_labels(family.labelnames, values)} {child.value}")
+                continue
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, n in zip(child.bounds + (float("inf"),), counts):
+                cumulative += n
+                labels = _labels(family.labelnames + ("le",), values + (_number(bound),))
+                lines.append(f"{family.name}_bucket{labels} {cumulative}")
+            labels = _labels(family.labelnames, values)
+            lines.append(f"{family.name}_sum{labels} {total}")
+            lines.append(f"{family.name}_count{labels} {count}")
+    for name, (help, kind, labelnames, read) in list(_collectors.items()):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for values, value in read().items():
+            lines.append(f"{name}{_labels(labelnames, values)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def summary():
+    """Rows of (metric, labels, count, mean, p50, p95) for every histogram, for the admin panel"""
+    rows = []
+    for family in _families:
+        if family.kind != "histogram":
+            continue
+        for values, child in sorted(family.children.items()):
+            if child.count:
+                rows.append({"metric": family.name, "labels": " ".join(map(str, values)),
+                             "count": child.count, "mean_ms": 1000 * child.sum / child.count,
+                             "p50_ms": 1000 * child.quantile(0.5), "p95_ms": 1000 * child.quantile(0.95)})
+    return rows
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=None, host=None):
+    """Serve /metrics from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host or config.METRICS_HOST, config.METRICS_PORT if port is None else port),
+                                 _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    return server
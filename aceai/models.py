@@ -0,0 +1,100 @@
+"""Lazy loading of heavy modules and AI models.
+
+Nothing in here imports transformers, torch or cv2 at module level. Pages ask
+for what they need when they need it, and the GPT-2 pipeline is loaded in a
+background thread so the first render of any page never waits on it.
+"""
+import importlib
+import threading
+import time
+
+IDLE = "idle"
+WARMING = "warming up"
+READY = "ready"
+FAILED = "failed"
+
+
+def lazy_import(name):
+    """Import a module on first use; the import system makes this thread safe"""
+    return importlib.import_module(name)
+
+
+class LazyModel:
+    """A model that is loaded once, in the background, on first request"""
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.state = IDLE
+        self.error = None
+        self.load_seconds = None
+        self._model = None
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+
+    def start(self):
+        """Kick off the background load if it has not started yet"""
+        with self._lock:
+            if self.state != IDLE:
+                return
+            self.state = WARMING
+        thread = threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True)
+        thread.start()
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            self._model = self.loader()
+            self.state = READY
+        except Exception as e:
+            self.error = e
+            self.state = FAILED
+        finally:
+            self.load_seconds = time.perf_counter() - started
+            self._loaded.set()
+
+    def get(self, timeout=0):
+        """Return the model if it is ready within `timeout` seconds, else None"""
+        self.start()
+        if timeout:
+            self._loaded.wait(timeout)
+        return self._model if self.state == READY else None
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+
+class ModelRegistry:
+    """Named lazy models shared by every session in the process"""
+
+    def __init__(self):
+        self._models = {}
+
+    def register(self, name, loader):
+        self._models[name] = LazyModel(name, loader)
+        return self._models[name]
+
+    def __getitem__(self, name):
+        return self._models[name]
+
+    def get(self, name, timeout=0):
+        return self._models[name].get(timeout)
+
+    def warm(self, name):
+        """Start loading a model without waiting for it"""
+        self._models[name].start()
+
+    def status(self, name):
+        return self._models[name].state
+
+
+def load_text_generator():
+    """Build the text-generation pipeline used by the Topic Explainer"""
+    from aceai import backends, config, metrics
+
+    # Use a smaller, faster model for text generation, on the configured CPU backend
+    generator = backends.load(config.MODEL_BACKEND, config.MODEL_ID)
+    if metrics.ENABLED:
+        metrics.instrument_pipeline(generator)
+    return generator
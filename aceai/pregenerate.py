@@ -0,0 +1,413 @@
+"""Offline pre-generation of explanations and practice sets for a syllabus.
+
+The night before exams, every topic x explanation level and every topic x
+difficulty in a syllabus is generated ahead of time, fanned out over worker
+processes that each load the model once:
+
+    python -m aceai.pregenerate syllabus.csv
+
+A syllabus is a .txt file with one topic per line, or .csv/.json/.jsonl rows
+with a `topic` and optionally `levels` and `difficulties` separated by `|`.
+Every finished item is appended to a checkpoint next to the output, so an
+interrupted run picks up where it stopped (`--fresh` starts over). The
+checkpoint starts with the settings it was made with; a run with any other
+model or settings starts it over rather than mixing the two.
+
+The output is one read-only file that the app memory-maps at startup:
+
+    header     magic, entry count, metadata length
+    metadata   JSON: syllabus topics, model, generation settings
+    keys       sorted 64-bit hashes of (kind, topic, level or difficulty)
+    offsets    entry count + 1 positions into the data section
+    data       UTF-8 explanations and JSON practice sets, back to back
+
+A lookup is a binary search over the mapped keys, so opening the file costs
+nothing per entry and every process on the host shares the same pages.
+
+Generation is seeded, like the app's own explainer calls, so a rerun with the
+same model and settings produces the same file. The app only serves an
+artifact whose model and settings match its configuration; after a model
+change it would otherwise keep showing the old model's text.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+from aceai import config
+from aceai.content import TopicIndex, normalize
+from aceai.generation import explainer_params, explainer_prompt, finish, pipeline_kwargs
+from aceai.question_bank import DIFFICULTIES, read_rows
+
+LEVELS = ("Simple", "Intermediate", "Detailed")
+EXPLANATION = "explanation"
+PRACTICE = "practice"
+
+MAGIC = b"ACEPRE01"
+HEADER = struct.Struct("<8sQQ")
+
+PRACTICE_QUESTIONS = 5
+
+_question_end = re.compile(r"\?|\n")
+
+logger = logging.getLogger(__name__)
+
+
+def entry_key(kind, topic, variant):
+    name = f"{kind}\0{normalize(topic)}\0{variant.casefold()}"
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _align(n):
+    return n + (-n % 8)
+
+
+def _words(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split("|") if item.strip()]
+    return [str(item) for item in value]
+
+
+def _variants(values, allowed, what):
+    chosen = []
+    for value in values:
+        match = next((name for name in allowed if name.lower() == value.lower()), None)
+        if match is None:
+            raise ValueError(f"Unknown {what} {value!r}; choose from {', '.join(allowed)}")
+        chosen.append(match)
+    return chosen
+
+
+def read_syllabus(path, levels=LEVELS, difficulties=DIFFICULTIES):
+    """(topic, levels, difficulties) for every topic in a syllabus file, first mention wins"""
+    if path.endswith(".txt"):
+        with open(path, encoding="utf-8") as f:
+            rows = [{"topic": line.strip()} for line in f if line.strip() and not line.startswith("#")]
+    else:
+        rows = read_rows(path)
+    syllabus = {}
+    for row in rows:
+        topic = str(row.get("topic") or "").strip()
+        if not topic or normalize(topic) in syllabus:
+            continue
+        syllabus[normalize(topic)] = (topic,
+                                      _variants(_words(row.get("levels")), LEVELS, "level") or list(levels),
+                                      _variants(_words(row.get("difficulties")), DIFFICULTIES, "difficulty")
+                                      or list(difficulties))
+    return list(syllabus.values())
+
+
+def jobs(syllabus):
+    for topic, levels, difficulties in syllabus:
+        for level in levels:
+            yield EXPLANATION, topic, level
+        for difficulty in difficulties:
+            yield PRACTICE, topic, difficulty
+
+
+def practice_prompt(topic, difficulty):
+    return f"Write a {difficulty.lower()} practice question about {topic}:"
+
+
+def practice_params(attempt):
+    """Generation settings for one candidate question; each attempt has its own seed"""
+    return {
+        "max_new_tokens": 40,
+        "min_new_tokens": 8,
+        "temperature": 0.9,
+        "top_k": 40,
+        "repetition_penalty": 1.2,
+        "repeat_ngram": 4,
+        "seed": config.GENERATION_SEED + attempt,
+    }
+
+
+def artifact_settings(model_id, backend):
+    """What an artifact was generated with; the app ignores artifacts made with other settings"""
+    return {
+        "model": f"{model_id}:{backend}",
+        "explainer_params": {level: explainer_params(level) for level in LEVELS},
+        "practice_params": practice_params(0),
+    }
+
+
+def practice_questions(prompt, outputs, k):
+    """Turn generated continuations into up to `k` distinct question items"""
+    questions = []
+    for output in outputs:
+        text = output["generated_text"]
+        if text.startswith(prompt):
+            text = text[len(prompt):]
+        text = text.strip()
+        end = _question_end.search(text)
+        if end:
+            text = text[:end.end()].strip()
+        if len(text) > 10 and text not in questions:
+            questions.append(text)
+    return [{"question": question, "options": [], "answer": None} for question in questions[:k]]
+
+
+# Worker processes: one model each, loaded by the pool initializer
+_generator = None
+
+
+def _init_worker(backend, model_id, threads):
+    global _generator
+    try:
+        import torch
+        # Workers split the cores between them instead of each grabbing all of them
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from aceai import backends
+    _generator = backends.load(backend, model_id)
+
+
+def _generate(job, questions):
+    kind, topic, variant = job
+    if kind == EXPLANATION:
+        params = pipeline_kwargs(_generator, explainer_params(variant))
+        result = _generator(explainer_prompt(topic, variant), **params)
+        return finish(result[0]["generated_text"])
+    prompt = practice_prompt(topic, variant)
+    # Seeded sampling gives the same text for the same prompt and seed, so each candidate gets its own seed
+    outputs = []
+    for attempt in range(2 * questions):
+        outputs.extend(_generator(prompt, **pipeline_kwargs(_generator, practice_params(attempt))))
+        if len(practice_questions(prompt, outputs, questions)) == questions:
+            break
+    return practice_questions(prompt, outputs, questions)
+
+
+def read_checkpoint(path):
+    """(settings, {(kind, topic, variant): item}) for every item finished so far.
+
+    `settings` comes from the checkpoint's header line, None if it has none.
+    """
+    settings, done = None, {}
+    if not os.path.exists(path):
+        return settings, done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                # A line cut short when the last run was killed
+                continue
+            if "settings" in item:
+                settings = item["settings"]
+                continue
+            done[item["kind"], normalize(item["topic"]), item["variant"]] = item
+    return settings, done
+
+
+def write_artifact(path, items, meta):
+    """Write `items` [(kind, topic, variant, value)] to `path` atomically"""
+    entries = {}
+    for kind, topic, variant, value in items:
+        data = value if kind == EXPLANATION else json.dumps(value, ensure_ascii=False)
+        entries[entry_key(kind, topic, variant)] = data.encode("utf-8")
+    keys = array("Q", sorted(entries))
+    offsets = array("Q", [0])
+    for key in keys:
+        offsets.append(offsets[-1] + len(entries[key]))
+    if sys.byteorder != "little":
+        keys.byteswap()
+        offsets.byteswap()
+    metadata = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), len(metadata)))
+        f.write(metadata)
+        f.write(bytes(_align(HEADER.size + len(metadata)) - HEADER.size - len(metadata)))
+        f.write(keys.tobytes())
+        f.write(offsets.tobytes())
+        for key in sorted(entries):
+            f.write(entries[key])
+    os.replace(tmp, path)
+
+
+class PregeneratedContent:
+    """Read-only view of a pre-generation artifact.
+
+    Empty if the file does not exist, or if `expected` (see `artifact_settings`) is
+    given and the artifact was generated with anything else.
+    """
+
+    def __init__(self, path=None, expected=None):
+        self.meta = {"topics": []}
+        self.stats = {"hits": 0, "misses": 0}
+        self.mismatched = []
+        self._keys = self._offsets = ()
+        self._data = b""
+        if path and os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._open(memoryview(self._map))
+            # Compared as JSON, the way the values were stored
+            self.mismatched = [name for name, value in (expected or {}).items()
+                               if self.meta.get(name) != json.loads(json.dumps(value))]
+            if self.mismatched:
+                logger.warning("Ignoring %s: generated with different %s", path, ", ".join(self.mismatched))
+                self.meta = {"topics": []}
+                self._keys = self._offsets = ()
+                self._data = b""
+        self._topics = TopicIndex(self.meta["topics"])
+
+    def _open(self, view):
+        magic, count, meta_length = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not an AceAi pre-generation artifact")
+        self.meta = json.loads(bytes(view[HEADER.size:HEADER.size + meta_length]))
+        start = _align(HEADER.size + meta_length)
+        keys = view[start:start + 8 * count]
+        offsets = view[start + 8 * count:start + 16 * count + 8]
+        if sys.byteorder == "little":
+            self._keys, self._offsets = keys.cast("Q"), offsets.cast("Q")
+        else:
+            self._keys, self._offsets = array("Q", keys), array("Q", offsets)
+            self._keys.byteswap()
+            self._offsets.byteswap()
+        self._data = view[start + 16 * count + 8:]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _get(self, kind, topic, variant):
+        match = self._topics.match(topic)
+        if match is not None:
+            key = entry_key(kind, match, variant)
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                self.stats["hits"] += 1
+                return str(self._data[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+        self.stats["misses"] += 1
+        return None
+
+    def explanation(self, topic, level):
+        """Generated explanation of the closest syllabus topic, or None"""
+        return self._get(EXPLANATION, topic, level)
+
+    def practice(self, topic, difficulty):
+        """Generated practice items for the closest syllabus topic, or []"""
+        data = self._get(PRACTICE, topic, difficulty)
+        return json.loads(data) if data else []
+
+
+def run(syllabus, output, workers=None, checkpoint=None, fresh=False, questions=PRACTICE_QUESTIONS,
+        backend=None, model_id=None, progress=print):
+    """Generate everything in `syllabus` not already checkpointed, then write the artifact.
+
+    Returns the number of items that failed; they are retried by the next run.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    backend = backend or config.MODEL_BACKEND
+    model_id = model_id or config.MODEL_ID
+    checkpoint = checkpoint or f"{output}.checkpoint.jsonl"
+    workers = workers or os.cpu_count() or 1
+    if fresh and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    # Compared as JSON, the way the header was stored
+    settings = json.loads(json.dumps({**artifact_settings(model_id, backend), "questions": questions}))
+    saved, done = read_checkpoint(checkpoint)
+    if os.path.exists(checkpoint) and saved != settings:
+        progress(f"Ignoring {checkpoint}: generated with different settings, starting over")
+        os.remove(checkpoint)
+        done = {}
+    if not os.path.exists(checkpoint):
+        with open(checkpoint, "w", encoding="utf-8") as log:
+            log.write(json.dumps({"settings": settings}, ensure_ascii=False) + "\n")
+
+    wanted = [(kind, normalize(topic), variant) for kind, topic, variant in jobs(syllabus)]
+    todo = [job for job, key in zip(jobs(syllabus), wanted) if key not in done]
+    total = len(wanted)
+    progress(f"{total - len(todo)} of {total} items already generated, {len(todo)} to go on {workers} workers")
+
+    failed = 0
+    if todo:
+        started = time.perf_counter()
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with open(checkpoint, "a", encoding="utf-8") as log, \
+                ProcessPoolExecutor(min(workers, len(todo)), initializer=_init_worker,
+                                    initargs=(backend, model_id, threads)) as pool:
+            futures = {pool.submit(_generate, job, questions): job for job in todo}
+            try:
+                for n, future in enumerate(as_completed(futures), 1):
+                    kind, topic, variant = futures[future]
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        failed += 1
+                        progress(f"failed: {kind} {topic!r} {variant}: {e}")
+                        continue
+                    item = {"kind": kind, "topic": topic, "variant": variant, "value": value}
+                    log.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    log.flush()
+                    done[kind, normalize(topic), variant] = item
+                    if n % 50 == 0 or n == len(todo):
+                        rate = n / (time.perf_counter() - started)
+                        progress(f"{total - len(todo) + n}/{total} items, {rate:.1f}/s")
+            except KeyboardInterrupt:
+                pool.shutdown(wait=False, cancel_futures=True)
+                progress("Interrupted; run the same command again to resume")
+                raise
+
+    # Only items still in the syllabus make it into the artifact
+    items = [(item["kind"], item["topic"], item["variant"], item["value"])
+             for item in (done.get(key) for key in wanted) if item is not None]
+    write_artifact(output, items, {
+        "topics": [topic for topic, _, _ in syllabus],
+        **artifact_settings(model_id, backend),
+        "created": time.time(),
+    })
+    progress(f"Wrote {len(items)} items to {output}")
+    return failed
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-generate explanations and practice sets for a syllabus")
+    parser.add_argument("syllabus", help=".txt (one topic per line), .csv, .json or .jsonl with topic, "
+                                         "and optionally levels and difficulties separated by |")
+    parser.add_argument("-o", "--output", default=config.PREGENERATED_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--levels", default="|".join(LEVELS),
+                        help="explanation levels for topics that do not list their own")
+    parser.add_argument("--difficulties", default="|".join(DIFFICULTIES),
+                        help="practice difficulties for topics that do not list their own")
+    parser.add_argument("--questions", type=int, default=PRACTICE_QUESTIONS, help="questions per practice set")
+    parser.add_argument("--checkpoint", help="progress file (default: OUTPUT.checkpoint.jsonl)")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    try:
+        syllabus = read_syllabus(args.syllabus,
+                                 _variants(_words(args.levels), LEVELS, "level"),
+                                 _variants(_words(args.difficulties), DIFFICULTIES, "difficulty"))
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        failed = run(syllabus, args.output, args.workers, args.checkpoint, args.fresh, args.questions)
+    except KeyboardInterrupt:
+        return 130
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Durable per-user progress.
+
+`ProgressStore` is the storage interface, and `SQLiteProgressStore` is the
+local backend. `ProgressTracker` sits in front of a store. Reads go through a
+short-lived in-memory cache of the most recently seen users, so reruns do not
+touch storage. Counter changes are collected as deltas and written behind, in
+batches, by a background thread, and once more when the process exits.
+Because deltas are added in SQL rather than overwriting the row, two replicas
+updating the same user do not lose each other's increments.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import date, timedelta
+
+COUNTERS = ("topics_mastered", "questions_answered", "study_time")
+
+# Topics needed to reach each level
+LEVELS = (("Beginner", 0), ("Intermediate", 10), ("Advanced", 25), ("Expert", 50))
+
+logger = logging.getLogger(__name__)
+
+
+def new_progress():
+    return {"streak": 0, "last_active": None, "topics_mastered": 0,
+            "questions_answered": 0, "study_time": 0.0}
+
+
+def with_level(progress):
+    """Add the derived `level` and `progress_percent` fields"""
+    topics = progress["topics_mastered"]
+    for (name, start), (_, end) in zip(LEVELS, LEVELS[1:] + ((None, None),)):
+        if end is None or topics < end:
+            progress["level"] = name
+            progress["progress_percent"] = 100 if end is None else int(100 * (topics - start) / (end - start))
+            return progress
+
+
+class ProgressStore:
+    """Storage interface for progress records"""
+
+    def load(self, user_id):
+        """Return the stored record for `user_id`, or None"""
+        raise NotImplementedError
+
+    def apply(self, changes):
+        """Write a batch of {user_id: (counter deltas, absolute fields)}"""
+        raise NotImplementedError
+
+
+class SQLiteProgressStore(ProgressStore):
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS progress ("
+                       "user_id TEXT PRIMARY KEY, streak INTEGER NOT NULL DEFAULT 0, last_active TEXT, "
+                       "topics_mastered INTEGER NOT NULL DEFAULT 0, "
+                       "questions_answered INTEGER NOT NULL DEFAULT 0, "
+                       "study_time REAL NOT NULL DEFAULT 0)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self, user_id):
+        with self._connect() as db:
+            row = db.execute("SELECT streak, last_active, topics_mastered, questions_answered, study_time "
+                             "FROM progress WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("streak", "last_active", *COUNTERS), row))
+
+    def apply(self, changes):
+        with self._connect() as db:
+            for user_id, (deltas, fields) in changes.items():
+                db.execute("INSERT OR IGNORE INTO progress (user_id) VALUES (?)", (user_id,))
+                sets = [f"{name} = {name} + ?" for name in deltas] + [f"{name} = ?" for name in fields]
+                if sets:
+                    db.execute(f"UPDATE progress SET {', '.join(sets)} WHERE user_id = ?",
+                               (*deltas.values(), *fields.values(), user_id))
+
+
+class ProgressTracker:
+    """Read-through cache and debounced write-behind in front of a ProgressStore"""
+
+    def __init__(self, store, flush_seconds=5.0, cache_seconds=30.0, max_cached=10_000):
+        self.store = store
+        self.flush_seconds = flush_seconds
+        self.cache_seconds = cache_seconds
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        threading.Thread(target=self._flush_forever, name="progress-writer", daemon=True).start()
+        # The writer thread is a daemon; write what is left when the interpreter exits
+        atexit.register(ProgressTracker._flush_at_exit, weakref.ref(self))
+
+    @staticmethod
+    def _flush_at_exit(ref):
+        tracker = ref()
+        if tracker is not None:
+            tracker.flush()
+
+    def get(self, user_id):
+        """The user's progress dict (shared; change it through this tracker)"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is not None and (now - cached[0] < self.cache_seconds or user_id in self._pending):
+                self._cache.move_to_end(user_id)
+                return cached[1]
+        stored = self.store.load(user_id) or new_progress()
+        with self._lock:
+            # Re-apply writes that have not reached the store yet
+            deltas, fields = self._pending.get(user_id, ({}, {}))
+            for name, delta in deltas.items():
+                stored[name] += delta
+            stored.update(fields)
+            progress = with_level(stored)
+            if user_id in self._cache:
+                # Keep the same dict so session_state references stay live
+                self._cache[user_id][1].clear()
+                self._cache[user_id][1].update(progress)
+                progress = self._cache[user_id][1]
+            self._cache[user_id] = (now, progress)
+            self._cache.move_to_end(user_id)
+            self._evict()
+            return progress
+
+    def _evict(self):
+        # Least recently used first; users with unwritten changes stay until flushed
+        for user_id in list(self._cache):
+            if len(self._cache) <= self.max_cached:
+                break
+            if user_id not in self._pending:
+                del self._cache[user_id]
+
+    def increment(self, user_id, counter, amount=1):
+        progress = self.get(user_id)
+        with self._lock:
+            progress[counter] += amount
+            with_level(progress)
+            deltas = self._pending.setdefault(user_id, ({}, {}))[0]
+            deltas[counter] = deltas.get(counter, 0) + amount
+
+    def touch(self, user_id, today=None):
+        """Count today as an active day for the study streak"""
+        today = today or date.today()
+        progress = self.get(user_id)
+        if progress["last_active"] == today.isoformat():
+            return
+        with self._lock:
+            yesterday = (today - timedelta(days=1)).isoformat()
+            progress["streak"] = progress["streak"] + 1 if progress["last_active"] == yesterday else 1
+            progress["last_active"] = today.isoformat()
+            fields = self._pending.setdefault(user_id, ({}, {}))[1]
+            fields.update(streak=progress["streak"], last_active=progress["last_active"])
+
+    def flush(self):
+        """Write all pending changes now"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            try:
+                self.store.apply(pending)
+            except Exception:
+                # Put the changes back so the next flush retries them
+                with self._lock:
+                    for user_id, (deltas, fields) in pending.items():
+                        current = self._pending.setdefault(user_id, ({}, {}))
+                        for name, delta in deltas.items():
+                            current[0][name] = current[0].get(name, 0) + delta
+                        current[1].update({k: v for k, v in fields.items() if k not in current[1]})
+                raise
+
+    def _flush_forever(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not write progress changes; retrying")
@@ -0,0 +1,303 @@
+"""Practice question bank.
+
+Questions live in SQLite and are indexed in memory by (topic, difficulty,
+format). Each bucket is a flat array of question ids, so a practice set
+never scans the bank. Questions imported by another process (the CLI, or
+another replica) are picked up by `sample` within `refresh_seconds`.
+
+Sampling without replacement does not store a shuffled copy per user.
+Instead, each (user, bucket) pair keeps a cursor. Each cursor position is
+mapped through a keyed Feistel permutation of the bucket's positions, so
+every draw is O(1) and a user walks a bucket in their own random order
+without repeats. A compact per-user bitset of seen question ids covers the
+cases the cursor cannot, such as buckets that grew after an import.
+"""
+import csv
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+
+from aceai.content import TopicIndex, normalize
+
+DIFFICULTIES = ("Beginner", "Intermediate", "Advanced", "Expert")
+FORMATS = ("Multiple Choice", "Short Answer", "Problem Solving")
+
+_M64 = (1 << 64) - 1
+
+
+def _round(value, key, rnd):
+    z = (value * 0x9E3779B97F4A7C15 + key + rnd * 0xBF58476D1CE4E5B9) & _M64
+    z = ((z ^ (z >> 30)) * 0x94D049BB133111EB) & _M64
+    return z ^ (z >> 31)
+
+
+def permute(i, n, key):
+    """Position of `i` in a pseudo-random permutation of range(n) chosen by `key`"""
+    bits = max(2, (n - 1).bit_length())
+    bits += bits & 1
+    half = bits // 2
+    mask = (1 << half) - 1
+    x = i
+    # Cycle-walk: the Feistel network permutes [0, 2**bits), which is less than 4n
+    while True:
+        left, right = x >> half, x & mask
+        for rnd in range(4):
+            left, right = right, left ^ (_round(right, key, rnd) & mask)
+        x = (left << half) | right
+        if x < n:
+            return x
+
+
+class SeenSet:
+    """One bit per question id"""
+
+    def __init__(self, data=b""):
+        self.bits = bytearray(data)
+
+    def __contains__(self, qid):
+        byte = qid >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (qid & 7) & 1)
+
+    def add(self, qid):
+        byte = qid >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (qid & 7)
+
+    def discard(self, qid):
+        byte = qid >> 3
+        if byte < len(self.bits):
+            self.bits[byte] &= ~(1 << (qid & 7)) & 0xFF
+
+    def __len__(self):
+        return sum(bin(byte).count("1") for byte in self.bits)
+
+
+class PracticeHistory:
+    """What one user has already been given"""
+
+    def __init__(self, seed=None, seen=None, cursors=None):
+        self.seed = random.getrandbits(63) if seed is None else seed
+        self.seen = seen or SeenSet()
+        # bucket key -> [cursor, cycle]
+        self.cursors = cursors or {}
+
+
+def parse_difficulty(value):
+    for i, name in enumerate(DIFFICULTIES):
+        if str(value).strip().lower() == name.lower():
+            return i
+    return 1
+
+
+def parse_format(value, options):
+    for i, name in enumerate(FORMATS):
+        if str(value).strip().lower() == name.lower():
+            return i
+    return 0 if options else 1
+
+
+def _options(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [option.strip() for option in value.split("|") if option.strip()]
+    return [str(option) for option in value]
+
+
+def read_rows(path):
+    """Question dicts from a .csv, .json or .jsonl file"""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    elif path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+
+
+class QuestionBank:
+    def __init__(self, path, refresh_seconds=10.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS questions ("
+                       "id INTEGER PRIMARY KEY, topic TEXT NOT NULL, difficulty INTEGER NOT NULL, "
+                       "format INTEGER NOT NULL, question TEXT NOT NULL, options TEXT, answer TEXT, "
+                       "UNIQUE (topic, question))")
+            db.execute("CREATE TABLE IF NOT EXISTS history ("
+                       "user_id TEXT PRIMARY KEY, seed INTEGER, seen BLOB, cursors TEXT)")
+        self._buckets = {}
+        self._last_id = 0
+        self._indexed = 0.0
+        self._lock = threading.Lock()
+        self.topics = TopicIndex([])
+        self._index()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def _index(self):
+        """Append questions added since the last call to their buckets"""
+        with self._lock, self._connect() as db:
+            self._indexed = time.monotonic()
+            rows = db.execute("SELECT id, topic, difficulty, format FROM questions WHERE id > ? "
+                              "ORDER BY id", (self._last_id,))
+            known = set(self.topics.topics)
+            topics = set()
+            for qid, topic, difficulty, fmt in rows:
+                self._buckets.setdefault((topic, difficulty, fmt), array("q")).append(qid)
+                self._last_id = qid
+                topics.add(topic)
+            # Questions for topics already indexed do not need a new index
+            if not topics <= known:
+                self.topics = TopicIndex(sorted(known | topics))
+
+    def import_rows(self, rows):
+        """Bulk insert question dicts; duplicates of (topic, question) are skipped"""
+        def records():
+            for row in rows:
+                options = _options(row.get("options"))
+                yield (normalize(row["topic"]), parse_difficulty(row.get("difficulty")),
+                       parse_format(row.get("format"), options), row["question"].strip(),
+                       json.dumps(options) if options else None, row.get("answer") or None)
+
+        with self._connect() as db:
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO questions "
+                           "(topic, difficulty, format, question, options, answer) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", records())
+            added = db.total_changes - before
+        self._index()
+        return added
+
+    def import_file(self, path):
+        return self.import_rows(read_rows(path))
+
+    def history(self, user_id):
+        with self._connect() as db:
+            row = db.execute("SELECT seed, seen, cursors FROM history WHERE user_id = ?",
+                             (user_id,)).fetchone()
+        if row is None:
+            return PracticeHistory()
+        seed, seen, cursors = row
+        return PracticeHistory(seed, SeenSet(zlib.decompress(seen)), json.loads(cursors))
+
+    def save_history(self, user_id, history):
+        # Mostly-zero bitsets compress to almost nothing
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?)",
+                       (user_id, history.seed, zlib.compress(bytes(history.seen.bits)),
+                        json.dumps(history.cursors)))
+
+    def _strata(self, topic, difficulty, formats):
+        """Per format, its non-empty buckets from the nearest difficulty outwards"""
+        wanted = parse_difficulty(difficulty)
+        by_distance = sorted(range(len(DIFFICULTIES)), key=lambda d: (abs(d - wanted), d))
+        strata = [[(topic, d, f) for d in by_distance if self._buckets.get((topic, d, f))] for f in formats]
+        return [keys for keys in strata if keys]
+
+    def _draw(self, history, key, restart=False, drawn=()):
+        bucket = self._buckets[key]
+        n = len(bucket)
+        name = "|".join(map(str, key))
+        cursor, cycle = history.cursors.get(name, (0, 0))
+        # The rest of this pass, then at most one whole new pass
+        for _ in range(2 * n):
+            if cursor >= n:
+                if not restart:
+                    return None
+                # Everything in the bucket has been seen: start another pass in a new order.
+                # Questions already in the set being drawn stay seen, so they are not repeated in it.
+                for qid in bucket:
+                    if qid not in drawn:
+                        history.seen.discard(qid)
+                cursor, cycle, restart = 0, cycle + 1, False
+            qid = bucket[permute(cursor, n, history.seed ^ zlib.crc32(f"{name}|{cycle}".encode()))]
+            cursor += 1
+            history.cursors[name] = [cursor, cycle]
+            if qid not in history.seen:
+                history.seen.add(qid)
+                return qid
+        return None
+
+    def sample(self, history, topic, difficulty, fmt, k=5):
+        """Up to `k` questions, spread evenly over the formats asked for.
+
+        Unseen questions at the requested difficulty come first, then unseen
+        ones at neighbouring difficulties. Only when a user has been through
+        all of them does a bucket start over. A format with fewer than `k`
+        questions for the topic is topped up with the topic's other formats;
+        fewer than `k` come back only when the topic has fewer questions.
+        """
+        if time.monotonic() - self._indexed >= self.refresh_seconds:
+            self._index()
+        topic = self.topics.match(topic)
+        if topic is None:
+            return []
+        requested = range(len(FORMATS)) if fmt == "Mixed" else [parse_format(fmt, False)]
+        others = [f for f in range(len(FORMATS)) if f not in requested]
+        drawn = []
+        for formats, restart in ((requested, False), (requested, True), (others, False), (others, True)):
+            strata = self._strata(topic, difficulty, formats)
+            while strata and len(drawn) < k:
+                for keys in list(strata):
+                    if len(drawn) == k:
+                        break
+                    qid = None
+                    while keys and qid is None:
+                        qid = self._draw(history, keys[0], restart, drawn)
+                        if qid is None:
+                            keys.pop(0)
+                    if qid is None:
+                        strata.remove(keys)
+                    else:
+                        drawn.append(qid)
+        return self.fetch(drawn)
+
+    def fetch(self, ids):
+        if not ids:
+            return []
+        with self._connect() as db:
+            rows = db.execute("SELECT id, difficulty, format, question, options, answer FROM questions "
+                              f"WHERE id IN ({', '.join('?' * len(ids))})", ids).fetchall()
+        found = {row[0]: row for row in rows}
+        return [{"question": question, "difficulty": DIFFICULTIES[difficulty], "format": FORMATS[fmt],
+                 "options": json.loads(options) if options else [], "answer": answer}
+                for _, difficulty, fmt, question, options, answer in (found[qid] for qid in ids if qid in found)]
+
+
+def main(argv=None):
+    import argparse
+
+    from aceai import config
+
+    parser = argparse.ArgumentParser(description="Import practice questions into the question bank")
+    parser.add_argument("files", nargs="+", help=".csv, .json or .jsonl files with topic, difficulty, "
+                                                 "format, question, options and answer fields")
+    parser.add_argument("--bank", default=config.QUESTION_BANK_PATH)
+    args = parser.parse_args(argv)
+
+    bank = QuestionBank(args.bank)
+    for path in args.files:
+        print(f"{path}: {bank.import_file(path)} new questions")
+    print(f"{len(bank)} questions in {len(bank.topics.topics)} topics")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Local retrieval over study material for the Topic Explainer.
+
+Documents are split into passages and indexed with BM25, a TF-IDF variant.
+IDF is computed at query time, so adding documents never means rescoring the
+old ones. The index is a list of immutable segments. Each segment stores
+postings as flat NumPy arrays (term ids, offsets, doc ids, term counts) and
+is memory-mapped from disk. Adding documents writes one new segment, and
+small segments are merged once there are too many. Deleted passages stop
+counting at once and their postings are dropped by the next merge.
+
+    python -m aceai.retrieval sync   # index new/changed files in the corpus directory
+    python -m aceai.retrieval search "photosynthesis light reactions"
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+_token = re.compile(r"[a-z0-9]+")
+_paragraph = re.compile(r"\n\s*\n")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by explain for from how in is it its of on or that the this "
+    "to was what when where which who why with terms simple intermediate detailed".split()
+)
+
+
+def tokenize(text):
+    return [t for t in _token.findall(text.lower()) if t not in STOPWORDS]
+
+
+def passages(text, max_words=120):
+    """Split a document into paragraph-sized passages of at most `max_words` words"""
+    for paragraph in _paragraph.split(text):
+        words = paragraph.split()
+        for start in range(0, len(words), max_words):
+            chunk = " ".join(words[start:start + max_words])
+            if chunk:
+                yield chunk
+
+
+class Segment:
+    """Immutable postings for a batch of documents, sorted by term id"""
+
+    def __init__(self, terms, offsets, docs, counts):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.counts = counts
+
+    @classmethod
+    def build(cls, term_ids, doc_ids, counts):
+        order = np.lexsort((doc_ids, term_ids))
+        term_ids, doc_ids, counts = term_ids[order], doc_ids[order], counts[order]
+        terms, starts = np.unique(term_ids, return_index=True)
+        offsets = np.r_[starts, len(term_ids)].astype(np.int64)
+        return cls(terms.astype(np.int32), offsets, doc_ids.astype(np.int32), counts.astype(np.uint16))
+
+    def triples(self):
+        term_ids = np.repeat(self.terms, np.diff(self.offsets))
+        return term_ids, np.asarray(self.docs), np.asarray(self.counts)
+
+    def postings(self, term_id):
+        k = np.searchsorted(self.terms, term_id)
+        if k == len(self.terms) or self.terms[k] != term_id:
+            return None
+        start, end = self.offsets[k], self.offsets[k + 1]
+        return self.docs[start:end], self.counts[start:end]
+
+    def save(self, directory, name):
+        for field in ("terms", "offsets", "docs", "counts"):
+            np.save(os.path.join(directory, f"{name}.{field}.npy"), getattr(self, field))
+
+    @classmethod
+    def load(cls, directory, name):
+        return cls(*(np.load(os.path.join(directory, f"{name}.{field}.npy"), mmap_mode="r")
+                     for field in ("terms", "offsets", "docs", "counts")))
+
+
+class RetrievalIndex:
+    """BM25 search over passages, persisted in `directory`"""
+
+    def __init__(self, directory, k1=1.5, b=0.75, max_segments=8):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+
+        manifest = self._read_json("manifest.json", {"segments": [], "files": {}, "next_segment": 0})
+        self.segment_names = manifest["segments"]
+        self.files = manifest["files"]
+        self.next_segment = manifest["next_segment"]
+        self.vocab = {term: i for i, term in enumerate(self._read_json("vocab.json", []))}
+        self.doc_len = self._read_array("doc_len.npy", np.float32)
+        self.deleted = self._read_array("deleted.npy", np.bool_)
+        self.df = self._read_array("df.npy", np.int32)
+        self.offsets = self._read_array("offsets.npy", np.int64)
+        self.segments = [Segment.load(directory, name) for name in self.segment_names]
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, texts, source=None):
+        """Index new passages; returns their doc ids"""
+        first = len(self.doc_len)
+        term_ids, doc_ids, counts, lengths = [], [], [], []
+        with open(os.path.join(self.directory, "passages.jsonl"), "ab") as out:
+            new_offsets = []
+            for doc, text in enumerate(texts, start=first):
+                tokens = tokenize(text)
+                ids = [self.vocab.setdefault(t, len(self.vocab)) for t in tokens]
+                unique, tf = np.unique(np.array(ids, dtype=np.int64), return_counts=True)
+                term_ids.append(unique)
+                doc_ids.append(np.full(len(unique), doc, dtype=np.int64))
+                counts.append(tf)
+                lengths.append(len(tokens))
+                new_offsets.append(out.tell())
+                out.write((json.dumps({"text": text, "source": source}) + "\n").encode("utf-8"))
+        if not lengths:
+            return []
+
+        segment = Segment.build(np.concatenate(term_ids), np.concatenate(doc_ids), np.concatenate(counts))
+        df = np.zeros(len(self.vocab), dtype=np.int32)
+        df[:len(self.df)] = self.df
+        np.add.at(df, segment.terms, np.diff(segment.offsets).astype(np.int32))
+        self.df = df
+        self.doc_len = np.r_[self.doc_len, np.array(lengths, dtype=np.float32)]
+        self.deleted = np.r_[self.deleted, np.zeros(len(lengths), dtype=np.bool_)]
+        self.offsets = np.r_[self.offsets, np.array(new_offsets, dtype=np.int64)]
+
+        name = f"seg{self.next_segment:05d}"
+        self.next_segment += 1
+        segment.save(self.directory, name)
+        self.segments.append(Segment.load(self.directory, name))
+        self.segment_names.append(name)
+        if len(self.segments) > self.max_segments:
+            self._merge()
+        self._save()
+        return list(range(first, len(self.doc_len)))
+
+    def delete(self, doc_ids):
+        """Hide passages from search; their postings are dropped at the next merge"""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        doc_ids = np.unique(doc_ids[~self.deleted[doc_ids]])
+        if not len(doc_ids):
+            return
+        self.deleted[doc_ids] = True
+        # They no longer count towards the document frequency of their terms
+        for segment in self.segments:
+            term_ids, docs, _ = segment.triples()
+            gone = term_ids[np.isin(docs, doc_ids)]
+            np.subtract.at(self.df, gone, 1)
+
+    def sync(self, corpus_dir):
+        """Index files in `corpus_dir` that are new or changed since the last sync.
+
+        Passages of files that have been removed from `corpus_dir` are deleted.
+        """
+        added = 0
+        found = set()
+        for root, _, names in os.walk(corpus_dir):
+            for name in sorted(names):
+                if not name.lower().endswith((".txt", ".md")):
+                    continue
+                path = os.path.join(root, name)
+                found.add(path)
+                mtime = os.path.getmtime(path)
+                known = self.files.get(path)
+                if known and known[0] == mtime:
+                    continue
+                if known:
+                    self.delete(known[1])
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    doc_ids = self.add(passages(f.read()), source=os.path.relpath(path, corpus_dir))
+                self.files[path] = [mtime, doc_ids]
+                added += len(doc_ids)
+        prefix = os.path.join(corpus_dir, "")
+        for path in [path for path in self.files if path.startswith(prefix) and path not in found]:
+            self.delete(self.files.pop(path)[1])
+        self._save()
+        return added
+
+    def search(self, query, k=3):
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries, k=3):
+        """Top-k (doc id, score) pairs for each query"""
+        n_docs = len(self.doc_len)
+        if n_docs == 0:
+            return [[] for _ in queries]
+        live = n_docs - int(self.deleted.sum())
+        avg_len = float(self.doc_len[~self.deleted].mean()) if live else 1.0
+        results = []
+        for query in queries:
+            term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+            docs, weights = [], []
+            for term_id in term_ids:
+                df = self.df[term_id]
+                idf = np.log1p((live - df + 0.5) / (df + 0.5))
+                for segment in self.segments:
+                    hit = segment.postings(term_id)
+                    if hit is None:
+                        continue
+                    seg_docs, tf = np.asarray(hit[0]), np.asarray(hit[1], dtype=np.float32)
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_len[seg_docs] / avg_len)
+                    docs.append(seg_docs)
+                    weights.append(idf * tf * (self.k1 + 1) / (tf + norm))
+            if not docs:
+                results.append([])
+                continue
+            # Sum every term's contribution per document in one pass
+            candidates, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(weights))
+            live_docs = ~self.deleted[candidates]
+            candidates, scores = candidates[live_docs], scores[live_docs]
+            if not len(scores):
+                results.append([])
+                continue
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results.append([(int(candidates[i]), float(scores[i])) for i in top if scores[i] > 0])
+        return results
+
+    def passage(self, doc_id):
+        """{'text': ..., 'source': ...} for one doc id"""
+        with open(os.path.join(self.directory, "passages.jsonl"), "rb") as f:
+            f.seek(int(self.offsets[doc_id]))
+            return json.loads(f.readline())
+
+    def _merge(self):
+        triples = []
+        for segment in self.segments:
+            term_ids, docs, counts = segment.triples()
+            keep = ~self.deleted[docs]
+            triples.append((term_ids[keep], docs[keep], counts[keep]))
+        merged = Segment.build(*(np.concatenate(parts) for parts in zip(*triples)))
+        old_names = self.segment_names
+        name = f"seg{self.next_segment:05d}"
+        self.next_segment += 1
+        merged.save(self.directory, name)
+        self.segments = [Segment.load(self.directory, name)]
+        self.segment_names = [name]
+        for old in old_names:
+            for field in ("terms", "offsets", "docs", "counts"):
+                try:
+                    os.remove(os.path.join(self.directory, f"{old}.{field}.npy"))
+                except OSError:
+                    # Still memory-mapped somewhere (Windows); it is unreferenced and harmless
+                    pass
+
+    def _save(self):
+        np.save(os.path.join(self.directory, "doc_len.npy"), self.doc_len)
+        np.save(os.path.join(self.directory, "deleted.npy"), self.deleted)
+        np.save(os.path.join(self.directory, "df.npy"), self.df)
+        np.save(os.path.join(self.directory, "offsets.npy"), self.offsets)
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        self._write_json("vocab.json", vocab)
+        # The manifest goes last: it is what makes the new segment visible
+        self._write_json("manifest.json", {"segments": self.segment_names, "files": self.files,
+                                           "next_segment": self.next_segment})
+
+    def _read_json(self, name, default):
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return default
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_json(self, name, value):
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(path + ".tmp", path)
+
+    def _read_array(self, name, dtype):
+        path = os.path.join(self.directory, name)
+        return np.load(path) if os.path.exists(path) else np.zeros(0, dtype=dtype)
+
+
+def main(argv=None):
+    import argparse
+
+    from aceai import config
+
+    parser = argparse.ArgumentParser(description="Manage the local retrieval index")
+    parser.add_argument("--index", default=config.RETRIEVAL_INDEX_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    sync = commands.add_parser("sync", help="index new or changed corpus files")
+    sync.add_argument("corpus", nargs="?", default=config.CORPUS_DIR)
+    search = commands.add_parser("search", help="print the top passages for a query")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    index = RetrievalIndex(args.index)
+    if args.command == "sync":
+        print(f"Indexed {index.sync(args.corpus)} new passages ({len(index)} total)")
+    else:
+        for doc_id, score in index.search(args.query, args.k):
+            hit = index.passage(doc_id)
+            print(f"{score:6.2f}  [{hit['source']}] {hit['text'][:100]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Per-session resource accounting and reclamation.
+
+Each Streamlit session keeps its own `st.session_state`. On the Focus Monitor
+page it also holds a live WebRTC stream with its own `SimpleFocusProcessor`.
+`SessionManager` is the process-wide ledger of what every session holds:
+
+- the approximate size of its session state, measured after a script run at
+  most once per reap interval;
+- CPU seconds spent in its script runs and in its focus streams' frame
+  handling (detection in the shared worker pool is not attributed);
+- its live focus streams and the model requests it still waits on.
+
+It also enforces the caps. Session state over the limit first drops the
+values that can be reloaded from disk; they are loaded again on next use. A
+replica refuses focus streams beyond its limit, and a session can only wait
+on a few model requests at a time. A reaper thread closes streams whose
+session has gone quiet, or has been on another page, for longer than the
+stream timeout, and forgets sessions idle past the session timeout. A closed
+processor stops analysing frames at once; the page then ends the connection
+itself on the session's next run. The totals are read by the metrics
+collectors.
+"""
+import contextlib
+import sys
+import threading
+import time
+import weakref
+
+import numpy as np
+
+_SCALARS = (str, bytes, bytearray, int, float, complex, bool, type(None))
+_CONTAINERS = (list, tuple, set, frozenset)
+
+# Objects walked per estimate; huge states are still counted in bounded time
+_MAX_OBJECTS = 200_000
+
+
+def estimate_size(value, seen=None):
+    """Approximate bytes held by one session state value.
+
+    Containers are followed, arrays count their buffers and AceAi's own
+    objects count their attributes. Anything else (models, locks, connections)
+    counts only its own header: it is either shared or not the session's to free.
+    Objects already in `seen` (ids) are not counted again.
+    """
+    seen = set() if seen is None else seen
+    total, stack = 0, [value]
+    while stack and len(seen) < _MAX_OBJECTS:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj, 64)
+        if isinstance(obj, _SCALARS):
+            continue
+        if isinstance(obj, np.ndarray):
+            # A view's buffer belongs to its base
+            if obj.base is not None:
+                stack.append(obj.base)
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, _CONTAINERS):
+            stack.extend(obj)
+        elif type(obj).__module__.startswith("aceai."):
+            stack.extend(getattr(obj, "__dict__", {}).values())
+            for name in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, name):
+                    stack.append(getattr(obj, name))
+    return total
+
+
+class _Session:
+    def __init__(self, now):
+        self.page = None
+        self.page_since = now
+        self.last_seen = now
+        self.measured = 0.0
+        self.state_bytes = 0
+        self.cpu_seconds = 0.0
+        # id(processor) -> [weakref to it, page, CPU seconds counted]
+        self.streams = {}
+        self.requests = []
+        self.notice = None
+
+    def pending(self):
+        return sum(1 for request in list(self.requests) if not request.done())
+
+
+class SessionManager:
+    """Process-wide ledger of session resources, with caps and an idle reaper"""
+
+    def __init__(self, idle_seconds=1800.0, stream_idle_seconds=120.0, max_state_bytes=64 << 20,
+                 max_streams=32, max_pending=1, reap_seconds=15.0, reap=True):
+        self.idle_seconds = idle_seconds
+        self.stream_idle_seconds = stream_idle_seconds
+        self.max_state_bytes = max_state_bytes
+        self.max_streams = max_streams
+        self.max_pending = max_pending
+        self.reap_seconds = reap_seconds
+        self.stats = {"sessions_reaped": 0, "streams_reaped": 0, "streams_refused": 0,
+                      "requests_refused": 0, "state_bytes_dropped": 0}
+        self.cpu_seconds = 0.0
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._cpu_lock = threading.Lock()
+        if reap and reap_seconds > 0:
+            threading.Thread(target=self._reap_forever, name="session-reaper", daemon=True).start()
+
+    def _session(self, session_id, now=None):
+        session = self._sessions.get(session_id)
+        if session is None:
+            with self._lock:
+                session = self._sessions.setdefault(session_id, _Session(time.time() if now is None else now))
+        return session
+
+    def touch(self, session_id, page=None):
+        """Note that the session is still there (and which page it shows)"""
+        now = time.time()
+        session = self._session(session_id, now)
+        session.last_seen = now
+        if page is not None and page != session.page:
+            session.page, session.page_since = page, now
+        return session
+
+    @contextlib.contextmanager
+    def run(self, session_id, page, state, reloadable=()):
+        """Account one script run: its CPU time, then the size of the session state"""
+        session = self.touch(session_id, page)
+        started = time.thread_time()
+        try:
+            yield session
+        finally:
+            self._add_cpu(session, time.thread_time() - started)
+        if time.time() - session.measured >= self.reap_seconds:
+            self.measure(session_id, state, reloadable)
+
+    def measure(self, session_id, state, reloadable=()):
+        """Size the session state and enforce the cap; returns the keys dropped from `state`"""
+        session = self._session(session_id)
+        seen, sizes = set(), {}
+        for key in list(state):
+            sizes[key] = estimate_size(state[key], seen)
+        total = sum(sizes.values())
+        dropped = []
+        # Biggest reloadable values first, until the state is back under the cap
+        for key in sorted((k for k in reloadable if k in sizes), key=sizes.get, reverse=True):
+            if total <= self.max_state_bytes:
+                break
+            del state[key]
+            total -= sizes[key]
+            self.stats["state_bytes_dropped"] += sizes[key]
+            dropped.append(key)
+        session.state_bytes = total
+        session.measured = time.time()
+        return dropped
+
+    def _add_cpu(self, session, seconds):
+        with self._cpu_lock:
+            session.cpu_seconds += seconds
+            self.cpu_seconds += seconds
+
+    def admit_request(self, session_id):
+        """Whether the session may start another model request"""
+        session = self._session(session_id)
+        session.requests = [request for request in session.requests if not request.done()]
+        if len(session.requests) < self.max_pending:
+            return True
+        self.stats["requests_refused"] += 1
+        return False
+
+    def add_request(self, session_id, request):
+        """Count a model request (anything with `done()`) against the session until it is done"""
+        self._session(session_id).requests.append(request)
+
+    def add_stream(self, session_id, processor):
+        """Register a new focus stream's processor; False (and the processor closed) if there is no room"""
+        session = self._session(session_id)
+        key = id(processor)
+        with self._lock:
+            admitted = not processor.closed and self.live_streams() < self.max_streams
+            if admitted:
+                streams = session.streams
+                streams[key] = [weakref.ref(processor, lambda _: streams.pop(key, None)), session.page, 0.0]
+            elif not processor.closed:
+                self.stats["streams_refused"] += 1
+        if not admitted:
+            processor.close()
+        return admitted
+
+    def live_streams(self):
+        count = 0
+        for session in list(self._sessions.values()):
+            for entry in list(session.streams.values()):
+                processor = entry[0]()
+                if processor is not None and not processor.closed:
+                    count += 1
+        return count
+
+    def pop_notice(self, session_id):
+        """A message for the session about something reclaimed since its last run, once"""
+        session = self._sessions.get(session_id)
+        if session is None or session.notice is None:
+            return None
+        notice, session.notice = session.notice, None
+        return notice
+
+    def reap(self, now=None):
+        """Close idle streams and forget idle sessions"""
+        now = time.time() if now is None else now
+        closing = []
+        with self._lock:
+            for session_id, session in list(self._sessions.items()):
+                quiet = now - session.last_seen
+                for key, entry in list(session.streams.items()):
+                    processor = entry[0]()
+                    if processor is None or processor.closed:
+                        session.streams.pop(key, None)
+                        continue
+                    # Fold the stream's CPU time in now; it is lost if the stream just goes away
+                    self._add_cpu(session, processor.cpu_seconds - entry[2])
+                    entry[2] = processor.cpu_seconds
+                    moved_on = session.page != entry[1] and now - session.page_since >= self.stream_idle_seconds
+                    if quiet >= self.stream_idle_seconds or moved_on:
+                        session.streams.pop(key, None)
+                        session.notice = "The Focus Monitor was stopped after a while without activity - start it again to resume."
+                        closing.append(processor)
+                if quiet >= self.idle_seconds and not session.streams:
+                    del self._sessions[session_id]
+                    self.stats["sessions_reaped"] += 1
+        # Closing waits for the processor's frame in progress, so it happens outside the lock
+        for processor in closing:
+            processor.close()
+            self.stats["streams_reaped"] += 1
+        return len(closing)
+
+    def _reap_forever(self):
+        while True:
+            time.sleep(self.reap_seconds)
+            try:
+                self.reap()
+            except Exception:
+                pass
+
+    def totals(self):
+        """Current resource totals across sessions, for the metrics"""
+        sessions = list(self._sessions.values())
+        state = [session.state_bytes for session in sessions]
+        return {
+            "sessions": len(sessions),
+            "streams": self.live_streams(),
+            "pending_requests": sum(session.pending() for session in sessions),
+            "state_bytes": sum(state),
+            "max_state_bytes": max(state, default=0),
+            "cpu_seconds": self.cpu_seconds,
+        }
+
+    def summary(self):
+        """One row per session, largest state first, for the admin panel"""
+        now = time.time()
+        rows = [{"session": session_id[:8], "page": session.page or "", "state_kb": session.state_bytes / 1024,
+                 "cpu_s": session.cpu_seconds, "streams": len(session.streams), "pending": session.pending(),
+                 "idle_s": now - session.last_seen}
+                for session_id, session in list(self._sessions.items())]
+        return sorted(rows, key=lambda row: row["state_kb"], reverse=True)
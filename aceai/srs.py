@@ -0,0 +1,177 @@
+"""Spaced repetition (SM-2) for flashcards.
+
+A `Deck` keeps the scheduling state of every card in parallel NumPy arrays
+(due time, interval, ease, repetitions, lapses), indexed by card id. A binary
+heap of (due, id) entries is the due index. Reviews push a fresh entry, and
+outdated entries are dropped lazily when they reach the top. Fetching the
+next N due cards is therefore O(N log n) rather than a scan of the deck.
+`DeckStore` persists decks in SQLite. Stored cards are keyed by a hash of
+their answer rather than their position in one session's deck, and reviews
+update only the reviewed card, so two open tabs do not overwrite each other.
+"""
+import hashlib
+import heapq
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+DAY = 86400.0
+
+# Answer buttons -> SM-2 quality grades
+AGAIN, HARD, GOOD, EASY = 1, 3, 4, 5
+
+
+def card_key(answer):
+    """Stable 63-bit id of a card, the same in every session"""
+    return int.from_bytes(hashlib.blake2b(answer.encode("utf-8"), digest_size=8).digest(), "big") >> 1
+
+
+class Deck:
+    """One user's cards and their SM-2 state"""
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.questions = []
+        self.answers = []
+        self.keys = []
+        self._by_answer = {}
+        self.due = np.zeros(capacity, dtype=np.float64)
+        self.interval = np.zeros(capacity, dtype=np.float32)
+        self.ease = np.full(capacity, 2.5, dtype=np.float32)
+        self.reps = np.zeros(capacity, dtype=np.uint16)
+        self.lapses = np.zeros(capacity, dtype=np.uint16)
+        self._heap = []
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed):
+        capacity = len(self.due)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, fill in (("due", 0), ("interval", 0), ("ease", 2.5), ("reps", 0), ("lapses", 0)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add(self, question, answer, now=None):
+        """Add a new card, due right away; returns its id (the existing id for a duplicate)"""
+        if answer in self._by_answer:
+            return self._by_answer[answer]
+        now = time.time() if now is None else now
+        card = self.size
+        self._grow(card + 1)
+        self.questions.append(question)
+        self.answers.append(answer)
+        self.keys.append(card_key(answer))
+        self._by_answer[answer] = card
+        self.due[card] = now
+        self.size += 1
+        heapq.heappush(self._heap, (now, card))
+        return card
+
+    def load_state(self, due, interval, ease, reps, lapses):
+        """Replace the scheduling arrays in bulk (used when loading from disk)"""
+        n = len(due)
+        self._grow(n)
+        self.due[:n], self.interval[:n], self.ease[:n] = due, interval, ease
+        self.reps[:n], self.lapses[:n] = reps, lapses
+        self._heap = list(zip(self.due[:n].tolist(), range(n)))
+        heapq.heapify(self._heap)
+
+    def next_due(self, n=1, now=None):
+        """Ids of up to `n` cards due by `now`, most overdue first"""
+        now = time.time() if now is None else now
+        found = []
+        while self._heap and len(found) < n and self._heap[0][0] <= now:
+            due, card = heapq.heappop(self._heap)
+            if due == self.due[card] and card not in found:
+                found.append(card)
+        # Peeking must not consume the index
+        for card in found:
+            heapq.heappush(self._heap, (float(self.due[card]), card))
+        return found
+
+    def due_count(self, now=None):
+        """Number of cards due by `now` (vectorized; this one does look at every card)"""
+        now = time.time() if now is None else now
+        return int(np.count_nonzero(self.due[:self.size] <= now))
+
+    def review(self, card, quality, now=None):
+        self.review_many([card], [quality], now)
+
+    def review_many(self, cards, qualities, now=None):
+        """Apply SM-2 to a batch of reviews at once"""
+        now = time.time() if now is None else now
+        cards = np.asarray(cards, dtype=np.int64)
+        q = np.asarray(qualities, dtype=np.float32)
+        passed = q >= 3
+        reps = self.reps[cards]
+        interval = np.where(reps == 0, 1.0, np.where(reps == 1, 6.0, np.round(self.interval[cards] * self.ease[cards])))
+        self.interval[cards] = np.where(passed, interval, 1.0)
+        self.reps[cards] = np.where(passed, reps + 1, 0)
+        self.lapses[cards] += (~passed).astype(np.uint16)
+        ease = self.ease[cards] + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02)
+        self.ease[cards] = np.maximum(1.3, ease)
+        self.due[cards] = now + self.interval[cards] * DAY
+        for card in cards.tolist():
+            heapq.heappush(self._heap, (float(self.due[card]), card))
+        # Keep stale entries from piling up when the same cards are reviewed again and again
+        if len(self._heap) > 2 * self.size + 1024:
+            self.load_state(*(a[:self.size].copy() for a in (self.due, self.interval, self.ease,
+                                                           self.reps, self.lapses)))
+
+
+class DeckStore:
+    """SQLite persistence for decks, one row per card keyed by `card_key`"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS cards ("
+                       "user_id TEXT, card INTEGER, question TEXT, answer TEXT, "
+                       "due REAL, interval REAL, ease REAL, reps INTEGER, lapses INTEGER, "
+                       "PRIMARY KEY (user_id, card))")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self, user_id):
+        with self._connect() as db:
+            rows = db.execute("SELECT card, question, answer, due, interval, ease, reps, lapses FROM cards "
+                              "WHERE user_id = ? ORDER BY rowid", (user_id,)).fetchall()
+        deck = Deck(capacity=max(1024, len(rows)))
+        if rows:
+            keys, questions, answers, *state = zip(*rows)
+            deck.keys, deck.questions, deck.answers = list(keys), list(questions), list(answers)
+            deck._by_answer = {answer: card for card, answer in enumerate(answers)}
+            deck.size = len(rows)
+            deck.load_state(*(np.array(column) for column in state))
+        return deck
+
+    def add(self, user_id, deck, cards):
+        """Store new cards; a card the user already has keeps its stored schedule"""
+        rows = [(user_id, deck.keys[card], deck.questions[card], deck.answers[card], *self._schedule(deck, card))
+                for card in cards]
+        with self._connect() as db:
+            db.executemany("INSERT OR IGNORE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def update(self, user_id, deck, cards):
+        """Write the schedule of reviewed cards, leaving every other card alone"""
+        rows = [(*self._schedule(deck, card), user_id, deck.keys[card]) for card in cards]
+        with self._connect() as db:
+            db.executemany("UPDATE cards SET due = ?, interval = ?, ease = ?, reps = ?, lapses = ? "
+                           "WHERE user_id = ? AND card = ?", rows)
+
+    @staticmethod
+    def _schedule(deck, card):
+        return (float(deck.due[card]), float(deck.interval[card]), float(deck.ease[card]),
+                int(deck.reps[card]), int(deck.lapses[card]))
@@ -0,0 +1,99 @@
+"""Token-by-token generation for the Topic Explainer.
+
+`TokenStream` runs `model.generate` in a background thread with a transformers
+`TextIteratorStreamer` and yields text as it is decoded, so it can be handed
+straight to `st.write_stream`. Cancelling the stream (or dropping it when the
+user navigates away) stops generation at the next token and frees the CPU.
+"""
+import threading
+import time
+
+from aceai import metrics
+from aceai.models import lazy_import
+
+
+def _timed_streamer(transformers, tokenizer):
+    """A TextIteratorStreamer that adds up the time spent decoding tokens"""
+    class TimedStreamer(transformers.TextIteratorStreamer):
+        decode_seconds = 0.0
+
+        def put(self, value):
+            started = time.perf_counter()
+            super().put(value)
+            self.decode_seconds += time.perf_counter() - started
+
+    return TimedStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+
+class TokenStream:
+    """Iterable of decoded text chunks for one prompt"""
+
+    def __init__(self, model, prompt, **params):
+        self.model = model
+        self.prompt = prompt
+        self.params = params
+        self.text = ""
+        self.completed = False
+        self.error = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set() and not self.completed
+
+    def done(self):
+        """Finished, failed or cancelled: no more tokens will come"""
+        return self._cancel.is_set()
+
+    def __iter__(self):
+        transformers = lazy_import("transformers")
+        tokenizer = self.model.tokenizer
+        timed = metrics.ENABLED
+        if timed:
+            streamer = _timed_streamer(transformers, tokenizer)
+        else:
+            streamer = transformers.TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop_when_cancelled = transformers.StoppingCriteriaList(
+            [lambda input_ids, scores, **kwargs: self._cancel.is_set()]
+        )
+
+        started = time.perf_counter()
+        kwargs = dict(tokenizer(self.prompt, return_tensors="pt"))
+        if timed:
+            metrics.MODEL_SECONDS.labels("stream", "tokenize").observe(time.perf_counter() - started)
+        kwargs.update(
+            streamer=streamer,
+            stopping_criteria=stop_when_cancelled,
+            do_sample=True,
+            pad_token_id=tokenizer.eos_token_id,
+        )
+        # The pipeline-level option has no meaning for a single streamed sequence
+        kwargs.update({k: v for k, v in self.params.items() if k != "num_return_sequences"})
+
+        def generate():
+            started = time.perf_counter()
+            try:
+                self.model.model.generate(**kwargs)
+            except Exception as e:
+                # Unblock the reader; it sees a short, incomplete stream
+                self.error = e
+                streamer.end()
+            if timed:
+                decode = streamer.decode_seconds
+                metrics.MODEL_SECONDS.labels("stream", "generate").observe(time.perf_counter() - started - decode)
+                metrics.MODEL_SECONDS.labels("stream", "decode").observe(decode)
+
+        threading.Thread(target=generate, name="explainer-stream", daemon=True).start()
+        try:
+            for chunk in streamer:
+                if self._cancel.is_set():
+                    return
+                self.text += chunk
+                yield chunk
+            self.completed = self.error is None and not self._cancel.is_set()
+        finally:
+            # Runs on normal exit, on cancel and when Streamlit abandons the script run
+            self._cancel.set()
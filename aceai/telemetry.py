@@ -0,0 +1,240 @@
+"""Focus Monitor telemetry.
+
+Each stream records (timestamp, state, score, face box) for every analysed
+frame into a fixed-size, array-backed ring buffer, so recording is O(1) with
+no per-sample objects. Every few seconds the new samples are downsampled to
+one row per second. Those rows go to a background writer that stores them in
+SQLite under the user's id, so they outlive the browser session. The newest
+rows are also kept in memory until they are surely on disk. `summarize` turns
+the arrays into the numbers shown on the Progress Dashboard with NumPy only.
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+STATES = ("CALIBRATING", "FOCUSED", "DISTRACTED", "AWAY")
+STATE_CODES = {name: code for code, name in enumerate(STATES)}
+FOCUSED, DISTRACTED, AWAY = STATE_CODES["FOCUSED"], STATE_CODES["DISTRACTED"], STATE_CODES["AWAY"]
+
+_NO_FACE = (-1, -1, -1, -1)
+
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """Columns of fixed dtype in preallocated arrays; old rows are overwritten"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.t = np.zeros(capacity, dtype=np.float64)
+        self.state = np.zeros(capacity, dtype=np.uint8)
+        self.score = np.zeros(capacity, dtype=np.uint8)
+        self.face = np.zeros((capacity, 4), dtype=np.int16)
+        self.written = 0
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def append(self, t, state, score, face):
+        i = self.written % self.capacity
+        self.t[i] = t
+        self.state[i] = state
+        self.score[i] = score
+        self.face[i] = face
+        self.written += 1
+
+    def extend(self, t, state, score, face):
+        for row in zip(t, state, score, face):
+            self.append(*row)
+
+    def tail(self, n=None):
+        """The newest `n` rows (default: all kept rows) in time order"""
+        n = len(self) if n is None else min(n, len(self))
+        end = self.written % self.capacity
+        index = np.arange(end - n, end) % self.capacity
+        return self.t[index], self.state[index], self.score[index], self.face[index]
+
+
+def downsample(t, state, score, face, bucket=1.0):
+    """One row per `bucket` seconds: start time, most common state, mean score, last box"""
+    if len(t) == 0:
+        return t, state, score, face
+    ids = np.floor(t / bucket).astype(np.int64)
+    buckets, first, inverse, counts = np.unique(ids, return_index=True, return_inverse=True,
+                                                return_counts=True)
+    mean_score = np.bincount(inverse, weights=score, minlength=len(buckets)) / counts
+    votes = np.bincount(inverse * len(STATES) + state, minlength=len(buckets) * len(STATES))
+    common_state = votes.reshape(len(buckets), len(STATES)).argmax(axis=1)
+    last = np.r_[first[1:], len(t)] - 1
+    return (buckets * bucket, common_state.astype(np.uint8),
+            np.round(mean_score).astype(np.uint8), face[last])
+
+
+def summarize(t, state, score, max_gap=2.0, window=60, min_episode=5.0):
+    """Vectorized session summary over time-ordered samples.
+
+    Gaps longer than `max_gap` seconds (stream stopped) count as no time.
+    A distraction episode is a run of DISTRACTED/AWAY samples lasting at least
+    `min_episode` seconds. `rolling_score` is the mean over the last `window`
+    samples.
+    """
+    if len(t) == 0:
+        return {"tracked_minutes": 0.0, "focused_minutes": 0.0, "focused_share": 0.0,
+                "distraction_episodes": 0, "average_score": 0.0,
+                "rolling_t": t, "rolling_score": np.zeros(0)}
+    dt = np.diff(t, append=t[-1])
+    dt[dt > max_gap] = 0.0
+
+    focused = state == FOCUSED
+    distracted = (state == DISTRACTED) | (state == AWAY)
+    starts = distracted & ~np.r_[False, distracted[:-1]]
+    run_id = np.cumsum(starts) - 1
+    durations = np.bincount(run_id[distracted], weights=dt[distracted]) if distracted.any() else np.zeros(0)
+
+    cumulative = np.cumsum(np.r_[0.0, score.astype(np.float64)])
+    n = np.arange(1, len(score) + 1)
+    lo = np.maximum(0, n - window)
+    rolling = (cumulative[n] - cumulative[lo]) / (n - lo)
+
+    tracked = dt.sum()
+    return {
+        "tracked_minutes": tracked / 60,
+        "focused_minutes": dt[focused].sum() / 60,
+        "focused_share": dt[focused].sum() / tracked if tracked else 0.0,
+        "distraction_episodes": int((durations >= min_episode).sum()),
+        "average_score": float(score.mean()),
+        "rolling_t": t,
+        "rolling_score": rolling,
+    }
+
+
+class TelemetryStore:
+    """SQLite table of per-second focus samples by user, written by a background thread"""
+
+    def __init__(self, path, max_queued=1000, retry_seconds=1.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.retry_seconds = retry_seconds
+        # Batches waiting for the writer; past this, new batches are dropped
+        self._queue = queue.Queue(maxsize=max_queued)
+        self.stats = {"written": 0, "dropped": 0, "errors": 0}
+        with self._connect() as db:
+            # Samples used to be keyed by browser session (focus_samples); those rows cannot be matched to a user
+            db.execute("CREATE TABLE IF NOT EXISTS user_focus_samples ("
+                       "user_id TEXT, t REAL, state INTEGER, score INTEGER, "
+                       "x INTEGER, y INTEGER, w INTEGER, h INTEGER)")
+            db.execute("CREATE INDEX IF NOT EXISTS user_focus_samples_user ON user_focus_samples (user_id, t)")
+        threading.Thread(target=self._write_forever, name="focus-telemetry", daemon=True).start()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save(self, user_id, t, state, score, face):
+        """Queue downsampled rows; never blocks the caller"""
+        rows = [(user_id, float(a), int(b), int(c), *map(int, d)) for a, b, c, d in zip(t, state, score, face)]
+        if rows:
+            try:
+                self._queue.put_nowait(rows)
+            except queue.Full:
+                self.stats["dropped"] += len(rows)
+
+    def load(self, user_id, since=0.0):
+        """The user's stored rows from `since` on, as (t, state, score, face) arrays"""
+        with self._connect() as db:
+            rows = db.execute("SELECT t, state, score, x, y, w, h FROM user_focus_samples "
+                              "WHERE user_id = ? AND t >= ? ORDER BY t", (user_id, since)).fetchall()
+        data = np.array(rows, dtype=np.float64).reshape(-1, 7)
+        return (data[:, 0], data[:, 1].astype(np.uint8), data[:, 2].astype(np.uint8),
+                data[:, 3:].astype(np.int16))
+
+    def _write_forever(self):
+        db = None
+        rows = []
+        while True:
+            if not rows:
+                rows = self._queue.get()
+            # Drain whatever else piled up so it goes out in one transaction
+            while not self._queue.empty():
+                rows += self._queue.get_nowait()
+            try:
+                db = db or self._connect()
+                with db:
+                    db.executemany("INSERT INTO user_focus_samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self.stats["written"] += len(rows)
+                rows = []
+            except sqlite3.Error:
+                # Keep the rows and try again; meanwhile the bounded queue sheds new batches
+                self.stats["errors"] += 1
+                logger.exception("Could not write %d focus samples to %s; retrying", len(rows), self.path)
+                if db is not None:
+                    db.close()
+                    db = None
+                time.sleep(self.retry_seconds)
+
+
+class FocusTelemetry:
+    """Per-session recorder fed by the focus processor; rows are stored under the user's id"""
+
+    def __init__(self, user_id, store=None, raw_seconds=60, fps=30, flush_seconds=10.0,
+                 history_seconds=900):
+        self.user_id = user_id
+        self.store = store
+        self.flush_seconds = flush_seconds
+        self.raw = RingBuffer(int(raw_seconds * fps))
+        self.history = RingBuffer(int(history_seconds))
+        self._flushed = 0
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, state, score, face=None, t=None):
+        t = time.time() if t is None else t
+        with self._lock:
+            self.raw.append(t, STATE_CODES.get(state, 0), score, _NO_FACE if face is None else face)
+            if t - self._last_flush >= self.flush_seconds:
+                self._flush(t)
+
+    def flush(self):
+        with self._lock:
+            self._flush(time.time())
+
+    def _flush(self, now):
+        pending = self.raw.written - self._flushed
+        if pending:
+            rows = downsample(*self.raw.tail(pending))
+            self.history.extend(*rows)
+            if self.store is not None:
+                self.store.save(self.user_id, *rows)
+        self._flushed = self.raw.written
+        self._last_flush = now
+
+    def summary(self, since=0.0, **kwargs):
+        """Summary of the user's focus from `since` on: stored rows, recent rows and unflushed samples"""
+        with self._lock:
+            history = self.history.tail()
+            pending = self.raw.written - self._flushed
+            recent = downsample(*self.raw.tail(pending)) if pending else None
+        parts = [history] if recent is None else [history, recent]
+        if self.store is not None:
+            parts.insert(0, self.store.load(self.user_id, since))
+        return summarize(*merge(*parts, since=since)[:3], **kwargs)
+
+
+def merge(*parts, since=0.0):
+    """Downsampled rows from several sources in time order, one row per timestamp, from `since` on"""
+    t, state, score, face = [np.concatenate(column) for column in zip(*parts)]
+    # Rows still in memory may also be on disk already
+    t, first = np.unique(t, return_index=True)
+    keep = t >= since
+    return t[keep], state[first][keep], score[first][keep], face[first][keep]
+
+
+def stored_summary(store, user_id, since=0.0, **kwargs):
+    """Summary of a user's stored focus rows, for sessions that are not recording"""
+    return summarize(*store.load(user_id, since)[:3], **kwargs)
@@ -1,14 +1,33 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import requests
+import functools
 import json
-from transformers import pipeline, set_seed
-import torch
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
-import random
 import time
-import cv2
+import uuid
+import os
 import numpy as np
 
+# transformers, torch and cv2 are imported lazily by the pages that need them
+from aceai import config, metrics
+from aceai.models import ModelRegistry, load_text_generator, WARMING, FAILED
+from aceai.generation import explainer_prompt, explainer_params, generate_kwargs, pipeline_kwargs, finish
+from aceai.gen_cache import GenerationCache, cache_key
+from aceai.batching import BatchingGenerator
+from aceai.streaming import TokenStream
+from aceai.progress_store import SQLiteProgressStore, ProgressTracker
+from aceai.content import ContentStore, TopicIndex
+from aceai.retrieval import RetrievalIndex
+from aceai.flashcards import flashcards
+from aceai.srs import DeckStore, AGAIN, HARD, GOOD, EASY
+from aceai.planner import StudyPlan
+from aceai.question_bank import QuestionBank
+from aceai.pregenerate import PregeneratedContent, artifact_settings
+from aceai.sessions import SessionManager
+
 # Set up the page
 st.set_page_config(
     page_title="AceAi - Your Smart Study Buddy",
@@ -26,26 +45,219 @@ st.markdown("""
 
 # Initialize AI models
 @st.cache_resource
-def load_ai_models():
-    """Load AI models for different features"""
+def get_metrics_server():
+    """Local /metrics endpoint, started once per process when ACEAI_METRICS=1"""
+    if not metrics.ENABLED:
+        return None
     try:
-        # Use a smaller, faster model for text generation
-        generator = pipeline('text-generation', model='gpt2', torch_dtype=torch.float32)
-        return generator
-    except Exception as e:
-        st.sidebar.warning(f"AI models loading: Using simplified mode")
+        return metrics.serve()
+    except OSError:
+        # Another AceAi process on this machine already serves the port
+        return None
+
+@st.cache_resource
+def get_model_registry():
+    """Process-wide registry of lazily loaded AI models"""
+    registry = ModelRegistry()
+    registry.register('text-generation', load_text_generator)
+    return registry
+
+def load_ai_models(wait=0):
+    """Return the text generator if it is warm, starting the background load if needed"""
+    return get_model_registry().get('text-generation', timeout=wait)
+
+@st.cache_resource
+def get_inference_scheduler():
+    """Batches explainer prompts from every session into shared forward passes"""
+    registry = get_model_registry()
+    return BatchingGenerator(lambda: registry.get('text-generation'),
+                             max_batch_size=config.BATCH_MAX_SIZE,
+                             max_wait_ms=config.BATCH_MAX_WAIT_MS,
+                             prepare=pipeline_kwargs)
+
+logger = logging.getLogger("aceai.app")
+
+# Explanations are shared across sessions and survive restarts
+EXPLAINER_MODEL_ID = f"{config.MODEL_ID}:{config.MODEL_BACKEND}"
+
+@st.cache_resource
+def get_explanation_cache():
+    """Process-wide cache of generated explanations"""
+    cache = GenerationCache(config.CACHE_PATH,
+                            memory_items=config.CACHE_MEMORY_ITEMS,
+                            disk_items=config.CACHE_DISK_ITEMS,
+                            ttl=config.CACHE_TTL_SECONDS)
+    metrics.collector("aceai_explanation_cache_lookups_total", "Explanation cache lookups by result",
+                      "counter", ("result",),
+                      lambda: {(name,): cache.stats[name] for name in ("memory_hits", "disk_hits", "misses")})
+    metrics.collector("aceai_explanation_cache_hit_ratio", "Share of explanation cache lookups that hit",
+                      "gauge", (), lambda: {(): cache.hit_rate()})
+    return cache
+
+@st.cache_resource
+def get_content_store():
+    """Canned explanations and practice questions, loaded and indexed once per process"""
+    store = ContentStore.load(config.CONTENT_DIR)
+    metrics.collector("aceai_topic_match_cache_lookups_total", "Memoized topic lookups by result",
+                      "counter", ("result",),
+                      lambda: {(result,): count for result, count in TopicIndex.stats.items()})
+    return store
+
+@st.cache_resource
+def get_pregenerated():
+    """Syllabus explanations and practice sets generated offline, memory-mapped once per process"""
+    content = PregeneratedContent(config.PREGENERATED_PATH,
+                                  expected=artifact_settings(config.MODEL_ID, config.MODEL_BACKEND))
+    metrics.collector("aceai_pregenerated_lookups_total", "Pre-generated content lookups by result",
+                      "counter", ("result",),
+                      lambda: {(name,): content.stats[name] for name in ("hits", "misses")})
+    return content
+
+@st.cache_resource
+def get_retrieval_index():
+    """Local BM25 index over the study material, brought up to date at startup"""
+    index = RetrievalIndex(config.RETRIEVAL_INDEX_DIR)
+    if os.path.isdir(config.CORPUS_DIR):
+        index.sync(config.CORPUS_DIR)
+    return index
+
+def find_passages(topic, k=3):
+    """Study-material passages relevant to a topic, best first"""
+    index = get_retrieval_index()
+    return [index.passage(doc_id) for doc_id, score in index.search(topic, k)
+            if score >= config.RETRIEVAL_MIN_SCORE]
+
+@st.cache_resource
+def get_question_bank():
+    """Indexed practice questions, seeded from the bundled question_bank.csv on first run"""
+    bank = QuestionBank(config.QUESTION_BANK_PATH, refresh_seconds=config.QUESTION_BANK_REFRESH_SECONDS)
+    seed_file = os.path.join(config.CONTENT_DIR, "question_bank.csv")
+    if len(bank) == 0 and os.path.exists(seed_file):
+        bank.import_file(seed_file)
+    return bank
+
+def get_practice_history():
+    """Which practice questions this user has already been given, loaded once per session"""
+    if 'practice_history' not in st.session_state:
+        st.session_state.practice_history = get_question_bank().history(st.session_state.user_id)
+    return st.session_state.practice_history
+
+@st.cache_resource
+def get_deck_store():
+    """Spaced-repetition decks for every user"""
+    return DeckStore(config.SRS_PATH)
+
+def get_deck():
+    """This user's flashcard deck, loaded once per session"""
+    if 'deck' not in st.session_state:
+        st.session_state.deck = get_deck_store().load(st.session_state.user_id)
+    return st.session_state.deck
+
+@st.cache_resource
+def get_focus_pool():
+    """Worker processes shared by every Focus Monitor stream (None = analyse in-stream)"""
+    if config.FOCUS_POOL_WORKERS <= 0:
         return None
+    from aceai.focus_pool import FocusAnalysisPool
+    # Slots fit a frame downscaled to the detection width, portrait or landscape
+    width = config.FOCUS_DETECT_WIDTH
+    return FocusAnalysisPool(config.FOCUS_POOL_WORKERS, max_width=width, max_height=width * 2)
+
+@st.cache_resource
+def get_telemetry_store():
+    """On-disk store for downsampled focus telemetry"""
+    from aceai.telemetry import TelemetryStore
+    store = TelemetryStore(config.TELEMETRY_PATH)
+    metrics.collector("aceai_focus_telemetry_rows_total", "Downsampled focus rows by what happened to them",
+                      "counter", ("result",),
+                      lambda: {(name,): value for name, value in store.stats.items() if name != "errors"})
+    return store
+
+def get_focus_telemetry():
+    """This session's focus telemetry recorder"""
+    if 'focus_telemetry' not in st.session_state:
+        from aceai.telemetry import FocusTelemetry
+        st.session_state.focus_telemetry = FocusTelemetry(
+            st.session_state.user_id,
+            store=get_telemetry_store(),
+            raw_seconds=config.TELEMETRY_RAW_SECONDS,
+            fps=config.FOCUS_TARGET_FPS,
+            flush_seconds=config.TELEMETRY_FLUSH_SECONDS,
+            history_seconds=config.TELEMETRY_HISTORY_SECONDS)
+    return st.session_state.focus_telemetry
+
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+@st.cache_resource
+def get_progress_tracker():
+    """Process-wide progress cache with write-behind to the progress store"""
+    return ProgressTracker(SQLiteProgressStore(config.PROGRESS_PATH),
+                           flush_seconds=config.PROGRESS_FLUSH_SECONDS,
+                           cache_seconds=config.PROGRESS_CACHE_SECONDS,
+                           max_cached=config.PROGRESS_CACHE_USERS)
+
+def record_progress(counter, amount=1):
+    """Add to one of the user's progress counters"""
+    get_progress_tracker().increment(st.session_state.user_id, counter, amount)
 
-# Initialize session state for user progress
-if 'user_progress' not in st.session_state:
-    st.session_state.user_progress = {
-        'streak': random.randint(3, 7),
-        'topics_mastered': random.randint(5, 12),
-        'questions_answered': random.randint(20, 50),
-        'study_time': random.randint(10, 30),
-        'level': 'Intermediate',
-        'progress_percent': random.randint(40, 75)
-    }
+# Session state that is loaded again from disk on next use, so it can go when a session is over its cap
+RELOADABLE_STATE = ('deck', 'practice_history')
+
+@st.cache_resource
+def get_session_manager():
+    """Process-wide accounting of each session's state, CPU, streams and model requests"""
+    manager = SessionManager(idle_seconds=config.SESSION_IDLE_SECONDS,
+                             stream_idle_seconds=config.SESSION_STREAM_IDLE_SECONDS,
+                             max_state_bytes=int(config.SESSION_MAX_STATE_MB * 2**20),
+                             max_streams=config.SESSION_MAX_STREAMS,
+                             max_pending=config.SESSION_MAX_PENDING,
+                             reap_seconds=config.SESSION_REAP_SECONDS)
+    metrics.collector("aceai_session_resources", "Resources held by the sessions on this replica",
+                      "gauge", ("resource",),
+                      lambda: {(name,): value for name, value in manager.totals().items() if name != "cpu_seconds"})
+    metrics.collector("aceai_session_cpu_seconds_total", "CPU time of script runs and focus streams",
+                      "counter", (), lambda: {(): manager.cpu_seconds})
+    metrics.collector("aceai_session_reclaimed_total", "Caps enforced and idle resources reclaimed",
+                      "counter", ("event",), lambda: {(name,): value for name, value in manager.stats.items()})
+    return manager
+
+# The user id lives in the URL so progress survives refreshes and replica moves
+if 'user_id' not in st.session_state:
+    if 'uid' not in st.query_params:
+        st.query_params['uid'] = uuid.uuid4().hex
+    st.session_state.user_id = st.query_params['uid']
+
+# Initialize session state for user progress (served from the tracker's cache)
+get_progress_tracker().touch(st.session_state.user_id)
+st.session_state.user_progress = get_progress_tracker().get(st.session_state.user_id)
+
+# Any new script run means the user moved on - stop a stream left over from the last one
+if st.session_state.get('explainer_stream') is not None:
+    st.session_state.explainer_stream.cancel()
+    st.session_state.explainer_stream = None
+
+def page_fragment(run_every=None):
+    """st.fragment that times every run and counts it as session activity.
+
+    A fragment-only rerun skips the page timer and the session ledger's script
+    run, so this is the only place it is measured and seen.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            get_session_manager().touch(st.session_state.session_id)
+            with metrics.timer(metrics.FRAGMENT_SECONDS, fn.__name__):
+                return fn(*args, **kwargs)
+        return st.fragment(run, run_every=run_every)
+    return decorate
+
+def rerun_fragment():
+    """Rerun only the calling fragment, or the whole app if it ran as part of a full run"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
 # Home Page
 def home_page():
@@ -61,7 +273,7 @@ def home_page():
     with col3:
         st.metric("❓ Questions Done", st.session_state.user_progress['questions_answered'])
     with col4:
-        st.metric("⏱️ Study Hours", st.session_state.user_progress['study_time'])
+        st.metric("⏱️ Study Hours", f"{st.session_state.user_progress['study_time']:.1f}")
     
     st.write("")  # Add some space
     
@@ -83,57 +295,118 @@ def home_page():
         st.info("📈 **Progress Tracker**\n\nMonitor your learning journey with detailed analytics and insights\n\n**Perfect for:** • Goal setting • Progress monitoring • Motivation")
 
 # Smart Scheduler Page
+@page_fragment()
+def scheduler_form():
+    """Plan inputs and the day-by-day plan; widget changes rerun only this part"""
+    st.subheader("Create Your Personalized Study Plan")
+    
+    subjects = st.text_input("📚 Subjects (comma separated, optional weight like Physics:2):", "Mathematics, Physics, Chemistry, Biology")
+    hours_per_day = st.slider("⏱️ Hours available per day:", 1, 12, 6)
+    exam_date = st.date_input("📅 Upcoming exam date (if any):", datetime.now() + timedelta(days=14))
+    difficulty = st.select_slider("🎯 Difficulty level:", options=["Easy", "Medium", "Hard", "Intense"])
+    
+    exam_mode = st.checkbox("🚀 Enable Exam Mode (Intensive preparation)")
+    
+    subject_list, weights = [], []
+    for entry in subjects.split(','):
+        name, _, weight = entry.partition(':')
+        if name.strip():
+            subject_list.append(name.strip())
+            try:
+                weights.append(max(0.1, float(weight)) if weight.strip() else 1.0)
+            except ValueError:
+                weights.append(1.0)
+    days_until_exam = (exam_date - datetime.now().date()).days
+    
+    # Day-by-day plan up to the exam (two weeks if there is no upcoming exam)
+    today = datetime.now().date()
+    plan_end = exam_date if days_until_exam > 0 else today + timedelta(days=14)
+    
+    # Subjects that must be done before the end of the plan
+    deadlines = []
+    with st.expander("🗓️ Subject deadlines (optional)"):
+        for i, subject in enumerate(subject_list):
+            # Keyed by the plan end too, so a new exam date resets the deadlines to it
+            deadlines.append(st.date_input(f"Finish {subject} by:", plan_end, min_value=today + timedelta(days=1),
+                                           max_value=plan_end, key=f"deadline_{i}_{subject}_{plan_end}"))
+    
+    if st.button("Generate Smart Schedule", type="primary"):
+        if not subject_list:
+            st.warning("Enter at least one subject to plan for.")
+            return
+        if exam_mode and len(weights) > 1:
+            # Exam mode: the primary subject gets 60% of study time
+            weights[0] = 1.5 * sum(weights[1:])
+        st.session_state.study_plan = StudyPlan(subject_list, today, plan_end, hours_per_day,
+                                                weights=weights, deadlines=deadlines, difficulty=difficulty)
+        
+        st.success("📋 **Your Personalized Study Schedule**")
+        
+        if exam_mode and days_until_exam > 0:
+            st.write(f"**Mode:** 🚀 ULTIMATE EXAM PREPARATION")
+            st.write(f"**Time until exam:** {days_until_exam} days")
+            st.write(f"**Daily commitment:** {hours_per_day} hours")
+            st.write(f"**Difficulty:** {difficulty}")
+            
+            # AI-generated schedule logic
+            primary_subject = subject_list[0]
+            st.write(f"**Primary Focus:** {primary_subject} ({hours_per_day * 0.6:.1f}h daily)")
+            st.write("**Secondary Subjects:** Quick revisions and practice problems")
+            st.write("**Recommended Strategy:**")
+            st.write("• Morning: Intensive topic study (2-3 hours)")
+            st.write("• Afternoon: Practice problems (2 hours)")
+            st.write("• Evening: Revision and flashcards (1-2 hours)")
+            
+        else:
+            time_per_subject = hours_per_day / len(subject_list)
+            st.write(f"**Mode:** 📅 BALANCED LEARNING")
+            st.write(f"**Daily Study Time:** {hours_per_day} hours")
+            st.write(f"**Subjects:** {len(subject_list)} subjects")
+            
+            st.write("**Daily Distribution:**")
+            for i, subject in enumerate(subject_list):
+                emoji = ["🔢", "🔬", "🧪", "🧬", "📖", "🌍"][i % 6]
+                st.write(f"{emoji} **{subject}:** {time_per_subject:.1f} hours")
+            
+            st.write("**Recommended Approach:**")
+            st.write("• 45min study + 15min break cycles")
+            st.write("• Mix different subjects to avoid fatigue")
+            st.write("• Include active recall sessions")
+    
+    if 'study_plan' in st.session_state:
+        plan = st.session_state.study_plan
+        st.subheader("📆 Day-by-Day Plan")
+        rows = []
+        for d, (day, allocations) in enumerate(plan.calendar()):
+            row = {"Date": day.strftime("%a %d %b")}
+            for subject, study, revision in allocations:
+                row[subject] = f"{study:g}h" + (f" (+{revision:g}h revision)" if revision else "")
+            if not allocations:
+                row["Note"] = "Day off" if plan.hours[d] == 0 else "Nothing scheduled"
+            rows.append(row)
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        idle = plan.idle_days()
+        if idle:
+            st.info(f"Nothing is scheduled on {len(idle)} day(s) from {idle[0].strftime('%a %d %b')}: "
+                    "every subject is past its deadline or done by then. "
+                    "Use them for extra practice, or move a deadline later.")
+        
+        # Changing one day only replans from that day on
+        with st.expander("✏️ Adjust a day"):
+            change_day = st.date_input("Day to change:", plan.start, min_value=plan.start,
+                                       max_value=plan.start + timedelta(days=plan.days - 1))
+            change_hours = st.slider("Hours available that day:", 0, 12, int(plan.hours[0]))
+            if st.button("Replan"):
+                plan.set_day(change_day, change_hours)
+                rerun_fragment()
+
 def scheduler_page():
     st.title("🎯 Smart Study Scheduler")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        st.subheader("Create Your Personalized Study Plan")
-        
-        subjects = st.text_input("📚 Subjects (comma separated):", "Mathematics, Physics, Chemistry, Biology")
-        hours_per_day = st.slider("⏱️ Hours available per day:", 1, 12, 6)
-        exam_date = st.date_input("📅 Upcoming exam date (if any):", datetime.now() + timedelta(days=14))
-        difficulty = st.select_slider("🎯 Difficulty level:", options=["Easy", "Medium", "Hard", "Intense"])
-        
-        exam_mode = st.checkbox("🚀 Enable Exam Mode (Intensive preparation)")
-        
-        if st.button("Generate Smart Schedule", type="primary"):
-            subject_list = [s.strip() for s in subjects.split(',')]
-            days_until_exam = (exam_date - datetime.now().date()).days
-            
-            st.success("📋 **Your Personalized Study Schedule**")
-            
-            if exam_mode and days_until_exam > 0:
-                st.write(f"**Mode:** 🚀 ULTIMATE EXAM PREPARATION")
-                st.write(f"**Time until exam:** {days_until_exam} days")
-                st.write(f"**Daily commitment:** {hours_per_day} hours")
-                st.write(f"**Difficulty:** {difficulty}")
-                
-                # AI-generated schedule logic
-                primary_subject = subject_list[0]
-                st.write(f"**Primary Focus:** {primary_subject} ({hours_per_day * 0.6:.1f}h daily)")
-                st.write("**Secondary Subjects:** Quick revisions and practice problems")
-                st.write("**Recommended Strategy:**")
-                st.write("• Morning: Intensive topic study (2-3 hours)")
-                st.write("• Afternoon: Practice problems (2 hours)")
-                st.write("• Evening: Revision and flashcards (1-2 hours)")
-                
-            else:
-                time_per_subject = hours_per_day / len(subject_list)
-                st.write(f"**Mode:** 📅 BALANCED LEARNING")
-                st.write(f"**Daily Study Time:** {hours_per_day} hours")
-                st.write(f"**Subjects:** {len(subject_list)} subjects")
-                
-                st.write("**Daily Distribution:**")
-                for i, subject in enumerate(subject_list):
-                    emoji = ["🔢", "🔬", "🧪", "🧬", "📖", "🌍"][i % 6]
-                    st.write(f"{emoji} **{subject}:** {time_per_subject:.1f} hours")
-                
-                st.write("**Recommended Approach:**")
-                st.write("• 45min study + 15min break cycles")
-                st.write("• Mix different subjects to avoid fatigue")
-                st.write("• Include active recall sessions")
+        scheduler_form()
     
     with col2:
         st.subheader("Study Efficiency Tips")
@@ -146,57 +419,110 @@ def scheduler_page():
         st.info("**🎯 Deep Work**\n\nEliminate distractions for 2-3 hour focused sessions")
 
 # Topic Explainer Page
+@page_fragment()
+def explainer_form():
+    """Topic and level inputs and the explanation; widget changes rerun only this part"""
+    topic = st.text_input("Enter any topic you want to understand:", "quantum physics")
+    explanation_level = st.select_slider("Explanation level:", 
+                                       options=["Simple", "Intermediate", "Detailed"])
+    
+    if st.button("Explain This Topic", type="primary"):
+        if topic:
+            with st.spinner("🤔 AI is generating a clear explanation..."):
+                # Update user progress
+                record_progress('topics_mastered')
+                
+                # Enhanced explanations with AI-like structure
+                canned = get_content_store().explanation(topic)
+                if canned:
+                    explanation = canned[explanation_level]
+                    st.success(explanation)
+                else:
+                    st.info(f"📚 **{topic.title()}**\n\nThis is an important {explanation_level.lower()} concept worth exploring!\n\n**Key aspects to research:**\n• Fundamental principles and definitions\n• Real-world applications and examples\n• Related concepts and connections\n• Common misunderstandings to avoid")
+                    
+                    # Ground the insight in local study material; generation is only the fallback
+                    passages = find_passages(topic)
+                    if passages:
+                        st.write("**AI Insight:**")
+                        for passage in passages:
+                            st.info(passage['text'])
+                            st.caption(f"Source: {passage['source']}")
+                    
+                    # Reuse an answer generated offline or for an earlier request before touching the model
+                    cache = get_explanation_cache()
+                    params = explainer_params(explanation_level)
+                    key = cache_key(topic, explanation_level, EXPLAINER_MODEL_ID, params)
+                    insight = None if passages else (
+                        get_pregenerated().explanation(topic, explanation_level) or cache.get(key))
+                    
+                    # Use the AI model if it is warm; a warming model is not waited for
+                    ai_model = load_ai_models() if insight is None and not passages else None
+                    sessions = get_session_manager()
+                    if ai_model and not sessions.admit_request(st.session_state.session_id):
+                        st.warning("⏳ Your last explanation is still being generated - try again in a moment")
+                        ai_model = None
+                    # The stub backend has no tokenizer to stream with
+                    if ai_model and config.EXPLAINER_STREAMING and ai_model.tokenizer is not None:
+                        # Show tokens as they are generated instead of waiting for all of them
+                        prompt = explainer_prompt(topic, explanation_level)
+                        stream = TokenStream(ai_model, prompt, **generate_kwargs(ai_model.tokenizer, params))
+                        st.session_state.explainer_stream = stream
+                        sessions.add_request(st.session_state.session_id, stream)
+                        # Raw tokens while they come, replaced by the finished text below
+                        streamed = st.empty()
+                        try:
+                            with streamed.container():
+                                st.write("**AI Insight:**")
+                                st.write_stream(stream)
+                        except Exception:
+                            logger.exception("Streaming the explanation for %r failed", topic)
+                        st.session_state.explainer_stream = None
+                        if stream.completed:
+                            insight = finish(stream.text)
+                            cache.put(key, insight)
+                            streamed.empty()
+                        elif stream.error is not None:
+                            logger.error("Explanation stream failed: %s", stream.error)
+                    elif ai_model:
+                        try:
+                            prompt = explainer_prompt(topic, explanation_level)
+                            future = get_inference_scheduler().submit(prompt, **params)
+                            sessions.add_request(st.session_state.session_id, future)
+                            result = future.result(timeout=120)
+                            insight = finish(result[0]['generated_text'])
+                            cache.put(key, insight)
+                        except FutureTimeoutError:
+                            # Nobody is waiting for it any more; drop it unless it is already running
+                            future.cancel()
+                            logger.warning("Explanation for %r timed out", topic)
+                            st.warning("⏳ The AI model is busy - try again in a moment")
+                        except Exception:
+                            logger.exception("Explanation for %r failed", topic)
+                    
+                    if insight is not None:
+                        st.write("**AI Insight:**")
+                        st.info(insight)
+                    elif not passages and get_model_registry().status('text-generation') == WARMING:
+                        st.caption("AI Insight will appear once the model has finished warming up.")
+                    elif not passages and get_model_registry().status('text-generation') == FAILED:
+                        st.caption("AI Insight is unavailable - the AI model could not be loaded.")
+
 def explainer_page():
     st.title("💡 AI Topic Explainer")
     
+    # Start warming the model as soon as the page is opened
+    registry = get_model_registry()
+    registry.warm('text-generation')
+    if registry.status('text-generation') == WARMING:
+        st.caption("⏳ AI model is warming up - canned explanations are available right away")
+    elif registry.status('text-generation') == FAILED:
+        # Sidebar calls are not allowed inside the explainer fragment
+        st.sidebar.warning("AI models loading: Using simplified mode")
+    
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        topic = st.text_input("Enter any topic you want to understand:", "quantum physics")
-        explanation_level = st.select_slider("Explanation level:", 
-                                           options=["Simple", "Intermediate", "Detailed"])
-        
-        if st.button("Explain This Topic", type="primary"):
-            if topic:
-                with st.spinner("🤔 AI is generating a clear explanation..."):
-                    # Enhanced explanations with AI-like structure
-                    explanations_db = {
-                        "quantum physics": {
-                            "Simple": "🌌 **Quantum Physics** studies tiny particles like atoms and electrons. Unlike normal objects, these particles can be in multiple places at once (superposition) and affect each other instantly over distance (entanglement). It's the science of the very small!",
-                            "Intermediate": "🔬 **Quantum Mechanics** describes nature at atomic and subatomic scales. Key principles include wave-particle duality (things act as both particles and waves), uncertainty principle (can't know both position and speed exactly), and quantum entanglement (connected particles affect each other).",
-                            "Detailed": "⚛️ **Quantum Theory** revolutionized physics by describing microscopic systems. Fundamental concepts: 1) Superposition - quantum states can exist in multiple states simultaneously, 2) Entanglement - particles remain connected regardless of distance, 3) Quantization - energy exists in discrete packets (quanta), 4) Wave-function collapse - measurement determines the state."
-                        },
-                        "photosynthesis": {
-                            "Simple": "🌱 **Photosynthesis** is how plants make food using sunlight! They take water + CO₂ and create sugar + oxygen using sunlight energy.",
-                            "Intermediate": "🌿 **Photosynthesis** converts light energy to chemical energy. Equation: 6CO₂ + 6H₂O → C₆H₁₂O₆ + 6O₂. Occurs in chloroplasts using chlorophyll.",
-                            "Detailed": "🔬 **Photosynthesis** has two stages: 1) Light-dependent reactions capture light energy to produce ATP and NADPH, 2) Calvin cycle uses these to fix CO₂ into organic compounds. Essential for life on Earth."
-                        },
-                        "machine learning": {
-                            "Simple": "🤖 **Machine Learning** is AI that learns from data without explicit programming. It finds patterns and makes predictions automatically!",
-                            "Intermediate": "🧠 **Machine Learning** uses algorithms to parse data, learn from it, and make determinations. Types: supervised (labeled data), unsupervised (patterns), reinforcement (trial & error).",
-                            "Detailed": "📊 **Machine Learning** involves: 1) Data preprocessing and feature engineering, 2) Model selection (neural networks, decision trees, SVM), 3) Training and validation, 4) Hyperparameter tuning. Powers modern AI applications."
-                        }
-                    }
-                    
-                    # Update user progress
-                    st.session_state.user_progress['topics_mastered'] += 1
-                    
-                    if topic.lower() in explanations_db:
-                        explanation = explanations_db[topic.lower()][explanation_level]
-                        st.success(explanation)
-                    else:
-                        st.info(f"📚 **{topic.title()}**\n\nThis is an important {explanation_level.lower()} concept worth exploring!\n\n**Key aspects to research:**\n• Fundamental principles and definitions\n• Real-world applications and examples\n• Related concepts and connections\n• Common misunderstandings to avoid")
-                        
-                        # Try to use AI model if available
-                        ai_model = load_ai_models()
-                        if ai_model:
-                            try:
-                                prompt = f"Explain {topic} in {explanation_level.lower()} terms:"
-                                result = ai_model(prompt, max_length=150, num_return_sequences=1)
-                                st.write("**AI Insight:**")
-                                st.info(result[0]['generated_text'])
-                            except:
-                                pass
+        explainer_form()
     
     with col2:
         st.subheader("Learning Tips")
@@ -207,77 +533,71 @@ def explainer_page():
         st.info("**❓ Ask Questions**\n\nChallenge yourself with 'why' and 'how' questions")
 
 # Practice Generator Page
-def practice_page():
-    st.title("📊 Smart Practice Generator")
-    
-    col1, col2 = st.columns([2, 1])
+@page_fragment()
+def practice_form():
+    """Practice set inputs and questions; widget changes rerun only this part"""
+    topic = st.text_input("Enter topic for practice questions:", "algebra")
+    question_type = st.selectbox("Question format:", 
+                               ["Multiple Choice", "Short Answer", "Problem Solving", "Mixed"])
+    difficulty = st.select_slider("Difficulty level:", 
+                                options=["Beginner", "Intermediate", "Advanced", "Expert"])
     
-    with col1:
-        topic = st.text_input("Enter topic for practice questions:", "algebra")
-        question_type = st.selectbox("Question format:", 
-                                   ["Multiple Choice", "Short Answer", "Problem Solving", "Mixed"])
-        difficulty = st.select_slider("Difficulty level:", 
-                                    options=["Beginner", "Intermediate", "Advanced", "Expert"])
-        
-        if st.button("Generate Practice Set", type="primary"):
-            if topic:
-                with st.spinner("🎯 Creating personalized practice questions..."):
-                    # Update user progress
-                    st.session_state.user_progress['questions_answered'] += 5
-                    
-                    st.success(f"📝 **Practice Questions: {topic.title()} ({difficulty})**")
-                    
-                    # Generate questions based on topic and difficulty
-                    questions_db = {
-                        "algebra": [
-                            "Solve the equation: 3x + 7 = 22. What is the value of x?",
-                            "Factor the quadratic expression: x² + 5x + 6",
-                            "Simplify the expression: 2(3x - 4) + 5(x + 2)",
-                            "Find the slope and y-intercept of the line: y = 2x - 3",
-                            "Solve the system: 2x + y = 7, x - y = -1"
-                        ],
-                        "physics": [
-                            "Calculate the force required to accelerate a 5kg object at 3m/s²",
-                            "Explain the difference between speed and velocity",
-                            "A ball is dropped from 20m height. Calculate impact velocity",
-                            "Describe Newton's three laws of motion with examples",
-                            "Calculate work done by a 10N force moving an object 5m"
-                        ],
-                        "biology": [
-                            "Explain the process of cellular respiration",
-                            "Compare and contrast mitosis and meiosis",
-                            "Describe the structure and function of DNA",
-                            "Explain how enzymes work as biological catalysts",
-                            "Discuss the process of protein synthesis"
-                        ]
-                    }
-                    
-                    # Select appropriate questions
-                    base_questions = questions_db.get(topic.lower(), [
+    if st.button("Generate Practice Set", type="primary"):
+        if topic:
+            with st.spinner("🎯 Creating personalized practice questions..."):
+                # Questions this user has not seen yet, at the chosen difficulty and format
+                bank = get_question_bank()
+                history = get_practice_history()
+                items = bank.sample(history, topic, difficulty, question_type, 5)
+                bank.save_history(st.session_state.user_id, history)
+                if not items and not get_content_store().questions(topic):
+                    # Generated offline for syllabus topics
+                    items = get_pregenerated().practice(topic, difficulty)[:5]
+                if len(items) < 5:
+                    # Too few in the bank for this topic: make up the set from the templates
+                    base_questions = (get_content_store().questions(topic) or []) + [
                         f"Explain the main concepts of {topic}",
                         f"Provide 3 real-world applications of {topic}",
                         f"Compare {topic} with related concepts",
                         f"What are common challenges when learning {topic}?",
                         f"How would you teach {topic} to a beginner?"
-                    ])
-                    
-                    for i, question in enumerate(base_questions[:5]):
-                        st.write(f"**{i+1}. {question}**")
-                        if question_type == "Multiple Choice":
-                            st.write("   A) Option 1")
-                            st.write("   B) Option 2")
-                            st.write("   C) Option 3")
-                            st.write("   D) Option 4")
-                        st.write("")
-                    
-                    # Answer key toggle
-                    with st.expander("📋 Show Answer Key"):
-                        st.write("**Sample Answers:**")
-                        st.write("1. Show your work and reasoning")
-                        st.write("2. Explain the key concepts involved")
-                        st.write("3. Provide step-by-step solution")
-                        st.write("4. Include relevant formulas/theorems")
-                        st.write("5. Verify your answer makes sense")
+                    ]
+                    asked = {item['question'] for item in items}
+                    items += [{'question': question, 'options': [], 'answer': None}
+                              for question in base_questions if question not in asked][:5 - len(items)]
+                
+                # Update user progress
+                record_progress('questions_answered', len(items))
+                
+                st.success(f"📝 **Practice Questions: {topic.title()} ({difficulty})**")
+                
+                for i, item in enumerate(items):
+                    st.write(f"**{i+1}. {item['question']}**")
+                    for letter, option in zip("ABCDEFGH", item['options']):
+                        st.write(f"   {letter}) {option}")
+                    st.write("")
+                
+                # Answer key toggle
+                generic_answers = ["Show your work and reasoning",
+                                   "Explain the key concepts involved",
+                                   "Provide step-by-step solution",
+                                   "Include relevant formulas/theorems",
+                                   "Verify your answer makes sense"]
+                with st.expander("📋 Show Answer Key"):
+                    st.write("**Sample Answers:**")
+                    for i, item in enumerate(items):
+                        answer = item['answer']
+                        if answer and item['options'] and answer in item['options']:
+                            answer = f"{'ABCDEFGH'[item['options'].index(answer)]}) {answer}"
+                        st.write(f"{i+1}. {answer or generic_answers[i % len(generic_answers)]}")
+
+def practice_page():
+    st.title("📊 Smart Practice Generator")
+    
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        practice_form()
     
     with col2:
         st.subheader("Practice Strategies")
@@ -290,51 +610,82 @@ def practice_page():
         st.info("**📝 Error Analysis**\n\nReview mistakes to avoid repetition")
 
 # Notes to Flashcards Page
+@page_fragment()
+def flashcards_form():
+    """Note conversion and card review; widget changes rerun only this part"""
+    st.subheader("Transform Your Notes")
+    notes_input = st.text_area("Paste your notes here (or type directly):", 
+                             height=200,
+                             placeholder="Example: Photosynthesis is the process plants use to convert sunlight into energy. They take in carbon dioxide and water, and using chlorophyll in their leaves, produce glucose and oxygen. This process occurs in the chloroplasts...")
+    uploaded_notes = st.file_uploader("...or upload a notes file:", type=["txt", "md", "pdf"])
+    max_cards = st.slider("Maximum flashcards:", 4, 100, 8)
+    
+    if st.button("Create Flashcards", type="primary"):
+        if notes_input or uploaded_notes:
+            with st.spinner("🔄 Converting notes to flashcards..."):
+                # Process notes into flashcards a sentence at a time
+                source = uploaded_notes if uploaded_notes is not None else notes_input
+                name = uploaded_notes.name if uploaded_notes is not None else ""
+                
+                st.success("🃏 **Your Smart Flashcards**")
+                summary = st.empty()
+                
+                count = 0
+                deck = get_deck()
+                added = []
+                try:
+                    for count, card in enumerate(flashcards(source, name, max_cards=max_cards), start=1):
+                        st.write(f"**Flashcard {count}:**")
+                        st.write(f"**Q:** {card['question']}")
+                        st.write(f"**A:** {card['answer']}")
+                        st.write("---")
+                        added.append(deck.add(card['question'], card['answer']))
+                except ImportError as e:
+                    st.error(str(e))
+                get_deck_store().add(st.session_state.user_id, deck, added)
+                summary.write(f"Generated {count} flashcards from your notes - added to your review deck")
+                
+                # Study tips for flashcards
+                with st.expander("🎯 How to Use These Flashcards Effectively"):
+                    st.write("**Active Recall Method:**")
+                    st.write("• Try to recall the answer before flipping")
+                    st.write("• Say the answer out loud")
+                    st.write("• Explain the concept in your own words")
+                    
+                    st.write("**Spaced Repetition Schedule:**")
+                    st.write("• Review after 1 hour")
+                    st.write("• Review after 1 day")
+                    st.write("• Review after 3 days")
+                    st.write("• Review after 1 week")
+                    
+                    st.write("**Pro Tip:** Create your own examples for each concept!")
+    
+    # Spaced repetition review of saved cards
+    st.subheader("🔁 Review Due Cards")
+    deck = get_deck()
+    due = deck.next_due(1)
+    if not due:
+        st.info(f"Nothing due right now - {len(deck)} cards in your deck.")
+    else:
+        card = due[0]
+        st.write(f"**Q:** {deck.questions[card]}")
+        with st.expander("Show answer"):
+            st.write(deck.answers[card])
+        grades = [("Again", AGAIN), ("Hard", HARD), ("Good", GOOD), ("Easy", EASY)]
+        for col, (label, quality) in zip(st.columns(4), grades):
+            with col:
+                if st.button(label, key=f"srs-{label}-{card}", use_container_width=True):
+                    deck.review(card, quality)
+                    get_deck_store().update(st.session_state.user_id, deck, [card])
+                    rerun_fragment()
+
 def flashcards_page():
     st.title("📝 Smart Notes to Flashcards")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        st.subheader("Transform Your Notes")
-        notes_input = st.text_area("Paste your notes here (or type directly):", 
-                                 height=200,
-                                 placeholder="Example: Photosynthesis is the process plants use to convert sunlight into energy. They take in carbon dioxide and water, and using chlorophyll in their leaves, produce glucose and oxygen. This process occurs in the chloroplasts...")
-        
-        if st.button("Create Flashcards", type="primary"):
-            if notes_input:
-                with st.spinner("🔄 Converting notes to flashcards..."):
-                    # Process notes into flashcards
-                    sentences = [s.strip() for s in notes_input.split('.') if s.strip()]
-                    
-                    st.success("🃏 **Your Smart Flashcards**")
-                    st.write(f"Generated {len(sentences[:8])} flashcards from your notes")
-                    
-                    for i, sentence in enumerate(sentences[:8]):
-                        if len(sentence.split()) > 3:  # Only use substantial sentences
-                            # Create question-answer pairs
-                            words = sentence.split()
-                            question_word = words[0] if words[0].lower() not in ['the', 'a', 'an'] else words[1]
-                            
-                            st.write(f"**Flashcard {i+1}:**")
-                            st.write(f"**Q:** What is {question_word.lower()} or explain: {sentence[:50]}...?")
-                            st.write(f"**A:** {sentence}")
-                            st.write("---")
-                    
-                    # Study tips for flashcards
-                    with st.expander("🎯 How to Use These Flashcards Effectively"):
-                        st.write("**Active Recall Method:**")
-                        st.write("• Try to recall the answer before flipping")
-                        st.write("• Say the answer out loud")
-                        st.write("• Explain the concept in your own words")
-                        
-                        st.write("**Spaced Repetition Schedule:**")
-                        st.write("• Review after 1 hour")
-                        st.write("• Review after 1 day")
-                        st.write("• Review after 3 days")
-                        st.write("• Review after 1 week")
-                        
-                        st.write("**Pro Tip:** Create your own examples for each concept!")
+        flashcards_form()
     
     with col2:
         st.subheader("Flashcard Tips")
@@ -347,6 +698,58 @@ def flashcards_page():
         st.info("**🎨 Visual Elements**\n\nAdd diagrams or mnemonics")
 
 # Focus Monitor Page with FIXED webcam implementation
+@page_fragment(run_every=config.FOCUS_POLL_SECONDS)
+def live_focus_status(processor):
+    """Polls the video processor at a fixed rate without rerunning the page"""
+    st.subheader("Live Focus Status")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Focus Score", f"{processor.focus_score}%")
+    with col2:
+        st.metric("Status", processor.focus_state)
+
+@page_fragment()
+def manual_focus_tracker():
+    """Manual focus tracking for when there is no webcam"""
+    if 'manual_focus' not in st.session_state:
+        st.session_state.manual_focus = 75
+    
+    st.subheader("Manual Focus Tracking")
+    
+    activity = st.radio("What are you doing?", [
+        "📚 Looking at book/notes (FOCUSED)",
+        "📺 Looking at screen (DISTRACTED)", 
+        "👋 Away from desk (AWAY)"
+    ])
+    
+    if st.button("Update Focus Status"):
+        if "FOCUSED" in activity:
+            st.session_state.manual_focus = min(100, st.session_state.manual_focus + 10)
+            st.success("✅ FOCUSED - Good job studying!")
+        elif "DISTRACTED" in activity:
+            st.session_state.manual_focus = max(0, st.session_state.manual_focus - 5)
+            st.warning("⚠️ DISTRACTED - Try looking at your book")
+        else:
+            st.session_state.manual_focus = max(0, st.session_state.manual_focus - 10)
+            st.error("🔴 AWAY - Return to your studies")
+    
+    st.metric("Focus Score", f"{st.session_state.manual_focus}%")
+    st.progress(st.session_state.manual_focus / 100)
+
+@page_fragment()
+def study_timer():
+    """Study session timer; starting a session reruns only this part"""
+    st.subheader("⏱️ Study Timer")
+    col1, col2 = st.columns(2)
+    with col1:
+        study_mins = st.number_input("Study minutes", value=25, min_value=10, max_value=120)
+    with col2:
+        break_mins = st.number_input("Break minutes", value=5, min_value=5, max_value=30)
+    
+    if st.button("Start Study Session"):
+        record_progress('study_time', study_mins / 60)
+        st.success(f"Session started: {study_mins}min study + {break_mins}min break")
+
 def focus_page():
     st.title("🔍 AI Focus Monitor")
     st.write("**Real-time attention tracking using your webcam**")
@@ -354,57 +757,24 @@ def focus_page():
     # Simple, stable webcam implementation
     try:
         from streamlit_webrtc import webrtc_streamer, WebRtcMode, RTCConfiguration
-        import av
-        import cv2
+        from aceai.focus import SimpleFocusProcessor
         
-        class SimpleFocusProcessor:
-            def __init__(self):
-                self.focus_state = "CALIBRATING"
-                self.focus_score = 75
-                
-            def recv(self, frame):
-                img = frame.to_ndarray(format="bgr24")
-                
-                # Simple face detection using OpenCV (more stable than MediaPipe)
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-                faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-                
-                h, w = img.shape[:2]
-                
-                if len(faces) > 0:
-                    x, y, width, height = faces[0]
-                    
-                    # Calculate face position
-                    x_center = x + width / 2
-                    y_center = y + height / 2
-                    
-                    # Simple focus logic
-                    if y_center > h * 0.6:  # Face in lower part = looking down
-                        self.focus_state = "FOCUSED"
-                        self.focus_score = min(100, self.focus_score + 1)
-                    elif 0.3 < x_center/w < 0.7 and 0.3 < y_center/h < 0.7:  # Face centered
-                        self.focus_state = "DISTRACTED" 
-                        self.focus_score = max(0, self.focus_score - 1)
-                    else:  # Face at edges
-                        self.focus_state = "AWAY"
-                        self.focus_score = max(0, self.focus_score - 2)
-                    
-                    # Draw rectangle around face
-                    cv2.rectangle(img, (x, y), (x+width, y+height), (0, 255, 0), 2)
-                else:
-                    self.focus_state = "AWAY"
-                    self.focus_score = max(0, self.focus_score - 3)
-                
-                # Add status text
-                color_map = {"FOCUSED": (0, 255, 0), "DISTRACTED": (0, 165, 255), "AWAY": (0, 0, 255)}
-                color = color_map.get(self.focus_state, (255, 255, 255))
-                cv2.putText(img, f"Status: {self.focus_state}", (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-                cv2.putText(img, f"Score: {self.focus_score}%", (10, 70), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-                
-                return av.VideoFrame.from_ndarray(img, format="bgr24")
+        try:
+            focus_pool = get_focus_pool()
+        except Exception:
+            focus_pool = None
+        telemetry = get_focus_telemetry()
+        sessions = get_session_manager()
+        session_id = st.session_state.session_id
+        
+        def focus_processor():
+            # Counted against the replica's stream cap (a refused processor does nothing)
+            processor = SimpleFocusProcessor(pool=focus_pool, telemetry=telemetry)
+            sessions.add_stream(session_id, processor)
+            return processor
+        
+        # A stream refused or reaped by the session manager is stopped through the component
+        stopping = st.session_state.get('focus_stopping', False)
         
         # Webcam stream with fixed key to prevent freezing
         webrtc_ctx = webrtc_streamer(
@@ -414,112 +784,116 @@ def focus_page():
                 {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
             ),
             media_stream_constraints={"video": True, "audio": False},
-            video_processor_factory=SimpleFocusProcessor,
+            video_processor_factory=focus_processor,
             async_processing=True,
+            desired_playing_state=False if stopping else None,
         )
         
         # Display current status
-        if webrtc_ctx.video_processor:
-            processor = webrtc_ctx.video_processor
-            
-            st.subheader("Live Focus Status")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Focus Score", f"{processor.focus_score}%")
-            with col2:
-                st.metric("Status", processor.focus_state)
+        processor = webrtc_ctx.video_processor
+        if processor is None or not processor.closed:
+            st.session_state.focus_stopping = False
+        elif not stopping:
+            # Once: the next run renders the component stopped, then START works again
+            st.session_state.focus_stopping = True
+            st.rerun()
+        if processor and not processor.closed:
+            live_focus_status(processor)
             
             # Simple instructions
             st.info("**Instructions:** Look DOWN at your book = FOCUSED, Look AT screen = DISTRACTED")
+        elif processor:
+            st.warning("The Focus Monitor is not running right now - press START again in a few minutes")
+            manual_focus_tracker()
             
     except Exception as e:
         # Fallback - simple manual focus tracker
         st.warning("Webcam not available - using manual focus tracking")
-        
-        if 'manual_focus' not in st.session_state:
-            st.session_state.manual_focus = 75
-        
-        st.subheader("Manual Focus Tracking")
-        
-        activity = st.radio("What are you doing?", [
-            "📚 Looking at book/notes (FOCUSED)",
-            "📺 Looking at screen (DISTRACTED)", 
-            "👋 Away from desk (AWAY)"
-        ])
-        
-        if st.button("Update Focus Status"):
-            if "FOCUSED" in activity:
-                st.session_state.manual_focus = min(100, st.session_state.manual_focus + 10)
-                st.success("✅ FOCUSED - Good job studying!")
-            elif "DISTRACTED" in activity:
-                st.session_state.manual_focus = max(0, st.session_state.manual_focus - 5)
-                st.warning("⚠️ DISTRACTED - Try looking at your book")
-            else:
-                st.session_state.manual_focus = max(0, st.session_state.manual_focus - 10)
-                st.error("🔴 AWAY - Return to your studies")
-        
-        st.metric("Focus Score", f"{st.session_state.manual_focus}%")
-        st.progress(st.session_state.manual_focus / 100)
+        manual_focus_tracker()
     
     # Simple timer section
-    st.subheader("⏱️ Study Timer")
-    col1, col2 = st.columns(2)
-    with col1:
-        study_mins = st.number_input("Study minutes", value=25, min_value=10, max_value=120)
-    with col2:
-        break_mins = st.number_input("Break minutes", value=5, min_value=5, max_value=30)
-    
-    if st.button("Start Study Session"):
-        st.success(f"Session started: {study_mins}min study + {break_mins}min break")
+    study_timer()
 
 # Progress Tracking Page
+@page_fragment(run_every=config.DASHBOARD_POLL_SECONDS)
+def progress_overview():
+    """Progress and focus figures, refreshed in place while the dashboard is open"""
+    st.subheader("Your Learning Journey")
+    
+    # Progress metrics, read again on every refresh (served from the tracker's cache)
+    progress = get_progress_tracker().get(st.session_state.user_id)
+    
+    # Main progress visualization
+    st.write(f"**Current Level:** {progress['level']}")
+    st.progress(progress['progress_percent'] / 100)
+    st.write(f"Progress to next level: {progress['progress_percent']}%")
+    
+    # Detailed metrics
+    st.subheader("📊 Learning Analytics")
+    
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        st.metric("🔥 Study Streak", f"{progress['streak']} days")
+    with col_b:
+        st.metric("📚 Topics Mastered", progress['topics_mastered'])
+    with col_c:
+        st.metric("❓ Questions Solved", progress['questions_answered'])
+    
+    # Study time analysis
+    st.subheader("⏱️ Study Patterns")
+    col_d, col_e = st.columns(2)
+    with col_d:
+        st.metric("Total Study Hours", f"{progress['study_time']:.1f}")
+    with col_e:
+        efficiency = min(95, progress['questions_answered'] * 2)
+        st.metric("Learning Efficiency", f"{efficiency}%")
+    
+    # Focus Monitor results for today, from every session of this user
+    today = datetime.combine(datetime.now().date(), datetime.min.time()).timestamp()
+    if 'focus_telemetry' in st.session_state:
+        focus = st.session_state.focus_telemetry.summary(since=today)
+    else:
+        from aceai.telemetry import stored_summary
+        focus = stored_summary(get_telemetry_store(), st.session_state.user_id, since=today)
+    if focus['tracked_minutes'] > 0:
+        st.subheader("🔍 Focus Today")
+        col_f, col_g, col_h = st.columns(3)
+        with col_f:
+            st.metric("Focused Minutes", f"{focus['focused_minutes']:.1f}",
+                      f"{focus['focused_share']:.0%} of tracked time")
+        with col_g:
+            st.metric("Distraction Episodes", focus['distraction_episodes'])
+        with col_h:
+            st.metric("Average Focus Score", f"{focus['average_score']:.0f}%")
+        st.line_chart(focus['rolling_score'])
+    
+    # Recommendations
+    st.subheader("🎯 Personalized Recommendations")
+    st.info("""
+    **Build Consistency:** Try to study every day to build a strong habit
+    
+    **Practice More:** Increase daily practice questions to reinforce learning
+    
+    **Expand Knowledge:** Explore new topics to broaden your understanding
+    
+    **Next Level Goal:** Reach 80% progress by completing 10 more topics
+    """)
+
+@page_fragment()
+def weekly_goal_form():
+    """Weekly goal picker; choosing a goal reruns only this part"""
+    weekly_goal = st.selectbox("Target for this week:", 
+                             ["5 Topics", "50 Questions", "10 Study Hours", "7-Day Streak"])
+    if st.button("Commit to Goal"):
+        st.success(f"🎯 Goal set: {weekly_goal} for this week!")
+
 def progress_page():
     st.title("📈 Learning Progress Dashboard")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        st.subheader("Your Learning Journey")
-        
-        # Progress metrics
-        progress = st.session_state.user_progress
-        
-        # Main progress visualization
-        st.write(f"**Current Level:** {progress['level']}")
-        st.progress(progress['progress_percent'] / 100)
-        st.write(f"Progress to next level: {progress['progress_percent']}%")
-        
-        # Detailed metrics
-        st.subheader("📊 Learning Analytics")
-        
-        col_a, col_b, col_c = st.columns(3)
-        with col_a:
-            st.metric("🔥 Study Streak", f"{progress['streak']} days", "2 days")
-        with col_b:
-            st.metric("📚 Topics Mastered", progress['topics_mastered'], "3 this week")
-        with col_c:
-            st.metric("❓ Questions Solved", progress['questions_answered'], "12 today")
-        
-        # Study time analysis
-        st.subheader("⏱️ Study Patterns")
-        col_d, col_e = st.columns(2)
-        with col_d:
-            st.metric("Total Study Hours", progress['study_time'])
-        with col_e:
-            efficiency = min(95, progress['questions_answered'] * 2)
-            st.metric("Learning Efficiency", f"{efficiency}%")
-        
-        # Recommendations
-        st.subheader("🎯 Personalized Recommendations")
-        st.info("""
-        **Build Consistency:** Try to study every day to build a strong habit
-        
-        **Practice More:** Increase daily practice questions to reinforce learning
-        
-        **Expand Knowledge:** Explore new topics to broaden your understanding
-        
-        **Next Level Goal:** Reach 80% progress by completing 10 more topics
-        """)
+        progress_overview()
     
     with col2:
         st.subheader("Achievements")
@@ -533,10 +907,7 @@ def progress_page():
         
         # Weekly goal setting
         st.subheader("🎯 Set Weekly Goal")
-        weekly_goal = st.selectbox("Target for this week:", 
-                                 ["5 Topics", "50 Questions", "10 Study Hours", "7-Day Streak"])
-        if st.button("Commit to Goal"):
-            st.success(f"🎯 Goal set: {weekly_goal} for this week!")
+        weekly_goal_form()
 
 # Navigation
 st.sidebar.title("🧠 AceAi Navigation")
@@ -550,24 +921,41 @@ page = st.sidebar.radio("Go to", [
     "📈 Progress Dashboard"
 ])
 
-# Load AI models (cache them)
-ai_models = load_ai_models()
-
 # Show the selected page
-if "🏠 Home" in page:
-    home_page()
-elif "🎯 Smart Scheduler" in page:
-    scheduler_page()
-elif "💡 Topic Explainer" in page:
-    explainer_page()
-elif "📊 Practice Generator" in page:
-    practice_page()
-elif "📝 Notes to Flashcards" in page:
-    flashcards_page()
-elif "🔍 Focus Monitor" in page:
-    focus_page()
-elif "📈 Progress Dashboard" in page:
-    progress_page()
+get_metrics_server()
+get_pregenerated()
+sessions = get_session_manager()
+notice = sessions.pop_notice(st.session_state.session_id)
+if notice:
+    st.toast(notice)
+page_name = page.split(" ", 1)[-1].strip()
+with sessions.run(st.session_state.session_id, page_name, st.session_state, RELOADABLE_STATE), \
+        metrics.timer(metrics.PAGE_SECONDS, page_name):
+    if "🏠 Home" in page:
+        home_page()
+    elif "🎯 Smart Scheduler" in page:
+        scheduler_page()
+    elif "💡 Topic Explainer" in page:
+        explainer_page()
+    elif "📊 Practice Generator" in page:
+        practice_page()
+    elif "📝 Notes to Flashcards" in page:
+        flashcards_page()
+    elif "🔍 Focus Monitor" in page:
+        focus_page()
+    elif "📈 Progress Dashboard" in page:
+        progress_page()
+
+if config.METRICS_ADMIN and metrics.ENABLED:
+    with st.sidebar.expander("📟 Metrics"):
+        st.caption(f"Prometheus endpoint: http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics"
+                   if get_metrics_server() is not None else "Metrics endpoint not running")
+        st.metric("Explanation cache hit rate", f"{get_explanation_cache().hit_rate():.0%}")
+        st.metric("Sessions on this replica", sessions.totals()["sessions"])
+        st.dataframe(sessions.summary(), hide_index=True)
+        rows = metrics.summary()
+        if rows:
+            st.dataframe(rows, hide_index=True)
 
 # Footer with creator credit
 st.sidebar.markdown("---")
@@ -0,0 +1,100 @@
+import os
+import time
+import urllib.request
+
+import pytest
+
+from aceai import config, metrics
+
+st = pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """AppTest of app.py with its data under tmp_path and the given model backend"""
+    for name, value in vars(config).copy().items():
+        if isinstance(value, str) and name != "DATA_DIR" and value.startswith(config.DATA_DIR + os.sep):
+            monkeypatch.setattr(config, name, str(tmp_path / os.path.relpath(value, config.DATA_DIR)))
+    monkeypatch.setattr(config, "MODEL_BACKEND", "stub")
+    monkeypatch.setattr(config, "STUB_MS_PER_TOKEN", 0.0)
+
+    def start(backend="stub"):
+        monkeypatch.setattr(config, "MODEL_BACKEND", backend)
+        st.cache_resource.clear()
+        return AppTest.from_file(APP_PATH, default_timeout=60).run()
+
+    yield start
+    st.cache_resource.clear()
+
+
+def open_page(at, name):
+    at.sidebar.radio[0].set_value(next(o for o in at.sidebar.radio[0].options if name in o)).run()
+    assert not at.exception
+    return at
+
+
+def test_explainer_survives_a_failed_model(app):
+    at = open_page(app("bogus"), "Topic Explainer")
+    deadline = time.time() + 10
+    while not at.sidebar.warning and time.time() < deadline:
+        time.sleep(0.05)
+        at.run()
+    assert "simplified mode" in at.sidebar.warning[0].value
+    at.text_input[0].set_value("plate tectonics").run()
+    at.button[0].click().run()
+    assert not at.exception
+    assert any("Plate Tectonics" in info.value for info in at.info)
+
+
+def test_practice_set_is_always_full(app):
+    at = open_page(app(), "Practice Generator")
+    at.selectbox[0].set_value("Short Answer").run()
+    at.button[0].click().run()
+    assert not at.exception
+    questions = [md.value for md in at.markdown if md.value.startswith("**") and md.value[2:3].isdigit()]
+    assert len(questions) == 5
+
+
+def scrape(port):
+    """{metric line without its value: value} from the /metrics endpoint"""
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10) as response:
+        text = response.read().decode()
+    return {name: float(value) for name, value in
+            (line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))}
+
+
+def test_metrics_count_a_generation_and_a_cache_hit(app, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    server = metrics.serve(port=0, host="127.0.0.1")
+    try:
+        port = server.server_address[1]
+        at = open_page(app(), "Topic Explainer")
+        # The stub model loads in the background; wait for it so the click generates
+        deadline = time.time() + 10
+        while any("warming" in caption.value for caption in at.caption) and time.time() < deadline:
+            time.sleep(0.05)
+            at.run()
+        before = scrape(port)
+
+        at.text_input[0].set_value("plate tectonics").run()
+        at.button[0].click().run()
+        at.button[0].click().run()
+        assert not at.exception
+        after = scrape(port)
+    finally:
+        server.shutdown()
+
+    def grew(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    # Histograms are process-wide; the cache collector reads this test's fresh cache
+    assert grew('aceai_model_seconds_count{path="batch",phase="queue"}') == 1
+    assert grew('aceai_model_seconds_bucket{path="batch",phase="queue",le="+Inf"}') == 1
+    assert grew('aceai_fragment_seconds_count{fragment="explainer_form"}') >= 2
+    assert grew('aceai_page_seconds_count{page="Topic Explainer"}') >= 2
+    assert after['aceai_explanation_cache_lookups_total{result="misses"}'] == 1
+    assert after['aceai_explanation_cache_lookups_total{result="memory_hits"}'] == 1
+    assert after['aceai_explanation_cache_hit_ratio'] == 0.5
@@ -0,0 +1,22 @@
+from aceai import backends, config
+
+
+def test_measure_works_without_a_tokenizer(monkeypatch):
+    monkeypatch.setattr(config, "STUB_MS_PER_TOKEN", 0.01)
+    result = backends.measure("stub", new_tokens=8)
+    assert result["backend"] == "stub"
+    assert result["tokens_per_second"] > 0
+
+
+def test_stub_is_not_compared_by_default(monkeypatch, capsys):
+    compared = []
+    monkeypatch.setattr(backends, "compare", lambda names, model_id=None: compared.extend(names) or [])
+    backends.main([])
+    assert compared and "stub" not in compared
+    assert set(compared) <= set(backends.BACKENDS)
+
+
+def test_stub_honours_return_full_text():
+    stub = backends.StubGenerator(0)
+    assert stub("Explain x:", max_new_tokens=1)[0]["generated_text"].startswith("Explain x:")
+    assert not stub("Explain x:", max_new_tokens=1, return_full_text=False)[0]["generated_text"].startswith("Explain")
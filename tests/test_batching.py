@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from aceai.batching import BatchingGenerator
+
+
+class FakeModel:
+    """Pipeline stand-in that records each call and can be held or made to fail"""
+
+    tokenizer = None
+
+    def __init__(self):
+        self.calls = []
+        self.fail = None
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, prompts, batch_size, **params):
+        self.release.wait(10)
+        self.calls.append((list(prompts), params))
+        if self.fail and self.fail in prompts:
+            raise ValueError(f"cannot generate {self.fail}")
+        return [[{"generated_text": f"{prompt}!"}] for prompt in prompts]
+
+
+@pytest.fixture
+def model():
+    return FakeModel()
+
+
+@pytest.fixture
+def batcher(model):
+    batcher = BatchingGenerator(lambda: model, max_batch_size=4, max_wait_ms=200)
+    yield batcher
+    batcher.close(timeout=10)
+
+
+def test_waiting_prompts_share_a_batch(batcher, model):
+    futures = [batcher.submit(prompt, temperature=0.7) for prompt in ("a", "b", "a")]
+    assert [f.result(10)[0]["generated_text"] for f in futures] == ["a!", "b!", "a!"]
+    # The duplicate prompt was generated once
+    assert model.calls == [(["a", "b"], {"temperature": 0.7})]
+    assert batcher.stats == {"requests": 3, "batches": 1, "largest_batch": 2}
+
+
+def test_batches_are_capped_and_split_by_settings(batcher, model):
+    model.release.clear()
+    futures = [batcher.submit(str(n), temperature=0.7) for n in range(5)]
+    futures.append(batcher.submit("hot", temperature=1.0))
+    model.release.set()
+    for future in futures:
+        future.result(10)
+    sizes = sorted(len(prompts) for prompts, _ in model.calls)
+    assert max(sizes) <= 4 and sum(sizes) == 6
+    assert (["hot"], {"temperature": 1.0}) in model.calls
+
+
+def test_a_failed_batch_fails_only_its_own_futures(batcher, model):
+    model.fail = "bad"
+    model.release.clear()
+    bad = batcher.submit("bad", temperature=0.7)
+    good = batcher.submit("good", temperature=1.0)
+    model.release.set()
+    with pytest.raises(ValueError):
+        bad.result(10)
+    assert good.result(10)[0]["generated_text"] == "good!"
+
+
+def test_missing_model_fails_the_request():
+    batcher = BatchingGenerator(lambda: None, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        batcher.submit("a").result(10)
+    batcher.close(timeout=10)
+
+
+def test_cancelled_requests_are_not_generated(batcher, model):
+    model.release.clear()
+    first = batcher.submit("first")
+    # A caller that gave up before the worker got to its prompt
+    second = batcher.submit("second")
+    assert second.cancel()
+    model.release.set()
+    first.result(10)
+    batcher.close(timeout=10)
+    assert [prompts for prompts, _ in model.calls] == [["first"]]
+
+
+def test_close_finishes_queued_prompts_then_refuses_new_ones(model):
+    batcher = BatchingGenerator(lambda: model, max_batch_size=1, max_wait_ms=0)
+    model.release.clear()
+    futures = [batcher.submit(prompt) for prompt in ("a", "b", "c")]
+    model.release.set()
+    batcher.close(timeout=10)
+    assert not batcher._worker.is_alive()
+    assert [f.result(0)[0]["generated_text"] for f in futures] == ["a!", "b!", "c!"]
+    with pytest.raises(RuntimeError):
+        batcher.submit("d")
@@ -0,0 +1,52 @@
+import pytest
+
+from aceai.content import TopicIndex, edit_distance
+from aceai.question_bank import QuestionBank
+
+TOPICS = ["quantum physics", "photosynthesis", "machine learning", "algebra", "physics", "biology"]
+
+
+@pytest.mark.parametrize("query, topic", [
+    ("Quantum Physics ", "quantum physics"),
+    ("the basics of photosynthesis", "photosynthesis"),
+    ("photosynthesis process", "photosynthesis"),
+    ("photosynth", "photosynthesis"),
+    ("photosynthesys", "photosynthesis"),
+    ("quantm physics", "quantum physics"),
+    ("machne lerning", "machine learning"),
+    ("physcis", "physics"),
+    ("algbra", "algebra"),
+])
+def test_matches_variants_of_a_topic(query, topic):
+    assert TopicIndex(TOPICS).match(query) == topic
+
+
+@pytest.mark.parametrize("query", [
+    "deep learning", "quantum optics", "chemosynthesis", "linear algebra", "history of physics", "bio", "",
+])
+def test_other_topics_do_not_match(query):
+    assert TopicIndex(TOPICS).match(query) is None
+
+
+def test_edit_distance_counts_swaps_once():
+    assert edit_distance("physcis", "physics", 2) == 1
+    assert edit_distance("chemo", "photo", 2) == 3
+
+
+def test_lookups_are_memoized_per_index():
+    index = TopicIndex(TOPICS)
+    hits = TopicIndex.stats["hit"]
+    index.match("Photosynthesys")
+    index.match("photosynthesys ")
+    assert TopicIndex.stats["hit"] == hits + 1
+    assert TopicIndex(["photosynthesis"])._memo == {}
+
+
+def test_question_bank_reindexes_topics_only_when_new_ones_arrive(tmp_path):
+    bank = QuestionBank(str(tmp_path / "questions.sqlite3"))
+    bank.import_rows([{"topic": "Algebra", "question": "What is x if x + 1 = 2?"}])
+    index = bank.topics
+    bank.import_rows([{"topic": "algebra", "question": "What is x if 2x = 4?"}])
+    assert bank.topics is index
+    bank.import_rows([{"topic": "Biology", "question": "What is a cell?"}])
+    assert bank.topics.match("biolgy") == "biology"
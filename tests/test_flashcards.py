@@ -0,0 +1,49 @@
+import io
+import warnings
+
+from aceai.flashcards import NearDuplicateFilter, flashcards, minhash, read_chunks, sentences, unique
+
+
+def test_sentences_keep_decimals_and_abbreviations_across_chunks():
+    text = "Water boils at 100.5 degrees, e.g. at sea level. Dr. Smith agreed!\n\n- A list item"
+    expected = ["Water boils at 100.5 degrees, e.g. at sea level.", "Dr. Smith agreed!", "A list item"]
+    assert list(sentences(read_chunks(text, chunk_size=7))) == expected
+
+
+def test_file_uploads_decode_across_chunk_boundaries():
+    data = "Café au lait is a drink made with coffee.".encode("utf-8")
+    assert "".join(read_chunks(io.BytesIO(data), "notes.txt", chunk_size=4)) == data.decode("utf-8")
+
+
+def test_minhash_estimates_similarity_without_overflow_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        a = minhash("The mitochondria is the powerhouse of the cell.")
+        b = minhash("The mitochondria is the powerhouse of the cell!")
+        c = minhash("Photosynthesis happens in the chloroplast of plant cells.")
+    assert (a == b).all()
+    assert (a == c).sum() < 8
+
+
+def test_near_duplicates_are_dropped():
+    text = ["Cells divide by mitosis to make two identical daughter cells.",
+            "Cells divide by mitosis to make two identical daughter cells, usually.",
+            "Meiosis makes four gametes with half the chromosomes."]
+    assert list(unique(text)) == [text[0], text[2]]
+
+
+def test_filter_forgets_oldest_sketches_past_capacity():
+    dedupe = NearDuplicateFilter(capacity=2)
+    sketches = [minhash(f"sentence number {word} about something") for word in ("one", "two", "three")]
+    for sketch in sketches:
+        assert not dedupe.seen(sketch)
+    assert len(dedupe._order) == 2
+    assert not dedupe.seen(sketches[0])
+    assert dedupe.seen(sketches[2])
+
+
+def test_flashcards_stop_at_max_cards():
+    notes = " ".join(f"Fact number {i} is about topic {i * 7919}." for i in range(50))
+    cards = list(flashcards(notes, max_cards=3))
+    assert len(cards) == 3
+    assert cards[0]["answer"] == "Fact number 0 is about topic 0."
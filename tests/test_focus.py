@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("av")
+
+from aceai import focus
+from aceai.focus import SimpleFocusProcessor, detect_faces, get_face_cascade
+
+
+class FakeCascade:
+    """Finds one face at a fixed place in whatever image it is given, or none"""
+
+    def __init__(self, box=(10, 10, 20, 20)):
+        self.box = box
+        self.searched = []
+
+    def detectMultiScale(self, gray, *args, **kwargs):
+        self.searched.append(gray.shape)
+        return [self.box] if self.box else []
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    fake = FakeCascade()
+    monkeypatch.setattr(focus, "get_face_cascade", lambda: fake)
+    return fake
+
+
+def test_each_thread_gets_its_own_cascade():
+    mine = get_face_cascade()
+    assert get_face_cascade() is mine
+    theirs = []
+    thread = threading.Thread(target=lambda: theirs.append(get_face_cascade()))
+    thread.start()
+    thread.join()
+    assert theirs[0] is not mine and not theirs[0].empty()
+
+
+def test_blank_frame_has_no_face():
+    assert detect_faces(np.zeros((240, 320, 3), np.uint8)) == []
+
+
+def test_boxes_are_in_full_frame_coordinates(cascade):
+    img = np.zeros((480, 640, 3), np.uint8)
+    assert detect_faces(img, detect_width=320, min_face_px=60) == [(20, 20, 40, 40)]
+    assert cascade.searched[-1] == (240, 320)
+    # The window is downscaled like the full frame and the box offset by its corner
+    assert detect_faces(img, detect_width=320, min_face_px=60, roi=(100, 50, 200, 200)) == [(120, 70, 40, 40)]
+    assert cascade.searched[-1] == (100, 100)
+
+
+def test_tracking_searches_around_the_last_face(cascade):
+    processor = SimpleFocusProcessor(detect_every=3, max_skip=0)
+    img = np.zeros((240, 320, 3), np.uint8)
+    for _ in range(4):
+        processor.analyze(img.copy())
+    # One full detection, then three searches of the window around the face
+    assert processor.full_detections == 1
+    assert cascade.searched[0] == (240, 320)
+    assert all(shape == (40, 40) for shape in cascade.searched[1:])
+    processor.analyze(img.copy())
+    assert processor.full_detections == 2
+
+    # Losing the face in the window falls back to a full detection straight away
+    cascade.box = None
+    processor.analyze(img.copy())
+    assert processor.full_detections == 3 and processor.face is None
@@ -0,0 +1,49 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from aceai.focus import SimpleFocusProcessor
+from aceai.focus_pool import FocusAnalysisPool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    return FocusAnalysisPool(1, max_width=320, max_height=640)
+
+
+def test_one_frame_in_flight_per_stream(pool):
+    stream = pool.register()
+    first = pool.acquire(stream, (120, 160))
+    assert first is not None
+    assert pool.acquire(stream, (120, 160)) is None
+    other = pool.register()
+    second = pool.acquire(other, (120, 160))
+    assert second is not None
+    for s, (slot, _) in ((stream, first), (other, second)):
+        pool._done(s, slot)
+    pool.unregister(stream)
+    pool.unregister(other)
+    assert pool.acquire(stream, (120, 160)) is None
+
+
+def test_streams_survive_dead_workers(pool):
+    processor = SimpleFocusProcessor(pool=pool, max_skip=0)
+    img = np.zeros((240, 320, 3), np.uint8)
+    processor.analyze(img.copy())
+    for process in list(pool._executor._processes.values()):
+        process.kill()
+    restarts = pool.stats["restarts"]
+    deadline = time.time() + 60
+    while pool.stats["restarts"] == restarts and time.time() < deadline:
+        processor.analyze(img.copy())
+        time.sleep(0.01)
+    assert pool.stats["restarts"] == restarts + 1
+    analyzed = processor.frames_analyzed
+    for _ in range(50):
+        processor.analyze(img.copy())
+        time.sleep(0.01)
+    assert processor.frames_analyzed > analyzed
+    processor.close()
@@ -0,0 +1,52 @@
+from aceai import gen_cache
+from aceai.gen_cache import GenerationCache, cache_key
+
+
+def test_key_ignores_case_and_spacing():
+    assert cache_key("Quantum  Physics", "Simple", "gpt2") == cache_key("quantum physics", "simple", "gpt2")
+    assert cache_key("quantum physics", "Simple", "gpt2") != cache_key("quantum physics", "Simple", "gpt2:int8")
+    assert cache_key("algebra", "Simple", "gpt2", {"seed": 0}) != cache_key("algebra", "Simple", "gpt2", {"seed": 1})
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = GenerationCache(memory_items=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    GenerationCache(path).put("k", "text")
+    cache = GenerationCache(path)
+    assert cache.get("k") == "text"
+    assert cache.stats["disk_hits"] == 1
+    assert cache.get("k") == "text"
+    assert cache.stats["memory_hits"] == 1
+
+
+def test_expired_entries_are_not_served(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    now = [1000.0]
+    monkeypatch.setattr(gen_cache.time, "time", lambda: now[0])
+    GenerationCache(path, ttl=60).put("k", "text")
+    now[0] += 61
+    cache = GenerationCache(path, ttl=60)
+    assert cache.get("k") is None
+    assert cache.stats["evictions"] == 1
+
+
+def test_disk_size_eviction_drops_least_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(gen_cache.time, "time", lambda: now[0])
+    cache = GenerationCache(str(tmp_path / "cache.sqlite3"), memory_items=1, disk_items=10, ttl=0)
+    for i in range(64):
+        now[0] += 1
+        cache.put(f"k{i}", str(i))
+    (count,) = cache._db.execute("SELECT COUNT(*) FROM generations").fetchone()
+    assert count == 10
+    assert cache.get("k63") == "63"
+    assert cache.get("k0") is None
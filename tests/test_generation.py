@@ -0,0 +1,25 @@
+from aceai.generation import LEVEL_TOKENS, explainer_params, finish, pipeline_kwargs
+
+
+def test_finish_keeps_whole_sentences_once():
+    text = " Plants use light. They make sugar. plants  use light. And then the"
+    assert finish(text) == "Plants use light. They make sugar."
+
+
+def test_finish_keeps_a_single_unfinished_sentence():
+    assert finish("Plants use light and") == "Plants use light and"
+
+
+def test_levels_have_bounded_seeded_budgets():
+    for level, budget in LEVEL_TOKENS.items():
+        params = explainer_params(level)
+        assert params["max_new_tokens"] == budget
+        assert params["min_new_tokens"] < budget
+        assert params == explainer_params(level)
+
+
+def test_pipeline_kwargs_without_a_tokenizer():
+    class Stub:
+        tokenizer = None
+
+    assert pipeline_kwargs(Stub(), explainer_params("Simple")) == {"max_new_tokens": 60, "return_full_text": False}
@@ -0,0 +1,38 @@
+from aceai import metrics
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = metrics.Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1] and histogram.count == 4
+    assert 0.1 < histogram.quantile(0.5) <= 1.0
+    assert histogram.quantile(1.0) == 1.0
+
+
+def test_render_exposes_families_and_collectors():
+    family = metrics.histogram("test_render_seconds", "Test histogram", ("step",), buckets=(0.1, 1.0))
+    family.labels('say "hi"').observe(0.5)
+    counter = metrics.counter("test_render_total", "Test counter")
+    counter.inc(3)
+    metrics.collector("test_render_items", "Test collector", "gauge", ("kind",), lambda: {("a",): 2})
+    lines = metrics.render().splitlines()
+    assert "# TYPE test_render_seconds histogram" in lines
+    assert 'test_render_seconds_bucket{step="say \\"hi\\"",le="0.1"} 0' in lines
+    assert 'test_render_seconds_bucket{step="say \\"hi\\"",le="+Inf"} 1' in lines
+    assert 'test_render_seconds_count{step="say \\"hi\\""} 1' in lines
+    assert "test_render_total 3" in lines
+    assert 'test_render_items{kind="a"} 2' in lines
+    assert [row["labels"] for row in metrics.summary() if row["metric"] == "test_render_seconds"] == ['say "hi"']
+
+
+def test_timer_is_a_no_op_when_disabled(monkeypatch):
+    family = metrics.histogram("test_timer_seconds", "Test timer")
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    with metrics.timer(family):
+        pass
+    assert family.children == {}
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    with metrics.timer(family):
+        pass
+    assert family.labels().count == 1
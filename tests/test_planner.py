@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from aceai.planner import StudyPlan
+
+START = date(2026, 1, 1)
+
+
+def test_every_day_adds_up_to_the_hours_available():
+    plan = StudyPlan(["Maths", "Physics", "Chemistry"], START, START + timedelta(days=21), 5,
+                     weights=[2, 1, 1])
+    daily = plan.study.sum(axis=0) + plan.revision.sum(axis=0)
+    assert np.allclose(daily, 5)
+    assert np.allclose(plan.study / plan.slot, np.round(plan.study / plan.slot))
+    study = {name: hours for name, (hours, _) in plan.totals().items()}
+    assert study["Maths"] > study["Physics"]
+
+
+def test_no_study_after_a_deadline():
+    plan = StudyPlan(["Maths", "Physics"], START, START + timedelta(days=14), 4,
+                     deadlines=[START + timedelta(days=5), START + timedelta(days=14)])
+    assert plan.study[0, 5:].sum() == 0
+    assert plan.study[0, :5].sum() > 0
+
+
+def test_set_day_replans_from_that_day():
+    plan = StudyPlan(["Maths", "Physics"], START, START + timedelta(days=10), 4)
+    before = plan.study[:, :3].copy()
+    plan.set_day(START + timedelta(days=3), 0)
+    assert (plan.study[:, :3] == before).all()
+    assert plan.study[:, 3].sum() + plan.revision[:, 3].sum() == 0
+    assert START + timedelta(days=3) not in plan.idle_days()
+
+
+def test_idle_days_after_every_deadline():
+    plan = StudyPlan(["Maths"], START, START + timedelta(days=40), 2, intervals=(1,),
+                     deadlines=[START + timedelta(days=3)])
+    idle = plan.idle_days()
+    assert idle and idle[0] > START + timedelta(days=3)
+    assert all(not rows for day, rows in plan.calendar() if day in idle)
+
+
+def test_needs_a_subject():
+    with pytest.raises(ValueError):
+        StudyPlan([], START, START + timedelta(days=7), 4)
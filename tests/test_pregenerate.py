@@ -0,0 +1,66 @@
+from aceai import config
+from aceai.pregenerate import EXPLANATION, PRACTICE, PregeneratedContent, artifact_settings, run, write_artifact
+
+SETTINGS = artifact_settings("tiny-model", "stub")
+
+
+def write(path, meta=None):
+    items = [(EXPLANATION, "Photosynthesis", "Simple", "Plants make sugar from light."),
+             (PRACTICE, "Photosynthesis", "Beginner", [{"question": "What do plants make?", "options": [],
+                                                        "answer": None}])]
+    write_artifact(str(path), items, meta or {"topics": ["Photosynthesis"], **SETTINGS})
+
+
+def test_round_trip(tmp_path):
+    write(tmp_path / "pre.bin")
+    content = PregeneratedContent(str(tmp_path / "pre.bin"), expected=SETTINGS)
+    assert len(content) == 2
+    assert content.explanation("photosynthesys", "Simple") == "Plants make sugar from light."
+    assert content.explanation("photosynthesis", "Detailed") is None
+    assert content.practice("Photosynthesis", "Beginner")[0]["question"] == "What do plants make?"
+    assert content.stats == {"hits": 2, "misses": 1}
+
+
+def test_artifacts_from_other_settings_are_ignored(tmp_path):
+    write(tmp_path / "pre.bin")
+    content = PregeneratedContent(str(tmp_path / "pre.bin"), expected=artifact_settings("other-model", "stub"))
+    assert content.mismatched == ["model"]
+    assert len(content) == 0 and content.explanation("photosynthesis", "Simple") is None
+
+    write(tmp_path / "old.bin", {"topics": ["Photosynthesis"], "model": SETTINGS["model"]})
+    assert PregeneratedContent(str(tmp_path / "old.bin"), expected=SETTINGS).mismatched == \
+        ["explainer_params", "practice_params"]
+
+
+def test_missing_file_is_empty(tmp_path):
+    assert len(PregeneratedContent(str(tmp_path / "none.bin"), expected=SETTINGS)) == 0
+
+
+def test_run_writes_a_matching_artifact_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STUB_MS_PER_TOKEN", 0.0)
+    monkeypatch.setenv("ACEAI_STUB_MS_PER_TOKEN", "0")
+    output = str(tmp_path / "pre.bin")
+    syllabus = [("Photosynthesis", ["Simple"], ["Beginner"])]
+    assert run(syllabus, output, workers=1, backend="stub", model_id="tiny-model", progress=lambda _: None) == 0
+    content = PregeneratedContent(output, expected=SETTINGS)
+    assert content.explanation("photosynthesis", "Simple")
+    assert content.practice("photosynthesis", "Beginner")
+    messages = []
+    run(syllabus, output, workers=1, backend="stub", model_id="tiny-model", progress=messages.append)
+    assert messages[0].startswith("2 of 2 items already generated")
+
+
+def test_checkpoint_from_another_model_is_not_reused(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STUB_MS_PER_TOKEN", 0.0)
+    monkeypatch.setenv("ACEAI_STUB_MS_PER_TOKEN", "0")
+    output = str(tmp_path / "pre.bin")
+    syllabus = [("Photosynthesis", ["Simple"], ["Beginner"])]
+    run(syllabus, output, workers=1, backend="stub", model_id="old-model", progress=lambda _: None)
+    messages = []
+    run(syllabus, output, workers=1, backend="stub", model_id="new-model", progress=messages.append)
+    assert messages[0].startswith("Ignoring")
+    assert messages[1].startswith("0 of 2 items already generated")
+    assert len(PregeneratedContent(output, expected=artifact_settings("new-model", "stub"))) == 2
+    messages = []
+    run(syllabus, output, workers=1, backend="stub", model_id="new-model", progress=messages.append)
+    assert messages[0].startswith("2 of 2 items already generated")
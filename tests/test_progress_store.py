@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from datetime import date
+
+from aceai.progress_store import ProgressTracker, SQLiteProgressStore
+
+
+def test_increments_are_written_behind_as_deltas(tmp_path):
+    store = SQLiteProgressStore(str(tmp_path / "progress.sqlite3"))
+    first = ProgressTracker(store, flush_seconds=3600)
+    second = ProgressTracker(store, flush_seconds=3600)
+    first.increment("user-1", "questions_answered", 3)
+    second.increment("user-1", "questions_answered", 2)
+    assert store.load("user-1") is None
+    first.flush()
+    second.flush()
+    assert store.load("user-1")["questions_answered"] == 5
+
+
+def test_streak_counts_consecutive_days(tmp_path):
+    tracker = ProgressTracker(SQLiteProgressStore(str(tmp_path / "progress.sqlite3")), flush_seconds=3600)
+    tracker.touch("user-1", date(2026, 1, 1))
+    tracker.touch("user-1", date(2026, 1, 2))
+    tracker.touch("user-1", date(2026, 1, 2))
+    assert tracker.get("user-1")["streak"] == 2
+    tracker.touch("user-1", date(2026, 1, 5))
+    assert tracker.get("user-1")["streak"] == 1
+
+
+def test_cache_keeps_recent_users_and_unwritten_changes(tmp_path):
+    tracker = ProgressTracker(SQLiteProgressStore(str(tmp_path / "progress.sqlite3")),
+                              flush_seconds=3600, max_cached=2)
+    tracker.increment("pending", "topics_mastered")
+    for user_id in ("a", "b", "c"):
+        tracker.get(user_id)
+    assert list(tracker._cache) == ["pending", "c"]
+    tracker.flush()
+    tracker.get("d")
+    assert list(tracker._cache) == ["c", "d"]
+
+
+def test_pending_changes_are_written_at_exit(tmp_path):
+    path = tmp_path / "progress.sqlite3"
+    script = textwrap.dedent(f"""
+        from aceai.progress_store import ProgressTracker, SQLiteProgressStore
+        tracker = ProgressTracker(SQLiteProgressStore({str(path)!r}), flush_seconds=3600)
+        tracker.increment("user-1", "study_time", 1.5)
+    """)
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=60,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert SQLiteProgressStore(str(path)).load("user-1")["study_time"] == 1.5
+
+
+class FlakyStore(SQLiteProgressStore):
+    """Fails the first write"""
+
+    failed = False
+
+    def apply(self, changes):
+        if not self.failed:
+            self.failed = True
+            raise OSError("disk full")
+        super().apply(changes)
+
+
+def test_failed_background_writes_are_logged_and_retried(tmp_path, caplog):
+    store = FlakyStore(str(tmp_path / "progress.sqlite3"))
+    tracker = ProgressTracker(store, flush_seconds=0.01)
+    tracker.increment("user-1", "questions_answered", 2)
+    deadline = time.time() + 10
+    while store.load("user-1") is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.load("user-1")["questions_answered"] == 2
+    assert "Could not write progress changes" in caplog.text
@@ -0,0 +1,80 @@
+import pytest
+
+from aceai.question_bank import PracticeHistory, QuestionBank, SeenSet, permute
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 64, 1000])
+def test_permute_is_a_bijection(n):
+    for key in (0, 1, 2 ** 62 + 12345):
+        assert sorted(permute(i, n, key) for i in range(n)) == list(range(n))
+
+
+def test_permute_depends_on_the_key():
+    assert [permute(i, 50, 1) for i in range(50)] != [permute(i, 50, 2) for i in range(50)]
+
+
+def test_seen_set():
+    seen = SeenSet()
+    for qid in (0, 7, 8, 1000):
+        seen.add(qid)
+    assert 7 in seen and 1000 in seen and 9 not in seen and 5000 not in seen
+    assert len(seen) == 4
+    seen.discard(7)
+    seen.discard(99999)
+    assert 7 not in seen and len(seen) == 3
+    assert 1000 in SeenSet(bytes(seen.bits))
+
+
+def bank_with(tmp_path, count, topic="Algebra", **kwargs):
+    bank = QuestionBank(str(tmp_path / "questions.sqlite3"), **kwargs)
+    bank.import_rows([{"topic": topic, "difficulty": "Intermediate", "format": "Short Answer",
+                       "question": f"Question {i}?"} for i in range(count)])
+    return bank
+
+
+def test_sampling_does_not_repeat_until_the_bucket_is_used_up(tmp_path):
+    bank = bank_with(tmp_path, 12)
+    history = PracticeHistory(seed=42)
+    first = [q["question"] for q in bank.sample(history, "algebra", "Intermediate", "Short Answer", k=5)]
+    second = [q["question"] for q in bank.sample(history, "algebra", "Intermediate", "Short Answer", k=5)]
+    assert len(set(first + second)) == 10
+    third = [q["question"] for q in bank.sample(history, "algebra", "Intermediate", "Short Answer", k=5)]
+    assert len(third) == 5 and set(third) >= {f"Question {i}?" for i in range(12)} - set(first + second)
+
+
+def test_history_round_trip(tmp_path):
+    bank = bank_with(tmp_path, 6)
+    history = PracticeHistory(seed=7)
+    bank.sample(history, "algebra", "Intermediate", "Short Answer", k=3)
+    bank.save_history("user-1", history)
+    loaded = bank.history("user-1")
+    assert (loaded.seed, loaded.cursors, bytes(loaded.seen.bits)) == (7, history.cursors, bytes(history.seen.bits))
+
+
+def test_sample_picks_up_questions_imported_elsewhere(tmp_path):
+    bank = bank_with(tmp_path, 2, refresh_seconds=0)
+    other = QuestionBank(bank.path)
+    other.import_rows([{"topic": "Biology", "question": "What is a cell?", "format": "Short Answer"}])
+    assert [q["question"] for q in bank.sample(PracticeHistory(), "biology", "Beginner", "Mixed")] == \
+        ["What is a cell?"]
+
+
+def test_small_bucket_gives_each_question_once_per_set(tmp_path):
+    bank = bank_with(tmp_path, 3)
+    history = PracticeHistory(seed=1)
+    for _ in range(3):
+        questions = [q["question"] for q in bank.sample(history, "algebra", "Intermediate", "Short Answer", k=5)]
+        assert sorted(questions) == ["Question 0?", "Question 1?", "Question 2?"]
+
+
+def test_sparse_format_is_topped_up_to_k(tmp_path):
+    bank = bank_with(tmp_path, 1)
+    bank.import_rows([{"topic": "Algebra", "difficulty": "Advanced", "format": "Multiple Choice",
+                       "question": f"Choice {i}?", "options": "1|2"} for i in range(6)])
+    history = PracticeHistory(seed=1)
+    for _ in range(3):
+        questions = bank.sample(history, "algebra", "Intermediate", "Short Answer", k=5)
+        assert len(questions) == 5
+        # The format asked for comes first, even once it has been seen
+        assert questions[0]["question"] == "Question 0?"
+        assert len({q["question"] for q in questions}) == 5
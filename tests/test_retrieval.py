@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+
+from aceai.retrieval import RetrievalIndex, passages
+
+DOCS = [
+    "Photosynthesis turns light into chemical energy in the chloroplast.",
+    "The light reactions of photosynthesis split water and release oxygen.",
+    "Mitochondria release energy from glucose during respiration.",
+]
+
+
+def test_ranks_by_bm25(tmp_path):
+    index = RetrievalIndex(str(tmp_path))
+    index.add(DOCS)
+    hits = index.search("photosynthesis light reactions")
+    assert [doc for doc, _ in hits] == [1, 0]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("glucose")[0][0] == 2
+    assert index.search("quantum") == []
+
+
+def test_index_reopens_from_disk(tmp_path):
+    RetrievalIndex(str(tmp_path)).add(DOCS, source="notes.txt")
+    index = RetrievalIndex(str(tmp_path))
+    assert len(index) == 3
+    assert index.passage(2) == {"text": DOCS[2], "source": "notes.txt"}
+    assert index.search("mitochondria")[0][0] == 2
+
+
+def test_deleted_passages_leave_search_and_document_frequency(tmp_path):
+    index = RetrievalIndex(str(tmp_path))
+    index.add(DOCS)
+    photosynthesis = index.vocab["photosynthesis"]
+    index.delete([1, 1])
+    assert index.df[photosynthesis] == 1
+    index.delete([1])
+    assert index.df[photosynthesis] == 1
+    assert [doc for doc, _ in index.search_many(["light reactions"], k=1)[0]] == [0]
+    index.delete([0])
+    assert index.search("photosynthesis", k=5) == []
+
+
+def test_merge_drops_deleted_postings(tmp_path):
+    index = RetrievalIndex(str(tmp_path), max_segments=2)
+    index.add(DOCS[:1])
+    index.delete([0])
+    index.add(DOCS[1:2])
+    index.add(DOCS[2:])
+    assert len(index.segments) == 1
+    assert 0 not in np.asarray(index.segments[0].docs)
+    assert [doc for doc, _ in index.search("photosynthesis")] == [1]
+
+
+def test_sync_replaces_changed_files(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "biology.md").write_text("\n\n".join(DOCS[:2]))
+    index = RetrievalIndex(str(tmp_path / "index"))
+    assert index.sync(str(corpus)) == 2
+    assert index.sync(str(corpus)) == 0
+    (corpus / "biology.md").write_text(DOCS[2])
+    os.utime(corpus / "biology.md", (1, 1))
+    assert index.sync(str(corpus)) == 1
+    assert [doc for doc, _ in index.search("photosynthesis")] == []
+    assert index.df[index.vocab["photosynthesis"]] == 0
+
+
+def test_sync_drops_deleted_files(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "biology.md").write_text("\n\n".join(DOCS[:2]))
+    (corpus / "respiration.txt").write_text(DOCS[2])
+    index = RetrievalIndex(str(tmp_path / "index"))
+    assert index.sync(str(corpus)) == 3
+    os.remove(corpus / "biology.md")
+    assert index.sync(str(corpus)) == 0
+    assert list(index.files) == [str(corpus / "respiration.txt")]
+    assert index.search("photosynthesis") == []
+    assert index.df[index.vocab["photosynthesis"]] == 0
+    # The deletion is saved with the index
+    reopened = RetrievalIndex(str(tmp_path / "index"))
+    assert list(reopened.files) == [str(corpus / "respiration.txt")]
+    assert [doc for doc, _ in reopened.search("photosynthesis glucose")] == [2]
+
+
+def test_passages_split_long_paragraphs():
+    text = "one two three\n\n" + " ".join(["word"] * 5)
+    assert list(passages(text, max_words=3)) == ["one two three", "word word word", "word word"]
@@ -0,0 +1,86 @@
+import numpy as np
+
+from aceai.sessions import SessionManager, estimate_size
+
+
+class Processor:
+    def __init__(self):
+        self.closed = False
+        self.cpu_seconds = 0.0
+
+    def close(self):
+        self.closed = True
+
+
+class Request:
+    def __init__(self):
+        self.finished = False
+
+    def done(self):
+        return self.finished
+
+
+def manager(**kwargs):
+    return SessionManager(reap=False, **kwargs)
+
+
+def test_estimate_size_counts_buffers_once():
+    array = np.zeros(1 << 20, dtype=np.uint8)
+    assert estimate_size(array) > 1 << 20
+    assert estimate_size([array, array[10:], array]) < 2 * estimate_size(array)
+
+
+def test_oversized_state_drops_reloadable_values_first():
+    sessions = manager(max_state_bytes=1 << 20)
+    state = {"deck": np.zeros(2 << 20, dtype=np.uint8), "notes": "keep me"}
+    assert sessions.measure("s1", state, reloadable=("deck",)) == ["deck"]
+    assert list(state) == ["notes"]
+    assert sessions.stats["state_bytes_dropped"] > 2 << 20
+
+
+def test_streams_over_the_cap_are_refused_and_closed():
+    sessions = manager(max_streams=1)
+    first, second = Processor(), Processor()
+    assert sessions.add_stream("s1", first)
+    assert not sessions.add_stream("s2", second)
+    assert second.closed and not first.closed
+    assert sessions.stats["streams_refused"] == 1
+    first.close()
+    assert sessions.add_stream("s2", Processor())
+
+
+def test_reaper_closes_streams_of_quiet_sessions_once():
+    sessions = manager(stream_idle_seconds=60, idle_seconds=600)
+    processor = Processor()
+    session = sessions.touch("s1", "Focus Monitor")
+    sessions.add_stream("s1", processor)
+    assert sessions.reap(now=session.last_seen + 30) == 0
+    assert sessions.reap(now=session.last_seen + 61) == 1
+    assert processor.closed
+    assert sessions.pop_notice("s1") and sessions.pop_notice("s1") is None
+    assert sessions.reap(now=session.last_seen + 601) == 0
+    assert sessions.totals()["sessions"] == 0
+
+
+def test_leaving_the_page_reaps_the_stream():
+    sessions = manager(stream_idle_seconds=60)
+    processor = Processor()
+    sessions.touch("s1", "Focus Monitor")
+    sessions.add_stream("s1", processor)
+    session = sessions.touch("s1", "Home")
+    assert sessions.reap(now=session.page_since + 30) == 0
+    # Still active, but on another page for too long
+    session.last_seen = session.page_since + 60
+    assert sessions.reap(now=session.page_since + 61) == 1
+    assert processor.closed
+
+
+def test_pending_requests_are_capped_per_session():
+    sessions = manager(max_pending=1)
+    request = Request()
+    assert sessions.admit_request("s1")
+    sessions.add_request("s1", request)
+    assert not sessions.admit_request("s1")
+    assert sessions.admit_request("s2")
+    request.finished = True
+    assert sessions.admit_request("s1")
@@ -0,0 +1,64 @@
+from aceai.srs import AGAIN, DAY, EASY, GOOD, Deck, DeckStore, card_key
+
+
+def test_sm2_intervals_and_lapses():
+    deck = Deck()
+    card = deck.add("Q", "A", now=0)
+    intervals = []
+    for _ in range(3):
+        deck.review(card, GOOD, now=0)
+        intervals.append(float(deck.interval[card]))
+    assert intervals == [1.0, 6.0, 15.0]
+    assert deck.due[card] == 15 * DAY
+    deck.review(card, AGAIN, now=0)
+    assert (deck.interval[card], deck.reps[card], deck.lapses[card]) == (1.0, 0, 1)
+    assert deck.ease[card] >= 1.3
+
+
+def test_easy_answers_raise_ease():
+    deck = Deck()
+    card = deck.add("Q", "A", now=0)
+    deck.review(card, EASY, now=0)
+    assert abs(deck.ease[card] - 2.6) < 1e-6
+
+
+def test_next_due_is_ordered_and_does_not_consume():
+    deck = Deck(capacity=2)
+    cards = [deck.add(f"Q{i}", f"A{i}", now=i) for i in range(5)]
+    deck.review(cards[0], GOOD, now=10)
+    assert deck.next_due(3, now=10) == [1, 2, 3]
+    assert deck.next_due(3, now=10) == [1, 2, 3]
+    assert deck.due_count(now=10) == 4
+    assert deck.add("Q1 again", "A1") == 1
+
+
+def test_store_round_trip(tmp_path):
+    store = DeckStore(str(tmp_path / "srs.sqlite3"))
+    deck = Deck()
+    cards = [deck.add(f"Q{i}", f"A{i}", now=0) for i in range(3)]
+    store.add("user-1", deck, cards)
+    deck.review(1, GOOD, now=0)
+    store.update("user-1", deck, [1])
+    loaded = store.load("user-1")
+    assert loaded.answers == ["A0", "A1", "A2"]
+    assert loaded.keys == [card_key(answer) for answer in loaded.answers]
+    assert loaded.next_due(5, now=0) == [0, 2]
+    assert len(store.load("user-2")) == 0
+
+
+def test_two_tabs_do_not_overwrite_each_other(tmp_path):
+    store = DeckStore(str(tmp_path / "srs.sqlite3"))
+    first, second = store.load("user-1"), store.load("user-1")
+    store.add("user-1", first, [first.add("Q first", "A first", now=0)])
+    store.add("user-1", second, [second.add("Q second", "A second", now=0)])
+    assert store.load("user-1").answers == ["A first", "A second"]
+
+    first, second = store.load("user-1"), store.load("user-1")
+    first.review(0, GOOD, now=0)
+    store.update("user-1", first, [0])
+    second.review(1, AGAIN, now=0)
+    store.update("user-1", second, [1])
+    # Re-adding a card another tab has reviewed keeps its schedule
+    store.add("user-1", second, [second.add("Q first", "A first")])
+    deck = store.load("user-1")
+    assert (deck.reps[0], deck.lapses[1]) == (1, 1)
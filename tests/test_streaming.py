@@ -0,0 +1,111 @@
+import queue
+import threading
+import types
+
+import pytest
+
+from aceai import streaming
+from aceai.streaming import TokenStream
+
+
+class FakeStreamer:
+    """TextIteratorStreamer stand-in: text put by the model comes out of the iterator"""
+
+    def __init__(self, tokenizer, **kwargs):
+        self._queue = queue.Queue()
+
+    def put(self, value):
+        self._queue.put(value)
+
+    def end(self):
+        self._queue.put(None)
+
+    def __iter__(self):
+        while True:
+            value = self._queue.get(timeout=10)
+            if value is None:
+                return
+            yield value
+
+
+class FakeModel:
+    """Generates `tokens` one at a time, checking the stopping criteria after each"""
+
+    def __init__(self, tokens, fail_after=None):
+        self.tokens = tokens
+        self.fail_after = fail_after
+        self.generated = 0
+        self.finished = threading.Event()
+        self.step = threading.Semaphore(0)
+        self.tokenizer = lambda prompt, return_tensors: {"input_ids": [prompt]}
+        self.tokenizer.eos_token_id = 0
+        self.model = types.SimpleNamespace(generate=self.generate)
+
+    def generate(self, streamer, stopping_criteria, **kwargs):
+        try:
+            for token in self.tokens:
+                if self.generated == self.fail_after:
+                    raise RuntimeError("out of memory")
+                # Each token waits for the test to allow it
+                self.step.acquire(timeout=10)
+                self.generated += 1
+                streamer.put(token)
+                if any(stop(None, None) for stop in stopping_criteria):
+                    break
+            streamer.end()
+        finally:
+            self.finished.set()
+
+
+@pytest.fixture(autouse=True)
+def fake_transformers(monkeypatch):
+    fake = types.SimpleNamespace(TextIteratorStreamer=FakeStreamer, StoppingCriteriaList=list)
+    monkeypatch.setattr(streaming, "lazy_import", lambda name: fake)
+    monkeypatch.setattr(streaming.metrics, "ENABLED", False)
+
+
+def test_complete_stream():
+    model = FakeModel(["Plants ", "make ", "sugar."])
+    model.step.release(3)
+    stream = TokenStream(model, "prompt", max_new_tokens=3, num_return_sequences=2)
+    assert list(stream) == ["Plants ", "make ", "sugar."]
+    assert stream.text == "Plants make sugar."
+    assert stream.completed and stream.done() and not stream.cancelled
+
+
+def test_cancel_stops_generation():
+    model = FakeModel(["one ", "two ", "three ", "four "])
+    stream = TokenStream(model, "prompt")
+    chunks = iter(stream)
+    model.step.release()
+    assert next(chunks) == "one "
+    stream.cancel()
+    model.step.release(3)
+    assert list(chunks) == []
+    assert model.finished.wait(10)
+    # The model stopped at the next token instead of running to the end
+    assert model.generated == 2
+    assert stream.cancelled and stream.done() and not stream.completed
+    assert stream.text == "one "
+
+
+def test_abandoned_stream_stops_generation():
+    model = FakeModel(["one ", "two ", "three "])
+    stream = TokenStream(model, "prompt")
+    chunks = iter(stream)
+    model.step.release()
+    next(chunks)
+    # What happens when Streamlit stops the script run mid-stream
+    chunks.close()
+    model.step.release(2)
+    assert model.finished.wait(10)
+    assert model.generated == 2 and stream.cancelled
+
+
+def test_failed_generation_ends_the_stream():
+    model = FakeModel(["one ", "two "], fail_after=1)
+    model.step.release(2)
+    stream = TokenStream(model, "prompt")
+    assert list(stream) == ["one "]
+    assert isinstance(stream.error, RuntimeError)
+    assert stream.done() and not stream.completed
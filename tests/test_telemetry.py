@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+import numpy as np
+
+from aceai.telemetry import FocusTelemetry, RingBuffer, TelemetryStore, downsample, stored_summary, summarize
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_ring_buffer_keeps_newest_rows_in_order():
+    ring = RingBuffer(3)
+    for i in range(5):
+        ring.append(float(i), 1, i, (0, 0, 0, 0))
+    t, _, score, _ = ring.tail()
+    assert t.tolist() == [2.0, 3.0, 4.0]
+    assert ring.tail(2)[2].tolist() == [3, 4]
+
+
+def test_downsample_one_row_per_second():
+    t = np.array([10.0, 10.5, 11.2, 11.9])
+    state = np.array([1, 1, 2, 2], np.uint8)
+    score = np.array([80, 90, 50, 60], np.uint8)
+    face = np.zeros((4, 4), np.int16)
+    t2, state2, score2, _ = downsample(t, state, score, face)
+    assert t2.tolist() == [10.0, 11.0]
+    assert state2.tolist() == [1, 2]
+    assert score2.tolist() == [85, 55]
+
+
+def test_summarize_counts_long_distractions_only():
+    t = np.arange(30, dtype=np.float64)
+    state = np.array([1] * 10 + [2] * 10 + [1] * 7 + [3] * 3, np.uint8)
+    result = summarize(t, state, np.full(30, 50, np.uint8))
+    assert result["distraction_episodes"] == 1
+    assert abs(result["tracked_minutes"] - 29 / 60) < 1e-9
+
+
+def test_rows_are_stored_by_user_and_outlive_the_session(tmp_path):
+    store = TelemetryStore(str(tmp_path / "focus.sqlite3"))
+    recorder = FocusTelemetry("user-1", store=store, flush_seconds=3600)
+    for i in range(20):
+        recorder.record("FOCUSED", 90, t=1000.0 + i)
+    recorder.flush()
+    assert wait_for(lambda: store.stats["written"] == 20)
+    assert len(store.load("user-2")[0]) == 0
+    # A refreshed page has a new recorder, or none at all
+    assert FocusTelemetry("user-1", store=store).summary()["tracked_minutes"] > 0
+    assert stored_summary(store, "user-1")["focused_minutes"] == recorder.summary()["focused_minutes"]
+    assert stored_summary(store, "user-1", since=1010.0)["tracked_minutes"] < recorder.summary()["tracked_minutes"]
+
+
+def test_writer_survives_database_errors(tmp_path):
+    store = TelemetryStore(str(tmp_path / "focus.sqlite3"), retry_seconds=0.01)
+    connect, failures = store._connect, [2]
+
+    def flaky():
+        if failures[0]:
+            failures[0] -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return connect()
+
+    store._connect = flaky
+    store.save("user-1", [1.0], [1], [50], [(0, 0, 0, 0)])
+    assert wait_for(lambda: store.stats["written"] == 1)
+    assert store.stats["errors"] == 2
+
+
+def test_queue_is_bounded(tmp_path):
+    store = TelemetryStore(str(tmp_path / "focus.sqlite3"), max_queued=1)
+    store._connect = lambda: (_ for _ in ()).throw(sqlite3.OperationalError("database is locked"))
+    for i in range(10):
+        store.save("user-1", [float(i)], [1], [50], [(0, 0, 0, 0)])
+    assert store.stats["dropped"] >= 8
+    assert store._queue.qsize() <= 1